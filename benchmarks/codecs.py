@@ -0,0 +1,71 @@
+"""
+    Compares how many gateway events per second each codec can decode.
+
+    Usage: python benchmarks/codecs.py [recording.jsonl]
+
+    The recording is a file with one raw gateway payload (as JSON) per line. If no recording is given, a synthetic
+    mix of GUILD_CREATE, MESSAGE_CREATE, PRESENCE_UPDATE and TYPING_START payloads is used.
+"""
+import json
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from discord.utils.codec import ETFCodec, JSONCodec, erlpack, etf_encode, orjson
+
+
+def synthetic_traffic() -> list[dict]:
+    user = {"id": "81384788765712384", "username": "someone", "discriminator": "0001", "avatar": None, "bot": False}
+    guild = {
+        "id": "41771983423143937", "name": "A guild", "member_count": 500, "large": False,
+        "roles": [{"id": str(41771983423143937 + i), "name": f"role {i}", "permissions": "104324673", "position": i,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False} for i in range(20)],
+        "channels": [{"id": str(41771983423143938 + i), "type": 0, "name": f"channel-{i}", "position": i,
+                      "permission_overwrites": [], "nsfw": False, "topic": None} for i in range(50)],
+        "members": [{"user": dict(user, id=str(81384788765712384 + i)), "roles": [], "joined_at": "2022-01-01T00:00:00",
+                     "deaf": False, "mute": False} for i in range(500)],
+        "emojis": [], "stickers": [], "features": []
+    }
+    message = {"id": "1000000000000000000", "channel_id": "41771983423143938", "guild_id": "41771983423143937",
+               "author": user, "content": "hello world", "timestamp": "2022-01-01T00:00:00", "tts": False,
+               "mention_everyone": False, "mentions": [], "attachments": [], "embeds": []}
+    presence = {"user": {"id": user["id"]}, "guild_id": guild["id"], "status": "online", "activities": []}
+    typing = {"channel_id": message["channel_id"], "guild_id": guild["id"], "user_id": user["id"], "timestamp": 1}
+    traffic = [{"t": "GUILD_CREATE", "s": 1, "op": 0, "d": guild}]
+    for i in range(2000):
+        event, data = [("MESSAGE_CREATE", message), ("PRESENCE_UPDATE", presence), ("TYPING_START", typing)][i % 3]
+        traffic.append({"t": event, "s": i + 2, "op": 0, "d": data})
+    return traffic
+
+
+def bench(name: str, decode, frames: list, rounds: int = 5):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            decode(frame)
+    elapsed = time.perf_counter() - start
+    size = sum(len(frame) for frame in frames)
+    print(f"{name:<16} {len(frames) * rounds / elapsed:>12,.0f} events/s {size / len(frames):>10,.0f} bytes/event")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            traffic = [json.loads(line) for line in f if line.strip()]
+    else:
+        traffic = synthetic_traffic()
+
+    json_frames = [json.dumps(payload) for payload in traffic]
+    etf_frames = [etf_encode(payload) for payload in traffic]
+
+    bench("json (stdlib)", JSONCodec('json').decode, json_frames)
+    if orjson is not None:
+        bench("json (orjson)", JSONCodec('orjson').decode, json_frames)
+    bench("etf (python)", ETFCodec('python').decode, etf_frames)
+    if erlpack is not None:
+        bench("etf (erlpack)", ETFCodec('erlpack').decode, etf_frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+    Measures the latency between emitting an event and its listener starting.
+
+    Usage: python benchmarks/dispatch.py
+
+    Compares the old model, where listeners were scheduled with `asyncio.run_coroutine_threadsafe` onto a second
+    event loop running in another thread, with `discord.utils.EventEmitter`, which creates tasks on the connection's
+    own loop.
+"""
+import asyncio
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, '.')
+
+from discord.utils import EventEmitter
+
+EVENTS = 20000
+
+
+def report(name: str, latencies: list[float]):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{name:<28} mean {statistics.mean(latencies) * 1e6:8.1f} us   p99 {p99 * 1e6:8.1f} us")
+
+
+async def threaded():
+    latencies = []
+    done = asyncio.Event()
+    main_loop = asyncio.get_running_loop()
+    listener_loop = asyncio.new_event_loop()
+    threading.Thread(target=listener_loop.run_forever, daemon=True).start()
+
+    async def listener(sent):
+        latencies.append(time.perf_counter() - sent)
+        if len(latencies) == EVENTS:
+            main_loop.call_soon_threadsafe(done.set)
+
+    for _ in range(EVENTS):
+        asyncio.run_coroutine_threadsafe(listener(time.perf_counter()), listener_loop)
+        await asyncio.sleep(0)
+    await done.wait()
+    listener_loop.call_soon_threadsafe(listener_loop.stop)
+    return latencies
+
+
+async def single_loop(ordered: bool):
+    latencies = []
+    emitter = EventEmitter()
+
+    async def on_event(sent):
+        latencies.append(time.perf_counter() - sent)
+
+    emitter.add_listener('on_event', on_event)
+    emitter.set_ordered('on_event', ordered)
+    for _ in range(EVENTS):
+        emitter.emit('on_event', time.perf_counter())
+        await asyncio.sleep(0)
+    while len(latencies) < EVENTS:
+        await asyncio.sleep(0)
+    await emitter.close()
+    return latencies
+
+
+def main():
+    report("thread + threadsafe", asyncio.run(threaded()))
+    report("single loop (concurrent)", asyncio.run(single_loop(False)))
+    report("single loop (ordered)", asyncio.run(single_loop(True)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+    Measures the memory used by each model object and the time taken to build one.
+
+    Usage: python benchmarks/models.py [count]
+
+    Compares the old models, which copied every payload key into the instance's `__dict__` with `setattr`, with the
+    `discord.model.Model` classes, which store declared fields in `__slots__`. Each slot costs 8 bytes whether it is set
+    or not, so only the fields Discord sends with most objects are declared, and rarely sent ones (e.g. a user's email
+    or a member's interaction permissions) are kept in `extra`. Guild members are the objects a large bot caches most
+    of, so they are measured with their user.
+
+    Then compares building a guild from GUILD_CREATE eagerly with building it lazily, where members, roles, channels
+    and emojis are only built when they are read.
+
+    Last, builds guilds which share their members, as the guilds of a bot often do, with a `User` for each membership
+    and with the users shared through a client's cache.
+"""
+import copy
+import gc
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, '.')
+
+from discord.client import Client
+from discord.flags import get_flags
+from discord.guild import Guild, GuildMember, GuildRole
+from discord.user import User
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+class OldUser:
+    def __init__(self, data: dict):
+        for k in data:
+            if k == "flags" or k == "public_flags":
+                setattr(self, f"_{k}", get_flags(data[k]))
+            else:
+                setattr(self, f"_{k}", data[k])
+
+
+class OldGuildMember:
+    def __init__(self, data: dict):
+        for key, value in data.items():
+            match (key):
+                case 'user':
+                    self._user = OldUser(value)
+                case _:
+                    setattr(self, f"_{key}", value)
+
+
+class OldGuildRole:
+    def __init__(self, data: dict):
+        for key, value in data.items():
+            setattr(self, f"_{key}", value)
+
+
+def member(i: int) -> dict:
+    # Discord leaves out some fields for some members, so payloads do not all have the same keys.
+    user = {
+        "id": str(80351110224678912 + i),
+        "username": f"user{i}",
+        "discriminator": "0",
+        "global_name": f"User {i}" if i % 2 else None,
+        "avatar": "8342729096ea3675442027381ff50dfe",
+        "avatar_decoration_data": None,
+        "public_flags": 0
+    }
+    if i % 10 == 0:
+        user["bot"] = True
+    data = {
+        "user": user,
+        "nick": f"nick{i}" if i % 3 == 0 else None,
+        "avatar": None,
+        "roles": ["41771983423143936"],
+        "joined_at": "2015-04-26T06:26:56.936000+00:00",
+        "premium_since": None,
+        "deaf": False,
+        "mute": False,
+        "pending": False,
+        "flags": 0
+    }
+    if i % 4 == 0:
+        data["communication_disabled_until"] = None
+    return data
+
+
+def role(i: int) -> dict:
+    return {
+        "id": str(41771983423143936 + i),
+        "name": f"role{i}",
+        "color": 3447003,
+        "hoist": True,
+        "icon": None,
+        "unicode_emoji": None,
+        "position": 1,
+        "permissions": "66321471",
+        "managed": False,
+        "mentionable": False
+    }
+
+
+def channel(i: int) -> dict:
+    return {"id": str(41771983423143937 + i), "type": 0, "name": f"channel{i}", "position": i, "topic": None,
+            "nsfw": False, "permission_overwrites": [], "parent_id": None, "rate_limit_per_user": 0}
+
+
+def guild(members: int) -> dict:
+    return {
+        "id": "41771983423143936",
+        "name": "guild",
+        "members": [member(i) for i in range(members)],
+        "roles": [role(i) for i in range(250)],
+        "channels": [channel(i) for i in range(200)],
+        "emojis": []
+    }
+
+
+def measure(name: str, cls, payloads: list[dict]):
+    # Building a guild through a client changes its payloads, so the build which is timed gets a copy of them.
+    fresh = copy.deepcopy(payloads)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = [cls(payload) for payload in payloads]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Building while tracing is slow, so the time is measured again without it.
+    del objects
+    gc.collect()
+    start = time.perf_counter()
+    objects = [cls(payload) for payload in fresh]
+    elapsed = time.perf_counter() - start
+    print(f"{name:<18} {size / len(payloads):8.0f} bytes/object   {elapsed / len(payloads) * 1e6:6.2f} us/object")
+    del objects
+
+
+if __name__ == '__main__':
+    members = [member(i) for i in range(COUNT)]
+    roles = [role(i) for i in range(COUNT)]
+    measure("old GuildMember", OldGuildMember, members)
+    measure("GuildMember", GuildMember, members)
+    measure("old GuildRole", OldGuildRole, roles)
+    measure("GuildRole", GuildRole, roles)
+    measure("old User", OldUser, [m["user"] for m in members])
+    measure("User", User, [m["user"] for m in members])
+    payloads = [guild(COUNT // 10) for _ in range(10)]
+    measure("eager Guild", Guild, payloads)
+    measure("lazy Guild", lambda data: Guild(data, lazy=True), payloads)
+    shared = [{**guild(COUNT // 10), "id": str(i)} for i in range(10)]
+    measure("separate users", Guild, shared)
+    client = Client([])
+    measure("shared users", lambda data: Guild(data, client), shared)
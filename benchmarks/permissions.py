@@ -0,0 +1,64 @@
+"""
+    Measures the time taken to check a member's permissions in a channel.
+
+    Usage: python benchmarks/permissions.py [checks]
+
+    Builds a guild with 50 roles and 100 channels, each with permission overwrites for @everyone, a few roles and a
+    member. Each member is checked in each channel once with the results forgotten, which computes them from the roles
+    and overwrites, and then many times, which finds the results computed before.
+"""
+import random
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from discord.guild import Guild
+from discord.permissions import Permissions
+
+CHECKS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+GUILD_ID = "41771983423143936"
+
+
+def overwrite(id: str, type: int) -> dict:
+    return {"id": id, "type": type, "allow": str(random.getrandbits(41)), "deny": str(random.getrandbits(41))}
+
+
+def guild() -> dict:
+    roles = [str(41771983423143937 + i) for i in range(50)]
+    members = [str(80351110224678912 + i) for i in range(1000)]
+    everyone = Permissions.VIEW_CHANNEL | Permissions.SEND_MESSAGES | Permissions.READ_MESSAGE_HISTORY
+    return {
+        "id": GUILD_ID,
+        "name": "guild",
+        "owner_id": members[0],
+        "roles": [{"id": GUILD_ID, "name": "@everyone", "permissions": str(everyone.value)}]
+                 + [{"id": id, "name": f"role{i}", "permissions": str(random.getrandbits(40) & ~8)}
+                    for i, id in enumerate(roles)],
+        "members": [{"user": {"id": id, "username": f"user{i}", "discriminator": "0"},
+                     "roles": random.sample(roles, 5)} for i, id in enumerate(members)],
+        "channels": [{"id": str(41771983423144000 + i), "type": 0, "name": f"channel{i}", "permission_overwrites":
+                      [{"id": GUILD_ID, "type": 0, "allow": "0", "deny": "2048"}]
+                      + [overwrite(id, 0) for id in random.sample(roles, 5)]
+                      + [overwrite(random.choice(members), 1)]} for i in range(100)]
+    }
+
+
+if __name__ == '__main__':
+    random.seed(0)
+    g = Guild(guild())
+    pairs = [(member, channel) for member in list(g.members)[:100] for channel in g.channels]
+
+    start = time.perf_counter()
+    for member, channel in pairs:
+        g.clear_permissions()
+        g.permissions_for(member, channel)
+    elapsed = time.perf_counter() - start
+    print(f"computed  {elapsed / len(pairs) * 1e6:6.2f} us/check")
+
+    checks = [random.choice(pairs) for _ in range(CHECKS)]
+    start = time.perf_counter()
+    for member, channel in checks:
+        g.permissions_for(member, channel)
+    elapsed = time.perf_counter() - start
+    print(f"memoized  {elapsed / CHECKS * 1e6:6.2f} us/check")
@@ -0,0 +1,83 @@
+"""
+    Runs `discord.utils.RESTClient` against a local stub of Discord's API which slows down and fails under load.
+
+    Usage: python benchmarks/rest_stub.py [requests] [capacity]
+
+    The stub handles `capacity` requests at once at full speed. Past that, each extra request in flight adds latency,
+    and some requests fail with a 503 or have their connection dropped. The client's adaptive limit, the retries and
+    the latency histogram of the route are printed at the end.
+"""
+import asyncio
+import random
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, '.')
+
+from discord.utils import RESTClient
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CAPACITY = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+BASE_LATENCY = 0.01
+FAILURE_RATE = 0.02
+
+
+def stub() -> web.Application:
+    in_flight = 0
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        nonlocal in_flight
+        in_flight += 1
+        try:
+            overload = max(0, in_flight - CAPACITY)
+            await asyncio.sleep(BASE_LATENCY * (1 + overload))
+            if random.random() < FAILURE_RATE * (1 + overload):
+                if random.random() < 0.5:
+                    request.transport.close()
+                    return web.Response()
+                return web.json_response({"message": "Service Unavailable"}, status=503)
+            return web.json_response({"id": request.match_info['id']})
+        finally:
+            in_flight -= 1
+
+    app = web.Application()
+    app.router.add_get('/channels/{id}', handle)
+    return app
+
+
+async def main():
+    runner = web.AppRunner(stub())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    failed = 0
+
+    async with aiohttp.ClientSession() as session:
+        rest = RESTClient('token', session, base_url=f'http://127.0.0.1:{port}')
+        rest.BACKOFF_BASE = 0.05
+
+        async def one(i: int):
+            nonlocal failed
+            try:
+                await rest.get(f'/channels/{100000000000000000 + i}')
+            except Exception:
+                failed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+        stats = rest.stats
+    await runner.cleanup()
+
+    print(f"{REQUESTS} requests in {elapsed:.2f} s, {failed} failed after retries")
+    print(f"final concurrency limit {stats['concurrency']['limit']:.1f} (stub capacity {CAPACITY})")
+    for route, route_stats in stats['routes'].items():
+        print(f"{route}: {route_stats}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
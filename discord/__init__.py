@@ -3,4 +3,5 @@
 """
 
 from .client import *
-from .intents import *
+from .file import *
+from .intents import *
\ No newline at end of file
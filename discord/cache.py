@@ -0,0 +1,411 @@
+from typing import Callable, Optional, Union
+from weakref import WeakValueDictionary
+
+from discord.channels import GuildChannel
+from discord.guild import Guild, GuildMember
+from discord.message import Message
+from discord.user import User
+from discord.utils import BoundedCache, CachePolicy, RingBuffer
+
+
+class MessageCache:
+    """
+    Keeps the most recent messages, so that edits and deletes can be given the message as it was. Messages are kept in
+    `discord.utils.RingBuffer`s, which overwrite their oldest message once they are full, so at most `maxsize *
+    channels` messages are kept in all. Looking up, updating and removing a message by ID takes constant time.
+
+    **Parameters:**
+    - maxsize: The most messages to keep in each channel, or in total if `channels` is not given.
+    - channels: Keep a separate buffer for each of this many channels, so that a busy channel does not push the
+    messages of quieter ones out. When this is reached, the buffer of the channel with the oldest activity is removed.
+    """
+    def __init__(self, maxsize: int, channels: Optional[int] = None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._buffer: Optional[RingBuffer] = None
+        self._channels: Optional[BoundedCache] = None
+        if channels is None:
+            self._buffer = RingBuffer(maxsize)
+        else:
+            self._channels = BoundedCache(CachePolicy.lru(channels), self._evict_channel)
+
+    @property
+    def stats(self) -> dict:
+        """The number of messages and channels kept, and the hits, misses and evictions of lookups by ID."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize if self._buffer is not None else self.maxsize * self._channels.policy.maxsize,
+            "channels": None if self._channels is None else len(self._channels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions
+        }
+
+    def __len__(self) -> int:
+        if self._buffer is not None:
+            return len(self._buffer)
+        return sum(len(buffer) for buffer in self._channels.values())
+
+    def _evict_channel(self, channel_id: str, buffer: RingBuffer):
+        self.evictions += len(buffer)
+
+    def _find(self, channel_id: str) -> Optional[RingBuffer]:
+        return self._buffer if self._buffer is not None else self._channels.peek(channel_id)
+
+    def add(self, message: Message):
+        """
+        Adds a message, overwriting the oldest one if its buffer is full.
+        """
+        buffer = self._buffer
+        if buffer is None:
+            # Reading the channel's buffer marks it as active.
+            buffer = self._channels.get(message.channel_id)
+            if buffer is None:
+                buffer = RingBuffer(self.maxsize)
+                self._channels.set(message.channel_id, buffer)
+        if buffer.append(message.id, message):
+            self.evictions += 1
+
+    def get(self, channel_id: str, message_id: str) -> Optional[Message]:
+        """
+        Gets a cached message.
+
+        **Parameters:**
+        - channel_id: The ID of the channel the message was sent in.
+        - message_id: The ID of the message.
+        """
+        buffer = self._find(channel_id)
+        message = None if buffer is None else buffer.get(message_id)
+        if message is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return message
+
+    def remove(self, channel_id: str, message_id: str) -> Optional[Message]:
+        """
+        Removes a cached message and returns it.
+        """
+        buffer = self._find(channel_id)
+        return None if buffer is None else buffer.pop(message_id)
+
+    def remove_many(self, channel_id: str, message_ids: list[str]) -> dict[str, Message]:
+        """
+        Removes cached messages from a channel in one pass, and returns those which were cached, keyed by ID.
+        """
+        buffer = self._find(channel_id)
+        if buffer is None:
+            return {}
+        return {message.id: message for message in buffer.pop_many(message_ids)}
+
+    def remove_channel(self, channel_id: str):
+        """
+        Removes the buffer of a deleted channel. With a single buffer for every channel, the channel's messages are
+        left to be overwritten instead, as finding them would mean searching the whole buffer.
+        """
+        if self._channels is not None:
+            self._channels.pop(channel_id)
+
+    def history(self, channel_id: str) -> list[Message]:
+        """
+        Gets the cached messages of a channel, oldest first.
+        """
+        if self._buffer is not None:
+            return [message for message in self._buffer if message.channel_id == channel_id]
+        buffer = self._channels.peek(channel_id)
+        return [] if buffer is None else list(buffer)
+
+    def clear(self):
+        """
+        Removes every message.
+        """
+        if self._buffer is not None:
+            self._buffer.clear()
+        else:
+            self._channels.clear()
+
+
+class ClientCache:
+    """
+    A cache for the client.
+
+    As well as the guilds, the cache keeps a map from each cached channel and thread to its guild, and from each
+    cached user to the guilds they are a member of, so that either can be found without searching every guild. Changes
+    to a cached guild's channels, threads and members should go through the cache so that these stay up to date.
+
+    Each user is one `discord.user.User` object, shared by their members in every guild, the emojis they made and their
+    messages, so memory grows with the number of users rather than memberships. These are held weakly, and freed once
+    nothing refers to them.
+
+    How many guilds, members and users are kept, and for how long, is set with a `discord.utils.CachePolicy` for each.
+    Members are counted across every guild, so `members=CachePolicy.expiring(600)` only keeps members seen in the last
+    10 minutes. A member is seen when they are added or updated, or when they send a message or start typing.
+
+    **Parameters:**
+    - guilds: How guilds are kept.
+    - members: How guild members are kept.
+    - users: How users are kept once nothing else refers to them. Users are always kept while a cached member or message
+    refers to them, and this decides how many of the users seen in events (e.g. message authors and users who left
+    a guild) are kept past that. If this is not given, no more are kept.
+    - member_filter: Decides from a member's payload whether they are cached at all, e.g.
+    `lambda data: data['user'].get('bot')` to only cache bots.
+    - messages: The `MessageCache` to keep recent messages in. If this is not given, messages are not cached.
+    """
+    def __init__(self, guilds: Optional[CachePolicy] = None, members: Optional[CachePolicy] = None,
+                 users: Optional[CachePolicy] = None, member_filter: Optional[Callable[[dict], bool]] = None,
+                 messages: Optional[MessageCache] = None):
+        self.users = BoundedCache(users or CachePolicy.disabled())
+        self._interned: WeakValueDictionary[str, User] = WeakValueDictionary()
+        self._guilds = BoundedCache(guilds, lambda id, guild: self._unindex_guild(guild))
+        self.member_policy = members or CachePolicy.keep_all()
+        self.member_filter = member_filter
+        # Members are only tracked across guilds when they can be evicted.
+        self._members: Optional[BoundedCache] = None
+        if self.member_policy.enabled and self.member_policy.bounded:
+            self._members = BoundedCache(self.member_policy, self._evict_member)
+        self._channel_guilds: dict[str, str] = {}
+        # Most users share only one guild with the bot, so a single guild ID is stored instead of a set until then.
+        self._user_guilds: dict[str, Union[str, set[str]]] = {}
+        self.messages = messages
+        self._user: User
+
+    @property
+    def stats(self) -> dict:
+        """The size, hits, misses, evictions and expirations of the guild, member, user and message caches."""
+        if self._members is not None:
+            members = self._members.stats
+        else:
+            members = {"size": sum(len(guild.members or ()) for guild in self._guilds.values())}
+        return {
+            "guilds": self._guilds.stats,
+            "members": members,
+            "users": {**self.users.stats, "interned": len(self._interned)},
+            "messages": None if self.messages is None else self.messages.stats
+        }
+
+    def intern_user(self, data: dict, update: bool = False) -> User:
+        """
+        Gets the one `discord.user.User` for a user's payload, building it the first time the user is seen.
+
+        **Parameters:**
+        - data: The user's payload.
+        - update: Whether to update a user who was already seen from the payload. Only payloads from new events should
+        do this, as a lazily built guild may hold payloads older than the user. These users are also kept according
+        to the user policy.
+        """
+        user = self._interned.get(data['id'])
+        if user is None:
+            user = self._interned[data['id']] = User(data)
+        elif update:
+            user.update(data)
+        if update:
+            self.users.set(user.id, user)
+        return user
+
+    def _share(self, user: User) -> User:
+        # A user who was already seen keeps their object, which other models refer to, and takes the new state.
+        shared = self._interned.setdefault(user.id, user)
+        if shared is not user:
+            shared.__setstate__(user.__getstate__())
+        return shared
+
+    def update_user(self, user: User) -> User:
+        """
+        Keeps a user in the cache according to the user policy.
+
+        **Returns:**
+        - User: The user's shared object, which is `user` unless the user was already seen.
+        """
+        user = self._share(user)
+        self.users.set(user.id, user)
+        return user
+
+    def get_user(self, id: str) -> Optional[User]:
+        """
+        Get a user from the cache.
+        """
+        user = self.users.get(id)
+        return user if user is not None else self._interned.get(id)
+
+    def get_guild(self, id: str) -> Optional[Guild]:
+        """
+        Get a guild from the cache.
+        """
+        return self._guilds.get(id)
+
+    def wants_member(self, data: dict) -> bool:
+        """
+        Whether a member should be cached, according to the member policy and filter.
+
+        **Parameters:**
+        - data: The member's payload.
+        """
+        return self.member_policy.enabled and (self.member_filter is None or self.member_filter(data))
+
+    def filter_members(self, data: dict):
+        """
+        Removes the members which should not be cached from a GUILD_CREATE payload, before the guild is built.
+        """
+        if 'members' in data and (self.member_filter is not None or not self.member_policy.enabled):
+            data['members'] = [member for member in data['members'] if self.wants_member(member)]
+
+    def update_guild(self, guild: Guild):
+        old = self._guilds.peek(guild.id)
+        if old is not None and old is not guild:
+            self._unindex_guild(old)
+        self._guilds.set(guild.id, guild)
+        if guild.id not in self._guilds:
+            return
+        for items in (guild.channels, guild.threads):
+            for channel_id in items.ids() if items is not None else ():
+                self._channel_guilds[channel_id] = guild.id
+        # A copy, as tracking members may evict some of this guild's members.
+        for user_id in tuple(guild.members.ids()) if guild.members is not None else ():
+            self._link_user(user_id, guild.id)
+            if self._members is not None:
+                self._members.set((guild.id, user_id), None)
+
+    def remove_guild(self, id: str) -> Optional[Guild]:
+        """
+        Remove a guild from the cache.
+        """
+        guild = self._guilds.pop(id)
+        if guild is not None:
+            self._unindex_guild(guild)
+        return guild
+
+    def _unindex_guild(self, guild: Guild):
+        for items in (guild.channels, guild.threads):
+            for channel_id in items.ids() if items is not None else ():
+                self._channel_guilds.pop(channel_id, None)
+                if self.messages is not None:
+                    self.messages.remove_channel(channel_id)
+        for user_id in guild.members.ids() if guild.members is not None else ():
+            self._unlink_user(user_id, guild.id)
+            if self._members is not None:
+                self._members.pop((guild.id, user_id))
+
+    def _link_user(self, user_id: str, guild_id: str):
+        guilds = self._user_guilds.get(user_id)
+        if guilds is None:
+            self._user_guilds[user_id] = guild_id
+        elif type(guilds) is str:
+            if guilds != guild_id:
+                self._user_guilds[user_id] = {guilds, guild_id}
+        else:
+            guilds.add(guild_id)
+
+    def _unlink_user(self, user_id: str, guild_id: str):
+        guilds = self._user_guilds.get(user_id)
+        if guilds == guild_id:
+            del self._user_guilds[user_id]
+        elif type(guilds) is set:
+            guilds.discard(guild_id)
+            if len(guilds) == 1:
+                self._user_guilds[user_id] = guilds.pop()
+
+    @property
+    def tracks_members(self) -> bool:
+        """Whether members are evicted by the member policy, so the client has to tell the cache when it sees them."""
+        return self._members is not None
+
+    def mark_member_seen(self, guild_id: str, user_id: str):
+        """
+        Marks a cached member as seen, e.g. because they sent a message, so that the member policy keeps them longer.
+        Members who are not cached are left alone.
+        """
+        key = (guild_id, user_id)
+        if self._members is not None and key in self._members:
+            self._members.set(key, None)
+
+    def _evict_member(self, key: tuple[str, str], value: None):
+        guild_id, user_id = key
+        guild = self._guilds.peek(guild_id)
+        if guild is not None:
+            # Evicted members are dropped as they are, as building one only to throw it away would be wasted.
+            guild.discard_member(user_id)
+        self._unlink_user(user_id, guild_id)
+
+    def get_channel_guild(self, channel_id: str) -> Optional[Guild]:
+        """
+        Get the cached guild a channel or thread belongs to.
+        """
+        guild_id = self._channel_guilds.get(channel_id)
+        return None if guild_id is None else self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id: str) -> Optional[GuildChannel]:
+        """
+        Get a cached channel or thread from any guild.
+        """
+        guild = self.get_channel_guild(channel_id)
+        if guild is None:
+            return None
+        return guild.get_channel(channel_id) or guild.get_thread(channel_id)
+
+    def get_user_guilds(self, user_id: str) -> list[Guild]:
+        """
+        Get the cached guilds a user is a member of.
+        """
+        guilds = self._user_guilds.get(user_id)
+        if guilds is None:
+            return []
+        if type(guilds) is str:
+            return [self._guilds.peek(guilds)]
+        return [self._guilds.peek(guild_id) for guild_id in guilds]
+
+    def add_channel(self, guild: Guild, channel: GuildChannel, thread: bool = False):
+        """
+        Add a channel or thread to a cached guild.
+        """
+        if thread:
+            guild.add_thread(channel)
+        else:
+            guild.add_channel(channel)
+        self._channel_guilds[channel.id] = guild.id
+
+    def remove_channel(self, guild: Guild, channel_id: str, thread: bool = False) -> Optional[GuildChannel]:
+        """
+        Remove a channel or thread from a cached guild.
+        """
+        self._channel_guilds.pop(channel_id, None)
+        if self.messages is not None:
+            self.messages.remove_channel(channel_id)
+        return guild.remove_thread(channel_id) if thread else guild.remove_channel(channel_id)
+
+    def add_member(self, guild: Guild, member: GuildMember):
+        """
+        Add a member to a cached guild, or mark a cached member as seen.
+        """
+        guild.add_member(member)
+        self._link_user(member.user.id, guild.id)
+        if self._members is not None:
+            self._members.set((guild.id, member.user.id), None)
+
+    def remove_member(self, guild: Guild, user_id: str) -> Optional[GuildMember]:
+        """
+        Remove a member from a cached guild.
+        """
+        self._unlink_user(user_id, guild.id)
+        if self._members is not None:
+            self._members.pop((guild.id, user_id))
+        return guild.remove_member(user_id)
+
+    @property
+    def guilds(self) -> list:
+        """
+        Get a list of all guilds in the cache.
+        """
+        return self._guilds.values()
+
+    @property
+    def user(self) -> User:
+        """The cached `discord.user.User` associated with the client."""
+        return self._user
+
+    @user.setter
+    def user(self, user: User):
+        self._user = self._share(user)
@@ -1,9 +1,15 @@
 from __future__ import annotations
 from enum import IntEnum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
+
+from discord.file import File
+from discord.message import Message
+from discord.model import Model
+from discord.permissions import PermissionOverwrite, Permissions
+from discord.utils import Paginator
 
 if TYPE_CHECKING:
-    from discord.guild import Guild
+    from discord.guild import Guild, GuildMember
 
 class ChannelType(IntEnum):
     GUILD_TEXT = 0
@@ -18,21 +24,27 @@ class ChannelType(IntEnum):
     GUILD_STAGE_VOICE = 13
     GUILD_DIRECTORY = 14
 
-class GuildChannel:
+class GuildChannel(Model):
     _id: str
     _guild: Guild
+    _guild_id: str
     _name: str
     _type: ChannelType
     _position: int
     _nsfw: bool
-    _permission_overwrites: list
+    _permission_overwrites: dict[str, PermissionOverwrite]
     _parent_id: str | None
     _flags: int
 
+    # Overwrites are keyed by the ID of their role or user, so each is found directly when computing permissions.
+    _parsers = {
+        'permission_overwrites': lambda self, value: {overwrite['id']: PermissionOverwrite(overwrite)
+                                                      for overwrite in value}
+    }
+
     def __init__(self, data: dict, guild: Guild):
         self._guild = guild
-        for key, value in data.items():
-            setattr(self, f"_{key}", value)
+        super().__init__(data)
 
     def __repr__(self) -> str:
         return f"<GuildChannel id={self._id} name={self._name}>"
@@ -62,8 +74,8 @@ class GuildChannel:
         return self._nsfw
 
     @property
-    def permission_overwrites(self) -> list:
-        return self._permission_overwrites
+    def permission_overwrites(self) -> list[PermissionOverwrite]:
+        return [] if self._permission_overwrites is None else list(self._permission_overwrites.values())
 
     @property
     def parent_id(self) -> str:
@@ -73,10 +85,62 @@ class GuildChannel:
     def flags(self) -> int:
         return self._flags
 
+    def permissions_for(self, member: GuildMember) -> Permissions:
+        """
+        Gets a member's permissions in the channel. See `discord.guild.Guild.permissions_for`.
+        """
+        return self._guild.permissions_for(member, self)
+
+    def history(self, limit: Optional[int] = 100, before: Optional[str] = None,
+                after: Optional[str] = None) -> Paginator:
+        """
+        Fetches the channel's messages from the API, newest first, or oldest first if `after` is given. The next page
+        is fetched while the current one is being handled.
+
+        ```python
+        async for message in channel.history(limit=500):
+            print(message.content)
+        ```
+
+        **Parameters:**
+        - limit: The most messages to fetch, or `None` for every message.
+        - before: Only fetch messages older than this ID.
+        - after: Only fetch messages newer than this ID.
+        """
+        return Paginator(self._guild.rest_client, f"/channels/{self._id}/messages", 100, limit, before, after,
+                         convert=self._build_message)
+
+    def _build_message(self, message: dict) -> Message:
+        # Messages from the API leave out the guild's ID, unlike those sent over the gateway.
+        message.setdefault('guild_id', self._guild.id)
+        client = self._guild._client
+        # Webhooks send a different name and avatar with each message under the webhook's ID, so they are not shared.
+        if client is not None and type(message.get('author')) is dict and 'webhook_id' not in message:
+            message['author'] = client.client_cache.intern_user(message['author'])
+        return Message(message)
+
+    async def send(self, content: Optional[str] = None, files: Optional[list[File]] = None, **fields) -> dict:
+        """
+        Sends a message to the channel. Files are streamed from disk as they are uploaded.
+
+        ```python
+        await channel.send("Here are the logs", files=[discord.File('bot.log')])
+        ```
+
+        **Parameters:**
+        - content: The text of the message.
+        - files: Files to attach to the message.
+        - fields: Other fields of the message, such as `embeds` or `message_reference`.
+
+        **Returns:**
+        - dict: The message that was sent.
+        """
+        payload = {**fields}
+        if content is not None:
+            payload['content'] = content
+        return await self._guild.rest_client.post(f"/channels/{self._id}/messages", payload, files)
+
 class CategoryChannel(GuildChannel):
-    
-    def __init__(self, data: dict, guild: Guild):
-        super().__init__(data, guild)
 
     def __repr__(self) -> str:
         return f"<CategoryChannel id={self._id} name={self._name}>"
@@ -104,11 +168,6 @@ class TextChannel(GuildChannel):
     def default_auto_archive_duration(self) -> int:
         return self._default_auto_archive_duration
 
-    def __init__(self, data: dict, guild: Guild):
-        super().__init__(data, guild)
-        for key, value in data.items():
-            setattr(self, f"_{key}", value)
-
     def __repr__(self) -> str:
         return f"<TextChannel id={self._id} name={self._name}>"
 
@@ -129,11 +188,6 @@ class VoiceChannel(GuildChannel):
     def rtc_region(self) -> str:
         return self._rtc_region
 
-    def __init__(self, data: dict, guild: Guild):
-        super().__init__(data, guild)
-        for key, value in data.items():
-            setattr(self, f"_{key}", value)
-
     def __repr__(self) -> str:
         return f"<VoiceChannel id={self._id} name={self._name}>"
 
@@ -158,10 +212,5 @@ class AnnouncementChannel(GuildChannel):
     def default_auto_archive_duration(self) -> int:
         return self._default_auto_archive_duration
 
-    def __init__(self, data: dict, guild: Guild):
-        super().__init__(data, guild)
-        for key, value in data.items():
-            setattr(self, f"_{key}", value)
-
     def __repr__(self) -> str:
         return f"<AnnouncementChannel id={self._id} name={self._name}>"
\ No newline at end of file
@@ -1,119 +1,97 @@
 import asyncio
-from enum import IntEnum
-import json
-import sys
-import threading
+import itertools
 import warnings
-from typing import Optional, Coroutine, Any, Callable
-import zlib
+from typing import AsyncIterator, Optional, Coroutine, Any, Callable, Union
 import aiohttp
 import websockets
 
-from discord.guild import Guild
+from discord.cluster import ClusterWorker
+from discord.cache import ClientCache
+from discord.guild import Guild, GuildMember, GuildRole
+from discord.message import Message
 
-from .utils import EventEmitter, RESTClient
+from .utils import Codec, DispatchQueue, EventEmitter, HTTPPool, OverflowPolicy, RESTCache, RESTClient
+from .utils.rest_cache import INVALIDATIONS
 from .intents import Intents, get_number
+from .shard import GatewayEvents, Shard, ShardManager, ShardStatus
 from .user import User
 
-
-class GatewayEvents(IntEnum):
-    """
-    Contains constants for the gateway opcodes.
-    """
-    DISPATCH = 0
-    """An event was dispatched."""
-    HEARTBEAT = 1
-    """Sent at regular intervals by the client to keep the gateway connection alive."""
-    IDENTIFY = 2
-    """Used to identify yourself with the token during the initial handshake."""
-    PRESENCE = 3
-    """Used to update the client's presence."""
-    VOICE_STATE = 4
-    """Used to join and leave voice channels."""
-    VOICE_PING = 5
-    RESUME = 6
-    """Used to resume a disconnected session."""
-    RECONNECT = 7
-    """Used to reconnect to the session."""
-    REQUEST_MEMBERS = 8
-    """Used to request information about guild members when there are too many for """
-    INVALIDATE_SESSION = 9
-    """Means that the session is invalid. When this is received, you must reconnect and re-identify."""
-    HELLO = 10
-    """Acknowledgement of gateway connection."""
-    HEARTBEAT_ACK = 11
-    """Acknowledgement of gateway heartbeat."""
-    GUILD_SYNC = 12
-
-
-class ClientCache:
-    """
-    A cache for the client.
-    """
-    def __init__(self):
-        self.users = {}
-        self._guilds = {}
-        self._user: User
-
-    def update_user(self, user: User):
-        self.users[user.id] = user
-
-    def get_user(self, id: str) -> Optional[User]:
-        """
-        Get a user from the cache.
-        """
-        return self.users.get(id)
-
-    def get_guild(self, id: str) -> Optional[Guild]:
-        """
-        Get a guild from the cache.
-        """
-        return self._guilds.get(id)
-
-    def update_guild(self, guild: Guild):
-        self._guilds[guild.id] = guild
-    
-    @property
-    def guilds(self) -> list:
-        """
-        Get a list of all guilds in the cache.
-        """
-        return list(self._guilds.values())
-    
-    @property
-    def user(self) -> User:
-        """The cached `discord.user.User` associated with the client."""
-        return self._user
-
-    @user.setter
-    def user(self, user: User):
-        self._user = user
-
+# Events whose handlers only keep the message cache up to date, so they are not needed without it or a listener.
+_MESSAGE_EVENTS = frozenset({'MESSAGE_CREATE', 'MESSAGE_UPDATE', 'MESSAGE_DELETE', 'MESSAGE_DELETE_BULK'})
+# Events which show a member is active, so they are needed to keep members cached under an expiring member policy.
+_MEMBER_ACTIVITY_EVENTS = frozenset({'MESSAGE_CREATE', 'TYPING_START'})
 
 class Client:
     """
     Represents a Discord client (i.e. a bot).
     You need to initialise one of these and then use `run()` with a token to login.
+
+    **Parameters:**
+    - intents: The gateway intents to use.
+    - shard_count: The total number of shards. If this is not given, the number recommended by Discord is used.
+    - shard_ids: The IDs of the shards this client should run. If this is not given, every shard is run.
+    - gateway_url: The gateway URL to connect to instead of the one given by Discord, e.g. a local test gateway.
+    - compress: The transport compression to use, either `zlib-stream` or `zstd-stream` (which needs the `zstandard`
+    package). This greatly reduces the bandwidth used by large READY and GUILD_CREATE payloads.
+    - encoding: The gateway encoding, either `json` or `etf`, or a `discord.utils.codec.Codec`. `orjson` and `erlpack`
+    are used to speed these up if they are installed.
+    - max_concurrency: The most event listener calls that can run at once. If this is not given, there is no limit.
+    - queue_size: The most events that can wait between the shards and the dispatch workers.
+    - dispatch_workers: The number of tasks handling queued events. With more than one, events may be handled out of
+    order.
+    - overflow: The `discord.utils.dispatch_queue.OverflowPolicy` of each event when the queue is full, keyed by event
+    name, e.g. `{'PRESENCE_UPDATE': OverflowPolicy.COALESCE}`. Events which are not given block. Only the events in
+    `discord.utils.dispatch_queue.COALESCE_KEYS` can be coalesced.
+    - rest_cache: Whether to cache REST GET responses, or the `discord.utils.rest_cache.RESTCache` to use. Cached
+    responses are removed when a gateway event makes them out of date.
+    - http_pool: The `discord.utils.http.HTTPPool` to send requests with. This can be shared between clients. If this
+    is not given, the client creates its own.
+    - warm_connections: How many connections to the API are opened while the client starts up.
+    - cache: The `discord.cache.ClientCache` to keep guilds, members, users and messages in, which decides how many of
+    each are kept and for how long. If this is not given, everything but messages is kept.
+    - lazy_models: Whether a guild's members, roles, channels and emojis are kept as raw payloads and only built into
+    objects when they are read. This makes GUILD_CREATE cheaper when the bot only uses a few of them.
     """
     _token: str
     rest_client: RESTClient
-    client_cache: ClientCache = ClientCache()
+    client_cache: ClientCache
 
     async def user(self):
         """The `discord.user.User` associated with the client."""
         data = await self.rest_client.get('/users/@me')
-        user = User(data)
+        user = self.client_cache.intern_user(data, update=True)
         self.client_cache.user = user
         return user
 
+    @property
+    def ready(self) -> bool:
+        """Whether every shard has received READY."""
+        return self.shard_manager.ready
+
+    @property
+    def shards(self) -> dict[int, Shard]:
+        """The client's shards, keyed by shard ID."""
+        return self.shard_manager.shards
+
+    @property
+    def latency(self) -> float:
+        """The average heartbeat latency of the client's shards in seconds."""
+        latencies = list(self.shard_manager.latencies.values())
+        if not latencies:
+            return float('inf')
+        return sum(latencies) / len(latencies)
+
     @property
     def cache(self) -> ClientCache:
         """The cache for the client."""
         return self.client_cache
     
-    def __init__(self, intents: list[Intents]):
-        self.gateway = None
-        self.loop = asyncio.get_event_loop()
+    def __init__(self, intents: list[Intents], shard_count: Optional[int] = None, shard_ids: Optional[list[int]] = None,
+                 gateway_url: Optional[str] = None, compress: Optional[str] = None, encoding: Union[str, Codec] = 'json',
+                 max_concurrency: Optional[int] = None, queue_size: int = 1000, dispatch_workers: int = 1,
+                 overflow: Optional[dict[str, OverflowPolicy]] = None, rest_cache: Union[bool, RESTCache] = False,
+                 http_pool: Optional[HTTPPool] = None, warm_connections: int = 2, cache: Optional[ClientCache] = None,
+                 lazy_models: bool = False):
         if Intents.MESSAGE_CONTENT in intents:
             warnings.warn("Message Content will become a privileged intent in August 2022. You must enable it in the "
                           "Discord developer portal.")
@@ -121,226 +99,464 @@ class Client:
             warnings.warn("You are using one or more privileged intent (Guild Members and/or Guild Presences). You "
                           "must enable them in the Discord developer portal.")
         self.code: int = get_number(intents)
-        self.event_emitter = EventEmitter()
-        self.buffer = bytearray()
-        self.inflator = zlib.decompressobj()
-        self.heartbeat_interval: int = None
-        self.ready: bool = False
+        self.event_emitter = EventEmitter(max_concurrency)
+        self.dispatch_queue = DispatchQueue(queue_size, overflow)
+        self.dispatch_workers = dispatch_workers
+        self._workers: list[asyncio.Task] = []
+        self.shard_manager = ShardManager(self, shard_count, shard_ids, gateway_url, compress, encoding)
+        self.cluster: Optional[ClusterWorker] = None
+        self._listener_names: dict[str, str] = {}
+        self._handlers: dict[str, Callable[[dict, Shard], None]] = {
+            'READY': self._handle_ready,
+            'RESUMED': self._handle_resumed,
+            'GUILD_CREATE': self._handle_guild_create,
+            'GUILD_UPDATE': self._handle_guild_update,
+            'GUILD_DELETE': self._handle_guild_delete,
+            'CHANNEL_CREATE': self._handle_channel_create,
+            'CHANNEL_UPDATE': self._handle_channel_update,
+            'CHANNEL_DELETE': self._handle_channel_delete,
+            'THREAD_CREATE': self._handle_thread_create,
+            'THREAD_UPDATE': self._handle_thread_update,
+            'THREAD_DELETE': self._handle_thread_delete,
+            'GUILD_EMOJIS_UPDATE': self._handle_guild_emojis_update,
+            'GUILD_MEMBER_ADD': self._handle_guild_member_add,
+            'GUILD_MEMBER_UPDATE': self._handle_guild_member_update,
+            'GUILD_MEMBER_REMOVE': self._handle_guild_member_remove,
+            'GUILD_ROLE_CREATE': self._handle_guild_role_create,
+            'GUILD_ROLE_UPDATE': self._handle_guild_role_update,
+            'GUILD_ROLE_DELETE': self._handle_guild_role_delete,
+            'GUILD_MEMBERS_CHUNK': self._handle_guild_members_chunk,
+            'MESSAGE_CREATE': self._handle_message_create,
+            'MESSAGE_UPDATE': self._handle_message_update,
+            'MESSAGE_DELETE': self._handle_message_delete,
+            'MESSAGE_DELETE_BULK': self._handle_message_delete_bulk,
+            'TYPING_START': self._handle_typing_start,
+            'USER_UPDATE': self._handle_user_update,
+            'PRESENCE_UPDATE': self._handle_presence_update
+        }
+        self.rest_cache: Optional[RESTCache] = RESTCache() if rest_cache is True else rest_cache or None
+        self.http_pool = http_pool or HTTPPool()
+        self.warm_connections = warm_connections
+        self.client_cache = cache or ClientCache()
+        self.lazy_models = lazy_models
+        self._member_requests: dict[str, asyncio.Queue] = {}
+        self._nonces = itertools.count()
 
     async def connect(self):
         """
-        Connects to the Discord gateway and begins sending heartbeats.
+        Connects every shard to the Discord gateway.
         This should not be called manually.
-
-        **Parameters:**
-        - token: Your bot token.
-        - intent_code: The number which represents the `discord.intents.Intents` being used.
         """
-        timeout = aiohttp.ClientTimeout(total=60)
-        self.rest_client = RESTClient(self._token, aiohttp.ClientSession(headers={
-            "Authorization": f"Bot {self._token}",
-            "User-Agent": "DiscordBot (https://github.com/mounderfod/discobra 0.0.1)"
-        }, timeout=timeout))
-        async with self.rest_client.session.ws_connect("wss://gateway.discord.gg/?v=10&encoding=json") as gateway:
-            self.gateway = gateway
-            threading.Thread(target=self.loop.run_forever).start()
-            while True:
-                await self.poll_event()
+        session = self.http_pool.open()
+        self.rest_client = RESTClient(self._token, session, cache=self.rest_cache, base_url=self.http_pool.base_url)
+        self._workers = [asyncio.create_task(self._dispatch_worker()) for _ in range(self.dispatch_workers)]
+        try:
+            await self.http_pool.warm_up(self.warm_connections)
+            await self.shard_manager.start()
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            await self.http_pool.close()
 
     async def send(self, data: dict):
         """
-        Send data to the gateway.
+        Send data to the gateway through the first shard.
 
         **Parameters:**
         - data: The data to send to the gateway.
         """
-        await self.gateway.send_str(json.dumps(data))
+        shard = next(iter(self.shard_manager.shards.values()))
+        await shard.send(data)
 
-    async def recv(self, msg):
+    def listener_name(self, event: str) -> str:
         """
-        Receive data from the gateway.
+        Gets the name of the listener for a gateway event, e.g. `on_message_create` for `MESSAGE_CREATE`.
+
+        **Parameters:**
+        - event: The name of the event.
         """
-        if type(msg) is bytes:
-            self.buffer.extend(msg)
-            if len(msg) < 4 or msg[-4:] != b'\x00\x00\xff\xff':
-                return
-
-            msg = self.inflator.decompress(self.buffer)
-            msg.decode('utf-8')
-            self.buffer = bytearray()
-        msg = json.loads(msg)
-        opcode = msg['op']
-        data = msg['d']
-        sequence = msg['s']
-
-        if opcode != GatewayEvents.DISPATCH:
-            if opcode == GatewayEvents.RECONNECT:
-                return await self.close()
-
-            if opcode == GatewayEvents.HELLO:
-                self.heartbeat_interval = data['heartbeat_interval']
-                asyncio.run_coroutine_threadsafe(self.heartbeat(self.heartbeat_interval), self.loop)
-                return await self.identify()
-
-            if opcode == GatewayEvents.HEARTBEAT_ACK:
-                return await self.heartbeat(self.heartbeat_interval)
-
-            if opcode == GatewayEvents.HEARTBEAT:
-                return await self.heartbeat(self.heartbeat_interval)
-
-        event = msg['t']
-
-        print(f"{event}")
-
-        match(event):
-            case 'READY':
-                self.ready = True
-                self.client_cache.user = User(data['user'])
-                return self.event_emitter.emit('on_ready')
-            case 'APPLICATION_COMMAND_PERMISSIONS_UPDATE':
-                return self.event_emitter.emit('on_application_command_permissions_update')
-            case 'CHANNEL_CREATE':
-                return self.event_emitter.emit('on_channel_create', data)
-            case 'CHANNEL_DELETE':
-                return self.event_emitter.emit('on_channel_delete', data)
-            case 'CHANNEL_UPDATE':
-                return self.event_emitter.emit('on_channel_update', data)
-            case 'CHANNEL_PINS_ACK':
-                return self.event_emitter.emit('on_channel_pins_ack', data)
-            case 'CHANNEL_PINS_UPDATE':
-                return self.event_emitter.emit('on_channel_pins_update', data)
-            case 'GUILD_CREATE':
-                self.client_cache.update_guild(Guild(data))
-                return self.event_emitter.emit('on_guild_create', Guild(data))
-            case 'GUILD_DELETE':
-                return self.event_emitter.emit('on_guild_delete', data)
-            case 'GUILD_UPDATE':
-                return self.event_emitter.emit('on_guild_update', data)
-            case 'GUILD_BAN_ADD':
-                return self.event_emitter.emit('on_guild_ban_add', data)
-            case 'GUILD_BAN_REMOVE':
-                return self.event_emitter.emit('on_guild_ban_remove', data)
-            case 'GUILD_EMOJIS_UPDATE':
-                return self.event_emitter.emit('on_guild_emojis_update', data)
-            case 'GUILD_INTEGRATIONS_UPDATE':
-                return self.event_emitter.emit('on_guild_integrations_update', data)
-            case 'GUILD_MEMBER_ADD':
-                return self.event_emitter.emit('on_guild_member_add', data)
-            case 'GUILD_MEMBER_REMOVE':
-                return self.event_emitter.emit('on_guild_member_remove', data)
-            case 'GUILD_MEMBER_UPDATE':
-                return self.event_emitter.emit('on_guild_member_update', data)
-            case 'GUILD_MEMBERS_CHUNK':
-                return self.event_emitter.emit('on_guild_members_chunk', data)
-            case 'GUILD_ROLE_CREATE':
-                return self.event_emitter.emit('on_guild_role_create', data)
-            case 'GUILD_ROLE_DELETE':
-                return self.event_emitter.emit('on_guild_role_delete', data)
-            case 'GUILD_ROLE_UPDATE':
-                return self.event_emitter.emit('on_guild_role_update', data)
-            case 'GUILD_SYNC':
-                return self.event_emitter.emit('on_guild_sync', data)
-            case 'GUILD_MEMBERS_CHUNK':
-                return self.event_emitter.emit('on_guild_members_chunk', data)
-            case 'MESSAGE_CREATE':
-                return self.event_emitter.emit('on_message_create', data)
-            case 'MESSAGE_DELETE':
-                return self.event_emitter.emit('on_message_delete', data)
-            case 'MESSAGE_DELETE_BULK':
-                return self.event_emitter.emit('on_message_delete_bulk', data)
-            case 'MESSAGE_UPDATE':
-                return self.event_emitter.emit('on_message_update', data)
-            case 'MESSAGE_REACTION_ADD':
-                return self.event_emitter.emit('on_message_reaction_add', data)
-            case 'MESSAGE_REACTION_REMOVE':
-                return self.event_emitter.emit('on_message_reaction_remove', data)
-            case 'MESSAGE_REACTION_REMOVE_ALL':
-                return self.event_emitter.emit('on_message_reaction_remove_all', data)
-            case 'MESSAGE_REACTION_REMOVE_EMOJI':
-                return self.event_emitter.emit('on_message_reaction_remove_emoji', data)
-            case 'PRESENCE_UPDATE':
-                return self.event_emitter.emit('on_presence_update', data)
-            case 'TYPING_START':
-                return self.event_emitter.emit('on_typing_start', data)
-            case 'USER_UPDATE':
-                return self.event_emitter.emit('on_user_update', data)
-            case 'VOICE_STATE_UPDATE':
-                return self.event_emitter.emit('on_voice_state_update', data)
-            case 'VOICE_SERVER_UPDATE':
-                return self.event_emitter.emit('on_voice_server_update', data)
-            case 'WEBHOOKS_UPDATE':
-                return self.event_emitter.emit('on_webhooks_update', data)
+        name = self._listener_names.get(event)
+        if name is None:
+            name = self._listener_names[event] = f"on_{event.lower()}"
+        return name
 
-    async def close(self):
+    def wants(self, event: str, payload: Union[str, bytes, None] = None) -> bool:
         """
-        Close the client.
+        Whether an event is used by the client, either to update the cache or because a listener is registered for it.
+        Shards skip decoding events which are not wanted.
+
+        **Parameters:**
+        - event: The name of the event.
+        - payload: The raw payload of the event, if it is known. Without a listener, presences are only wanted when
+        this shows they change the user.
         """
-        self.loop.stop()
-        await self.gateway.close()
-
-    async def poll_event(self):
-        async for msg in self.gateway:
-            if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
-                await self.recv(msg.data)
-            elif msg.type == aiohttp.WSMsgType.CLOSED:
-                break
-            elif msg.type == aiohttp.WSMsgType.ERROR:
-                break
-
-    async def heartbeat(self, interval: int):
+        if self.listener_name(event) in self.event_emitter.listeners:
+            return True
+        if event in _MEMBER_ACTIVITY_EVENTS and self.client_cache.tracks_members:
+            return True
+        if event == 'TYPING_START':
+            return False
+        if event in _MESSAGE_EVENTS and self.client_cache.messages is None:
+            return self.rest_cache is not None and event in INVALIDATIONS
+        if event == 'PRESENCE_UPDATE':
+            # Presences are the most frequent event by far, and most only change the status or activities, with just
+            # the user's ID sent. Only those which send changed user fields are needed to update the cached user.
+            if payload is None:
+                return True
+            return '"username"' in payload if type(payload) is str else b'"username"' in payload
+        return event in self._handlers or (self.rest_cache is not None and event in INVALIDATIONS)
+
+    async def _dispatch_worker(self):
+        while True:
+            event, data, shard = await self.dispatch_queue.get()
+            try:
+                await self.dispatch(event, data, shard)
+            except Exception as e:
+                asyncio.get_running_loop().call_exception_handler({
+                    "message": f"Exception while handling {event}",
+                    "exception": e
+                })
+
+    async def dispatch(self, event: str, data: dict, shard: Shard):
         """
-        Sends a heartbeat through the gateway to keep the connection active.
+        Handle an event dispatched by one of the client's shards.
         This should not be called manually.
 
         **Parameters:**
-        - gateway: The gateway to keep open.
-        - interval: How often to send a heartbeat. This is given by the gateway in a Hello packet.
+        - event: The name of the event.
+        - data: The data sent with the event.
+        - shard: The shard which received the event.
         """
-        await asyncio.sleep(interval / 1000)
-        heartbeat = {
-            "op": 1,
-            "d": None
+        if self.rest_cache is not None:
+            self.rest_cache.invalidate_event(event, data)
+        handler = self._handlers.get(event)
+        if handler is not None:
+            return handler(data, shard)
+        self.event_emitter.emit(self.listener_name(event), data)
+
+    def _handle_ready(self, data: dict, shard: Shard):
+        self.client_cache.user = self.client_cache.intern_user(data['user'], update=True)
+        self.event_emitter.emit('on_shard_ready', shard.id)
+        if self.shard_manager.ready:
+            self.event_emitter.emit('on_ready')
+
+    def _handle_resumed(self, data: dict, shard: Shard):
+        self.event_emitter.emit('on_shard_resumed', shard.id)
+
+    def _handle_guild_create(self, data: dict, shard: Shard):
+        self.client_cache.filter_members(data)
+        guild = Guild(data, self, self.lazy_models)
+        self.client_cache.update_guild(guild)
+        self.event_emitter.emit('on_guild_create', guild)
+
+    # The handlers below patch cached objects in place. Update events are emitted with the state from before the
+    # update as well for listeners which take two arguments. Events for guilds which are not cached are emitted with
+    # their raw data, and update events for them with `None` as the state from before.
+
+    def _before(self, event_name: str, model):
+        # Copying is only worth it when a listener will look at the copy.
+        return model.copy() if model is not None and self.event_emitter.wants_before(event_name) else None
+
+    def _handle_guild_update(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['id'])
+        if guild is None:
+            return self.event_emitter.emit_update('on_guild_update', None, data)
+        before = self._before('on_guild_update', guild)
+        # Roles and emojis have events of their own, so the copies sent here are not rebuilt.
+        guild.update({key: value for key, value in data.items() if key != 'roles' and key != 'emojis'})
+        # The owner may have changed.
+        guild.clear_permissions()
+        self.event_emitter.emit_update('on_guild_update', before, guild)
+
+    def _handle_guild_delete(self, data: dict, shard: Shard):
+        if data.get('unavailable'):
+            # The guild is in an outage, so it is kept until it becomes available again.
+            guild = self.client_cache.get_guild(data['id'])
+            if guild is not None:
+                guild.update(data)
+        else:
+            guild = self.client_cache.remove_guild(data['id'])
+        self.event_emitter.emit('on_guild_delete', data if guild is None else guild)
+
+    def _handle_channel_create(self, data: dict, shard: Shard, thread: bool = False):
+        event = 'on_thread_create' if thread else 'on_channel_create'
+        guild = self.client_cache.get_guild(data.get('guild_id'))
+        if guild is None:
+            return self.event_emitter.emit(event, data)
+        channel = guild._build_channel(data)
+        self.client_cache.add_channel(guild, channel, thread)
+        self.event_emitter.emit(event, channel)
+
+    def _handle_channel_update(self, data: dict, shard: Shard, thread: bool = False):
+        event = 'on_thread_update' if thread else 'on_channel_update'
+        guild = self.client_cache.get_guild(data.get('guild_id'))
+        if guild is None:
+            return self.event_emitter.emit_update(event, None, data)
+        channel = guild.get_thread(data['id']) if thread else guild.get_channel(data['id'])
+        before = self._before(event, channel)
+        if channel is None or channel._type != data.get('type', channel._type):
+            # The channel's class depends on its type, so a channel which changed type is built again.
+            channel = guild._build_channel(data)
+            self.client_cache.add_channel(guild, channel, thread)
+        else:
+            channel.update(data)
+            guild.clear_permissions()
+        self.event_emitter.emit_update(event, before, channel)
+
+    def _handle_channel_delete(self, data: dict, shard: Shard, thread: bool = False):
+        event = 'on_thread_delete' if thread else 'on_channel_delete'
+        guild = self.client_cache.get_guild(data.get('guild_id'))
+        if guild is None:
+            return self.event_emitter.emit(event, data)
+        channel = self.client_cache.remove_channel(guild, data['id'], thread) or guild._build_channel(data)
+        self.event_emitter.emit(event, channel)
+
+    def _handle_thread_create(self, data: dict, shard: Shard):
+        self._handle_channel_create(data, shard, thread=True)
+
+    def _handle_thread_update(self, data: dict, shard: Shard):
+        self._handle_channel_update(data, shard, thread=True)
+
+    def _handle_thread_delete(self, data: dict, shard: Shard):
+        self._handle_channel_delete(data, shard, thread=True)
+
+    def _handle_guild_emojis_update(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit('on_guild_emojis_update', data)
+        guild.update({'emojis': data['emojis']})
+        self.event_emitter.emit('on_guild_emojis_update', guild.emojis)
+
+    def _handle_guild_member_add(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit('on_guild_member_add', data)
+        # The member filter is given the raw payload, which building the member changes.
+        wanted = self.client_cache.wants_member(data)
+        member = guild._build_member(data)
+        if wanted:
+            self.client_cache.add_member(guild, member)
+        if guild._member_count is not None:
+            guild._member_count += 1
+        self.event_emitter.emit('on_guild_member_add', member)
+
+    def _handle_guild_member_update(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit_update('on_guild_member_update', None, data)
+        member = guild.get_member(data['user']['id'])
+        before = self._before('on_guild_member_update', member)
+        if before is not None and before.user is not None:
+            # The user is shared, and is updated in place below.
+            before._user = before.user.copy()
+        wanted = self.client_cache.wants_member(data)
+        data['user'] = self.client_cache.intern_user(data['user'], update=True)
+        if member is None:
+            member = guild._build_member(data)
+        else:
+            member.update(data)
+            guild.clear_permissions(member.user.id)
+        if wanted:
+            # This also marks a cached member as seen, for member policies which expire members.
+            self.client_cache.add_member(guild, member)
+        self.event_emitter.emit_update('on_guild_member_update', before, member)
+
+    def _handle_guild_member_remove(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit('on_guild_member_remove', data)
+        member = self.client_cache.remove_member(guild, data['user']['id'])
+        if guild._member_count:
+            guild._member_count -= 1
+        # The user may still be wanted once they are no longer a cached member, so the user policy decides if they stay.
+        user = self.client_cache.intern_user(data['user'], update=True)
+        self.event_emitter.emit('on_guild_member_remove', user if member is None else member)
+
+    def _handle_guild_role_create(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit('on_guild_role_create', data)
+        role = GuildRole(data['role'])
+        guild.add_role(role)
+        self.event_emitter.emit('on_guild_role_create', role)
+
+    def _handle_guild_role_update(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit_update('on_guild_role_update', None, data)
+        role = guild.get_role(data['role']['id'])
+        before = self._before('on_guild_role_update', role)
+        if role is None:
+            role = GuildRole(data['role'])
+            guild.add_role(role)
+        else:
+            role.update(data['role'])
+            guild.clear_permissions()
+        self.event_emitter.emit_update('on_guild_role_update', before, role)
+
+    def _handle_guild_role_delete(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            return self.event_emitter.emit('on_guild_role_delete', data)
+        role = guild.remove_role(data['role_id'])
+        self.event_emitter.emit('on_guild_role_delete', data if role is None else role)
+
+    def _handle_guild_members_chunk(self, data: dict, shard: Shard):
+        guild = self.client_cache.get_guild(data['guild_id'])
+        if guild is None:
+            members = [GuildMember(member) for member in data['members']]
+        else:
+            wanted = [self.client_cache.wants_member(member) for member in data['members']]
+            members = [guild._build_member(member) for member in data['members']]
+            for member, wants in zip(members, wanted):
+                if wants:
+                    self.client_cache.add_member(guild, member)
+        queue = self._member_requests.get(data.get('nonce'))
+        if queue is not None:
+            queue.put_nowait((members, data['chunk_index'] + 1 >= data['chunk_count']))
+        self.event_emitter.emit('on_guild_members_chunk', data)
+
+    def _intern_author(self, data: dict):
+        # Webhooks send a different name and avatar with each message under the webhook's ID, so they are not shared.
+        if 'author' in data and 'webhook_id' not in data:
+            data['author'] = self.client_cache.intern_user(data['author'], update=True)
+
+    def _handle_message_create(self, data: dict, shard: Shard):
+        if 'member' in data and 'guild_id' in data:
+            self.client_cache.mark_member_seen(data['guild_id'], data['author']['id'])
+        self._intern_author(data)
+        message = Message(data)
+        if self.client_cache.messages is not None:
+            self.client_cache.messages.add(message)
+        self.event_emitter.emit('on_message_create', message)
+
+    def _handle_message_update(self, data: dict, shard: Shard):
+        messages = self.client_cache.messages
+        message = None if messages is None else messages.get(data['channel_id'], data['id'])
+        if message is None:
+            # Edits only send the fields which changed, so an uncached message is emitted with its raw data.
+            return self.event_emitter.emit_update('on_message_update', None, data)
+        before = self._before('on_message_update', message)
+        self._intern_author(data)
+        message.update(data)
+        self.event_emitter.emit_update('on_message_update', before, message)
+
+    def _handle_message_delete(self, data: dict, shard: Shard):
+        messages = self.client_cache.messages
+        message = None if messages is None else messages.remove(data['channel_id'], data['id'])
+        self.event_emitter.emit('on_message_delete', data if message is None else message)
+
+    def _handle_message_delete_bulk(self, data: dict, shard: Shard):
+        messages = self.client_cache.messages
+        cached = {} if messages is None else messages.remove_many(data['channel_id'], data['ids'])
+        # Like MESSAGE_DELETE, messages which were not cached are given as their IDs and channel.
+        deleted = [cached.get(id) or {"id": id, "channel_id": data['channel_id'], "guild_id": data.get('guild_id')}
+                   for id in data['ids']]
+        self.event_emitter.emit('on_message_delete_bulk', deleted)
+
+    def _handle_typing_start(self, data: dict, shard: Shard):
+        if 'guild_id' in data:
+            self.client_cache.mark_member_seen(data['guild_id'], data['user_id'])
+        self.event_emitter.emit('on_typing_start', data)
+
+    def _handle_user_update(self, data: dict, shard: Shard):
+        user = self.client_cache.get_user(data['id'])
+        before = self._before('on_user_update', user)
+        user = self.client_cache.intern_user(data, update=True)
+        self.event_emitter.emit_update('on_user_update', before, user)
+
+    def _handle_presence_update(self, data: dict, shard: Shard):
+        user = self.client_cache.get_user(data['user']['id'])
+        if user is not None:
+            # Only the user's fields which changed are sent.
+            user.update(data['user'])
+        self.event_emitter.emit('on_presence_update', data)
+
+    async def request_members(self, guild_id: str, query: str = '', limit: int = 0,
+                              user_ids: Optional[list[str]] = None, presences: bool = False,
+                              timeout: float = 30) -> AsyncIterator[GuildMember]:
+        """
+        Requests the members of a guild from the gateway, and yields them as each chunk arrives. The members are also
+        added to the cached guild. This needs the Guild Members intent.
+
+        `async for member in client.request_members(guild_id, query='a', limit=100):`
+
+        **Parameters:**
+        - guild_id: The ID of the guild.
+        - query: Only get members whose username starts with this. An empty string gets every member.
+        - limit: The most members to get, or 0 for no limit (only allowed with an empty query).
+        - user_ids: Get these members instead of using `query`.
+        - presences: Whether to get the members' presences as well. This needs the Guild Presences intent.
+        - timeout: How many seconds to wait for each chunk.
+
+        **Raises:**
+        - ValueError: The guild is on a shard which this client does not run.
+        """
+        shard = self.shard_manager.shard_for(guild_id)
+        if shard is None:
+            raise ValueError(f"Guild {guild_id} is on a shard which this client does not run")
+        nonce = f"{next(self._nonces)}"
+        queue = self._member_requests[nonce] = asyncio.Queue()
+        request = {
+            "guild_id": guild_id,
+            "limit": limit,
+            "presences": presences,
+            "nonce": nonce
         }
-        await self.send(heartbeat)
+        if user_ids is not None:
+            request["user_ids"] = user_ids
+        else:
+            request["query"] = query
+        try:
+            await shard.send({
+                "op": GatewayEvents.REQUEST_MEMBERS.value,
+                "d": request
+            })
+            done = False
+            while not done:
+                members, done = await asyncio.wait_for(queue.get(), timeout)
+                for member in members:
+                    yield member
+        finally:
+            del self._member_requests[nonce]
 
-    async def identify(self):
+    async def close(self):
         """
-        Identify the client.
+        Close the client.
         """
-        identify = {
-            "op": GatewayEvents.IDENTIFY.value,
-            "d": {
-                "token": self._token,
-                "intents": self.code,
-                "properties": {
-                    "os": sys.platform,
-                    "browser": "discobra",
-                    "device": "discobra"
-                }
-            }
-        }
-        await self.send(identify)
+        await self.shard_manager.close()
+        await self.event_emitter.close()
 
-    def event(self, coro: Optional[Callable[..., Coroutine[Any, Any, Any]]] = None, /) -> Optional[
-        Callable[..., Coroutine[Any, Any, Any]]]:
+    def event(self, coro: Optional[Callable[..., Coroutine[Any, Any, Any]]] = None, /, *, ordered: bool = False) -> \
+            Optional[Callable[..., Coroutine[Any, Any, Any]]]:
         """
         Registers a coroutine to be called when an event is emitted.
+        This can be used as `@client.event`, or as `@client.event(ordered=True)` to deliver the event in order.
 
         **Parameters:**
         - coro: The coroutine to be registered.
+        - ordered: Whether each emit of the event waits for the listeners of the previous one to finish.
         """
+        if coro is None:
+            return lambda func: self.event(func, ordered=ordered)
         if not asyncio.iscoroutinefunction(coro):
             raise TypeError('event registered must be a coroutine function')
         self.event_emitter.add_listener(coro.__name__, coro)
+        if ordered:
+            self.event_emitter.set_ordered(coro.__name__)
         return coro
 
-    def run(self, token: str):
+    def run(self, token: str, use_uvloop: bool = False):
         """
         Run the client.
 
         **Parameters:**
         - token: Your bot token. Do not share this with anyone!
+        - use_uvloop: Whether to run the client on `uvloop`, which must be installed.
         """
         self._token = token
 
+        if use_uvloop:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
         asyncio.run(self.connect())
@@ -0,0 +1,349 @@
+"""
+    Contains the classes used to run a bot's shards over several processes.
+
+    A `Cluster` is the supervisor: it starts one process per worker, gives each worker a range of shards and restarts
+    workers that die. Workers talk to the supervisor over a Unix socket, which is used as an event bus between workers
+    and to look up guilds and users that are cached by another worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import pickle
+import struct
+import tempfile
+import warnings
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from .utils import HTTPPool, RESTClient
+
+if TYPE_CHECKING:
+    from discord.client import Client
+    from discord.guild import Guild
+    from discord.user import User
+
+_HEADER = struct.Struct('!I')
+
+
+def shard_ranges(shard_count: int, worker_count: int) -> list[list[int]]:
+    """
+    Splits the shards between the workers, giving each worker a contiguous range.
+
+    **Parameters:**
+    - shard_count: The total number of shards.
+    - worker_count: The number of workers.
+
+    **Returns:**
+    - list[list[int]]: The shard IDs of each worker.
+
+    **Raises:**
+    - ValueError: There are more workers than shards, so some workers would have no shards.
+    """
+    if worker_count > shard_count:
+        raise ValueError(f"Cannot split {shard_count} shards between {worker_count} workers")
+    size, extra = divmod(shard_count, worker_count)
+    ranges = []
+    start = 0
+    for i in range(worker_count):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+async def _write(writer: asyncio.StreamWriter, message: tuple):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def _read(reader: asyncio.StreamReader) -> tuple:
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    return pickle.loads(await reader.readexactly(length))
+
+
+class ClusterWorker:
+    """
+    The worker side of a `Cluster`. This is available as `discord.client.Client.cluster` inside a worker process.
+    This should not be created manually, as the cluster handles this.
+    """
+    def __init__(self, client: Client, worker_id: int, worker_count: int, shard_count: int, socket_path: str):
+        self.client = client
+        self.id = worker_id
+        self.worker_count = worker_count
+        self.shard_count = shard_count
+        self.socket_path = socket_path
+        self.ranges = shard_ranges(shard_count, worker_count)
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._requests: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+
+    @property
+    def shard_ids(self) -> list[int]:
+        """The IDs of the shards run by this worker."""
+        return self.ranges[self.id]
+
+    def worker_for(self, guild_id: str) -> int:
+        """
+        Gets the ID of the worker which runs the shard for a guild.
+
+        **Parameters:**
+        - guild_id: The ID of the guild.
+        """
+        shard_id = (int(guild_id) >> 22) % self.shard_count
+        for worker_id, shard_ids in enumerate(self.ranges):
+            if shard_id in shard_ids:
+                return worker_id
+
+    async def run(self, token: str):
+        """
+        Connects to the supervisor and then runs the worker's shards.
+
+        **Parameters:**
+        - token: Your bot token.
+        """
+        reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        await _write(self._writer, ('hello', self.id))
+        self.client._token = token
+        self.client.cluster = self
+        self.client.shard_manager.shard_count = self.shard_count
+        self.client.shard_manager.shard_ids = self.shard_ids
+        listener = asyncio.create_task(self._listen(reader))
+        try:
+            await self.client.connect()
+        finally:
+            listener.cancel()
+            self._writer.close()
+
+    async def _listen(self, reader: asyncio.StreamReader):
+        while True:
+            message = await _read(reader)
+            match message[0]:
+                case 'event':
+                    _, name, args = message
+                    self.client.event_emitter.emit(name, *args)
+                case 'request':
+                    _, request_id, op, args = message
+                    await _write(self._writer, ('response', request_id, self._handle(op, args)))
+                case 'response':
+                    _, request_id, result = message
+                    future = self._requests.pop(request_id, None)
+                    if future is not None and not future.done():
+                        future.set_result(result)
+
+    def _handle(self, op: str, args: tuple) -> Any:
+        match op:
+            case 'get_guild':
+                return self.client.cache.get_guild(*args)
+            case 'get_user':
+                return self.client.cache.get_user(*args)
+
+    async def request(self, op: str, *args: Any, worker: Optional[int] = None, timeout: float = 10) -> Any:
+        """
+        Asks other workers to handle a lookup, and returns the first result which is not `None`.
+
+        **Parameters:**
+        - op: The lookup to run, either `get_guild` or `get_user`.
+        - args: The arguments for the lookup.
+        - worker: The ID of the worker to ask. If this is not given, every other worker is asked.
+        - timeout: How many seconds to wait for an answer.
+        """
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        await _write(self._writer, ('request', request_id, op, args, worker))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def publish(self, event_name: str, *args: Any):
+        """
+        Emits an event on every worker, including this one. The arguments must be picklable.
+
+        **Parameters:**
+        - event_name: The name of the event, e.g. `on_cluster_message`.
+        - args: The arguments passed to the listeners.
+        """
+        self.client.event_emitter.emit(event_name, *args)
+        await _write(self._writer, ('event', event_name, args))
+
+    async def get_guild(self, id: str) -> Optional[Guild]:
+        """
+        Get a guild from the cache of whichever worker runs its shard.
+        """
+        worker = self.worker_for(id)
+        if worker == self.id:
+            return self.client.cache.get_guild(id)
+        return await self.request('get_guild', id, worker=worker)
+
+    async def get_user(self, id: str) -> Optional[User]:
+        """
+        Get a user from this worker's cache, or from any other worker's cache if it is not cached here.
+        """
+        user = self.client.cache.get_user(id)
+        if user is None:
+            user = await self.request('get_user', id)
+        return user
+
+
+def _run_worker(factory: Callable[[], Client], token: str, worker_id: int, worker_count: int, shard_count: int,
+                socket_path: str):
+    client = factory()
+    worker = ClusterWorker(client, worker_id, worker_count, shard_count, socket_path)
+    asyncio.run(worker.run(token))
+
+
+class Cluster:
+    """
+    Runs a bot's shards over several worker processes, and restarts any worker which dies.
+
+    **Parameters:**
+    - factory: A function which creates the `discord.client.Client` for a worker. This is called in the worker process,
+    so it must be defined at the top level of a module.
+    - worker_count: The number of worker processes.
+    - shard_count: The total number of shards. If this is not given, the number recommended by Discord is used, and if
+    that is less than `worker_count`, only that many workers are started.
+    - socket_path: The path of the Unix socket used to talk to the workers. A temporary path is used if this is not given.
+    """
+    RESTART_DELAY = 5
+    """How many seconds to wait before restarting a worker which has died."""
+
+    def __init__(self, factory: Callable[[], Client], worker_count: int, shard_count: Optional[int] = None,
+                 socket_path: Optional[str] = None):
+        if shard_count is not None and worker_count > shard_count:
+            # A worker without shards would return straight away and be restarted forever.
+            raise ValueError(f"Cannot split {shard_count} shards between {worker_count} workers")
+        self.factory = factory
+        self.worker_count = worker_count
+        self.shard_count = shard_count
+        self.socket_path = socket_path or os.path.join(tempfile.mkdtemp(prefix='discobra-'), 'cluster.sock')
+        self.processes: dict[int, multiprocessing.Process] = {}
+        self.restarts: dict[int, int] = {}
+        self._writers: dict[int, asyncio.StreamWriter] = {}
+        self._requests: dict[int, list] = {}
+        self._ids = itertools.count()
+        self._context = multiprocessing.get_context('spawn')
+        self._token: str = None
+        self._closed = False
+
+    async def fetch_shard_count(self) -> int:
+        """
+        Fetches the recommended shard count from Discord.
+        """
+        pool = HTTPPool()
+        try:
+            data = await RESTClient(self._token, pool.open()).get('/gateway/bot')
+        finally:
+            await pool.close()
+        return data['shards']
+
+    def _spawn(self, worker_id: int):
+        process = self._context.Process(
+            target=_run_worker,
+            args=(self.factory, self._token, worker_id, self.worker_count, self.shard_count, self.socket_path),
+            name=f"discobra-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+
+    async def start(self, token: str):
+        """
+        Starts the supervisor and every worker, then restarts workers when they die.
+
+        **Parameters:**
+        - token: Your bot token.
+        """
+        self._token = token
+        if self.shard_count is None:
+            self.shard_count = await self.fetch_shard_count()
+            if self.worker_count > self.shard_count:
+                warnings.warn(f"Discord recommends {self.shard_count} shards, so only {self.shard_count} of the "
+                              f"{self.worker_count} workers are started")
+                self.worker_count = self.shard_count
+        server = await asyncio.start_unix_server(self._handle_worker, self.socket_path)
+        async with server:
+            for worker_id in range(self.worker_count):
+                self._spawn(worker_id)
+            await self._supervise()
+
+    async def _supervise(self):
+        while not self._closed:
+            await asyncio.sleep(1)
+            for worker_id, process in list(self.processes.items()):
+                if process.exitcode is not None and not self._closed:
+                    self._writers.pop(worker_id, None)
+                    self.restarts[worker_id] = self.restarts.get(worker_id, 0) + 1
+                    await asyncio.sleep(self.RESTART_DELAY)
+                    self._spawn(worker_id)
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker_id = None
+        try:
+            while True:
+                message = await _read(reader)
+                match message[0]:
+                    case 'hello':
+                        worker_id = message[1]
+                        self._writers[worker_id] = writer
+                    case 'event':
+                        for other, other_writer in list(self._writers.items()):
+                            if other != worker_id:
+                                await _write(other_writer, message)
+                    case 'request':
+                        await self._forward_request(writer, worker_id, *message[1:])
+                    case 'response':
+                        await self._forward_response(*message[1:])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if worker_id is not None and self._writers.get(worker_id) is writer:
+                del self._writers[worker_id]
+            writer.close()
+
+    async def _forward_request(self, writer: asyncio.StreamWriter, origin: int, request_id: int, op: str,
+                               args: tuple, target: Optional[int]):
+        if target is not None:
+            targets = [self._writers[target]] if target in self._writers else []
+        else:
+            targets = [w for i, w in self._writers.items() if i != origin]
+        if not targets:
+            return await _write(writer, ('response', request_id, None))
+        forward_id = next(self._ids)
+        self._requests[forward_id] = [writer, request_id, len(targets)]
+        for target_writer in targets:
+            await _write(target_writer, ('request', forward_id, op, args))
+
+    async def _forward_response(self, forward_id: int, result: Any):
+        pending = self._requests.get(forward_id)
+        if pending is None:
+            return
+        writer, request_id, remaining = pending
+        pending[2] = remaining - 1
+        if result is not None or pending[2] == 0:
+            del self._requests[forward_id]
+            await _write(writer, ('response', request_id, result))
+
+    def close(self):
+        """
+        Stops every worker.
+        """
+        self._closed = True
+        for process in self.processes.values():
+            process.terminate()
+
+    def run(self, token: str):
+        """
+        Run the cluster.
+
+        **Parameters:**
+        - token: Your bot token. Do not share this with anyone!
+        """
+        try:
+            asyncio.run(self.start(token))
+        finally:
+            self.close()
@@ -0,0 +1,125 @@
+import io
+import json
+import os
+from typing import BinaryIO, Optional, Union
+
+import aiohttp
+
+
+class _BufferReader(io.RawIOBase):
+    # Reads a buffer such as an mmap in chunks, as aiohttp would otherwise copy the whole buffer before sending it.
+    def __init__(self, buffer: memoryview):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._buffer)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, b) -> int:
+        chunk = self._buffer[self._position:self._position + len(b)]
+        b[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+class File:
+    """
+    A file to attach to a message. The file is streamed from disk in chunks when it is sent, so it is never loaded
+    into memory all at once.
+
+    **Parameters:**
+    - fp: A path to the file, a file object opened in binary mode, or a buffer such as an `mmap.mmap` or `bytes`.
+    - filename: The name of the file on Discord. Defaults to the name of the path or file object.
+    - description: The description (alt text) of the file.
+    - spoiler: Whether the file is hidden behind a spoiler.
+    """
+    def __init__(self, fp: Union[str, os.PathLike, BinaryIO, memoryview, bytes], filename: Optional[str] = None,
+                 description: Optional[str] = None, spoiler: bool = False):
+        self._path: Optional[str] = None
+        self._fp: Optional[BinaryIO] = None
+        self._buffer: Optional[memoryview] = None
+        self._owned: Optional[BinaryIO] = None
+        self._start = 0
+        if isinstance(fp, (str, os.PathLike)):
+            self._path = os.fspath(fp)
+            name = os.path.basename(self._path)
+        elif isinstance(fp, io.IOBase):
+            self._fp = fp
+            if fp.seekable():
+                self._start = fp.tell()
+            name = os.path.basename(getattr(fp, 'name', '') or '') or 'file'
+        else:
+            self._buffer = memoryview(fp).cast('B')
+            name = 'file'
+        self.filename = filename or name
+        if spoiler and not self.filename.startswith('SPOILER_'):
+            self.filename = f"SPOILER_{self.filename}"
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"<File filename={self.filename}>"
+
+    @property
+    def spoiler(self) -> bool:
+        return self.filename.startswith('SPOILER_')
+
+    def open(self) -> BinaryIO:
+        """
+        Gets the file ready to be sent from the start, opening it if it was given as a path. Files given as file
+        objects are seeked back to where they were when the `File` was made, so a request can be retried.
+        """
+        if self._buffer is not None:
+            return _BufferReader(self._buffer)
+        if self._path is not None:
+            self.close()
+            self._owned = open(self._path, 'rb')
+            return self._owned
+        if self._fp.seekable():
+            self._fp.seek(self._start)
+        return self._fp
+
+    def close(self):
+        """
+        Closes the file if it was opened from a path. File objects given by the caller are left open.
+        """
+        if self._owned is not None:
+            self._owned.close()
+            self._owned = None
+
+    def to_dict(self, index: int) -> dict:
+        """
+        The attachment object describing the file in a message's `payload_json`.
+        """
+        attachment = {"id": index, "filename": self.filename}
+        if self.description is not None:
+            attachment["description"] = self.description
+        return attachment
+
+
+def multipart(payload: Optional[dict], files: list[File]) -> aiohttp.FormData:
+    """
+    Builds a `multipart/form-data` body from a JSON payload and some files, as Discord expects for uploads. The files
+    are opened from the start each time, so a new body can be built for each retry.
+
+    **Parameters:**
+    - payload: The JSON part of the request, such as the message's content. `attachments` is filled in for the files.
+    - files: The files to send.
+    """
+    payload = dict(payload or {})
+    payload["attachments"] = [*payload.get("attachments", []), *(file.to_dict(i) for i, file in enumerate(files))]
+    form = aiohttp.FormData()
+    form.add_field('payload_json', json.dumps(payload), content_type='application/json')
+    for i, file in enumerate(files):
+        form.add_field(f'files[{i}]', file.open(), filename=file.filename, content_type='application/octet-stream')
+    return form
@@ -1,7 +1,18 @@
-from discord.user import User
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from discord.model import LazyIndex, Model
+from discord.permissions import Permissions, apply_timeout, compute_base_permissions, compute_overwrites, \
+    parse_permissions
+from discord.user import User, user_parser
+from discord.utils import Paginator
+from discord.utils.rest import RESTClient
 from .channels import AnnouncementChannel, CategoryChannel, ChannelType, GuildChannel, TextChannel, VoiceChannel
 
-class GuildMember:
+if TYPE_CHECKING:
+    from discord.client import Client
+
+class GuildMember(Model):
     """
         Represents a member of a `Guild`.
     """
@@ -14,17 +25,18 @@ class GuildMember:
     _deaf: bool
     _mute: bool
     _pending: bool
-    _permissions: str
     _communication_disabled_until: str
+    _flags: int
+    # Permissions (only sent with interactions), the guild ID (only sent with member events) and avatar decorations
+    # are left in `extra`, as few of the members cached have them.
 
     # TODO: Add datetime formatting
+    _parsers = {'user': user_parser, 'permissions': parse_permissions}
+
     def __init__(self, data: dict):
-        for key, value in data.items():
-            match (key):
-                case 'user':
-                    self._user = User(value)
-                case _:
-                    setattr(self, f"_{key}", value)
+        # This is read on every permission check, and reading a field which was never set is slow.
+        self._communication_disabled_until = None
+        super().__init__(data)
 
     def __repr__(self) -> str:
         return f"<GuildMember user={self._user}>"
@@ -33,7 +45,23 @@ class GuildMember:
     def user(self) -> User:
         return self._user
 
-class GuildRole:
+    @property
+    def roles(self) -> list[str]:
+        """The IDs of the member's roles, not including @everyone."""
+        return self._roles
+
+    @property
+    def communication_disabled_until(self) -> str:
+        """When the member's timeout ends, or `None` if they have not been timed out."""
+        return self._communication_disabled_until
+
+    @property
+    def permissions(self) -> Optional[Permissions]:
+        """The member's permissions in an interaction's channel. This is only sent with interactions."""
+        permissions = self._get_extra('permissions')
+        return None if permissions is None else Permissions(permissions)
+
+class GuildRole(Model):
     _id: str
     _name: str
     _color: int
@@ -41,23 +69,29 @@ class GuildRole:
     _icon: str
     _unicode_emoji: str
     _position: int
-    _permissions: str
+    _permissions: int
     _managed: bool
     _mentionable: bool
-    _tags: dict
+    # Tags are only sent for bot, integration and booster roles, so they are left in `extra`.
 
-    def __init__(self, data: dict):
-        for key, value in data.items():
-            match (key):
-                case 'color':
-                    self._color = value
-                case _:
-                    setattr(self, f"_{key}", value)
+    _parsers = {'permissions': parse_permissions}
 
     def __repr__(self) -> str:
         return f"<GuildRole id={self._id} name={self._name}>"
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def permissions(self) -> Permissions:
+        return Permissions(self._permissions)
     
-class GuildEmoji:
+class GuildEmoji(Model):
     _id: str
     _name: str
     _roles: list
@@ -67,21 +101,23 @@ class GuildEmoji:
     _animated: bool
     _available: bool
 
-    def __init__(self, data: dict):
-        for key, value in data.items():
-            match (key):
-                case 'user':
-                    self._user = User(value)
-                case _:
-                    setattr(self, f"_{key}", value)
+    _parsers = {'user': user_parser}
 
     def __repr__(self) -> str:
         return f"<GuildEmoji id={self._id} name={self._name}>"
 
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
 class GuildSticker:
     pass
 
-class Guild:
+class Guild(Model):
     _id: str
     _name: str
     _icon: str
@@ -95,9 +131,9 @@ class Guild:
     _member_count: int
     _region: str
     _voice_states: list
-    _members: list[GuildMember]
-    _channels: list[GuildChannel]
-    _threads: list
+    _members: LazyIndex[GuildMember]
+    _channels: LazyIndex[GuildChannel]
+    _threads: LazyIndex[GuildChannel]
     _afk_channel_id: str
     _afk_timeout: int
     _widget_enabled: bool
@@ -105,8 +141,8 @@ class Guild:
     _verification_level: int
     _default_message_notifications: str
     _explicit_content_filter: str
-    _roles: list[GuildRole]
-    _emojis: list
+    _roles: LazyIndex[GuildRole]
+    _emojis: LazyIndex[GuildEmoji]
     _features: list
     _mfa_level: int
     _application_id: str
@@ -132,6 +168,42 @@ class Guild:
     _stickers: list
     _stage_instances: list
     _premium_progress_bar_enabled: bool
+    _client: Optional['Client']
+
+    _lazy: bool
+    # Computed permissions, keyed by user ID and then by channel ID, or by `None` for the guild.
+    _permission_cache: dict[str, dict[Optional[str], Permissions]]
+
+    def _build_channel(self, channel: dict) -> GuildChannel:
+        if channel['type'] == ChannelType.GUILD_TEXT:
+            return TextChannel(channel, self)
+        elif channel['type'] == ChannelType.GUILD_VOICE:
+            return VoiceChannel(channel, self)
+        elif channel['type'] == ChannelType.GUILD_CATEGORY:
+            return CategoryChannel(channel, self)
+        elif channel['type'] == ChannelType.GUILD_NEWS:
+            return AnnouncementChannel(channel, self)
+        return GuildChannel(channel, self)
+
+    def _build_member(self, member: dict) -> GuildMember:
+        if self._client is not None and type(member.get('user')) is dict:
+            # The payload is changed in place, as it is dropped once the member is built.
+            member['user'] = self._client.client_cache.intern_user(member['user'])
+        return GuildMember(member)
+
+    def _build_emoji(self, emoji: dict) -> GuildEmoji:
+        if self._client is not None and type(emoji.get('user')) is dict:
+            emoji['user'] = self._client.client_cache.intern_user(emoji['user'])
+        return GuildEmoji(emoji)
+
+    _parsers = {
+        'roles': lambda self, value: LazyIndex(value, GuildRole, lazy=self._lazy),
+        'emojis': lambda self, value: LazyIndex(value, self._build_emoji, lazy=self._lazy),
+        'members': lambda self, value: LazyIndex(value, self._build_member, lambda member: member['user']['id'],
+                                                 self._lazy),
+        'channels': lambda self, value: LazyIndex(value, self._build_channel, lazy=self._lazy),
+        'threads': lambda self, value: LazyIndex(value, self._build_channel, lazy=self._lazy)
+    }
 
     @property
     def id(self) -> str:
@@ -142,54 +214,238 @@ class Guild:
         return self._name
     
     @property
-    def members(self) -> list[GuildMember]:
+    def members(self) -> LazyIndex[GuildMember]:
         return self._members
     
     @property
-    def roles(self) -> list[GuildRole]:
+    def roles(self) -> LazyIndex[GuildRole]:
         return self._roles
 
     @property
-    def channels(self) -> list[GuildChannel]:
+    def channels(self) -> LazyIndex[GuildChannel]:
         return self._channels
     
     @property
-    def emojis(self) -> list[GuildEmoji]:
+    def emojis(self) -> LazyIndex[GuildEmoji]:
         return self._emojis
     
+    @property
+    def threads(self) -> LazyIndex[GuildChannel]:
+        return self._threads
+
     @property
     def stickers(self) -> list:
         return self._stickers
 
-    def __init__(self, data: dict):
-        for key, value in data.items():
-            match (key):
-                case 'roles':
-                    self._roles = [GuildRole(role) for role in value]
-                case 'emojis':
-                    self._emojis = [GuildEmoji(emoji) for emoji in value]
-                case 'members':
-                    self._members = [GuildMember(member) for member in value]
-                case 'channels':
-                    channels = []
-                    for channel in value:
-                        if channel['type'] == ChannelType.GUILD_TEXT:
-                            channels.append(TextChannel(channel, self))
-                        elif channel['type'] == ChannelType.GUILD_VOICE:
-                            channels.append(VoiceChannel(channel, self))
-                        elif channel['type'] == ChannelType.GUILD_CATEGORY:
-                            channels.append(CategoryChannel(channel, self))
-                        elif channel['type'] == ChannelType.GUILD_NEWS:
-                            channels.append(AnnouncementChannel(channel, self))
-                        else:
-                            channels.append(GuildChannel(channel, self))
-                    self._channels = channels
-                case 'welcome_screen':
-                    self._welcome_screen = value
-                case 'stickers':
-                    self._stickers = value
-                case _:
-                    setattr(self, f"_{key}", value)
+    def __init__(self, data: dict, client: Optional['Client'] = None, lazy: bool = False):
+        self._client = client
+        self._lazy = lazy
+        self._permission_cache = {}
+        super().__init__(data)
+
+    def _collection(self, attr: str, factory: Callable[[dict], Any],
+                    key: Callable[[dict], str] = itemgetter('id')) -> LazyIndex:
+        # Guilds which are unavailable or were built from partial payloads may not have every collection.
+        items = getattr(self, attr)
+        if items is None:
+            items = LazyIndex([], factory, key)
+            setattr(self, attr, items)
+        return items
+
+    def get_member(self, user_id: str) -> Optional[GuildMember]:
+        """
+        Gets a cached member of the guild by their user ID.
+        """
+        return None if self._members is None else self._members.get(user_id)
+
+    def get_role(self, role_id: str) -> Optional[GuildRole]:
+        """
+        Gets one of the guild's roles by its ID.
+        """
+        return None if self._roles is None else self._roles.get(role_id)
+
+    def get_channel(self, channel_id: str) -> Optional[GuildChannel]:
+        """
+        Gets one of the guild's channels by its ID.
+        """
+        return None if self._channels is None else self._channels.get(channel_id)
+
+    def get_thread(self, thread_id: str) -> Optional[GuildChannel]:
+        """
+        Gets one of the guild's active threads by its ID.
+        """
+        return None if self._threads is None else self._threads.get(thread_id)
+
+    def get_emoji(self, emoji_id: str) -> Optional[GuildEmoji]:
+        """
+        Gets one of the guild's emojis by its ID.
+        """
+        return None if self._emojis is None else self._emojis.get(emoji_id)
+
+    def add_member(self, member: GuildMember):
+        """
+        Adds a member to the guild, replacing the cached member with the same user if there is one.
+        """
+        self._collection('_members', self._build_member, lambda data: data['user']['id'])[member.user.id] = member
+        self.clear_permissions(member.user.id)
+
+    def add_role(self, role: GuildRole):
+        """
+        Adds a role to the guild, replacing the role with the same ID if there is one.
+        """
+        self._collection('_roles', GuildRole)[role.id] = role
+        self.clear_permissions()
+
+    def add_channel(self, channel: GuildChannel):
+        """
+        Adds a channel to the guild, replacing the channel with the same ID if there is one.
+        """
+        self._collection('_channels', self._build_channel)[channel.id] = channel
+        self.clear_permissions()
+
+    def add_thread(self, thread: GuildChannel):
+        """
+        Adds a thread to the guild, replacing the thread with the same ID if there is one.
+        """
+        self._collection('_threads', self._build_channel)[thread.id] = thread
+
+    def remove_member(self, user_id: str) -> Optional[GuildMember]:
+        """
+        Removes a member from the guild's cache.
+
+        **Returns:**
+        - Optional[GuildMember]: The member that was removed, or `None` if they were not cached.
+        """
+        self.clear_permissions(user_id)
+        return None if self._members is None else self._members.pop(user_id)
+
+    def discard_member(self, user_id: str):
+        """
+        Removes a member from the guild's cache without building them, e.g. when they are evicted.
+        """
+        self.clear_permissions(user_id)
+        if self._members is not None:
+            self._members.discard(user_id)
+
+    def remove_role(self, role_id: str) -> Optional[GuildRole]:
+        """
+        Removes a role from the guild's cache.
+
+        **Returns:**
+        - Optional[GuildRole]: The role that was removed, or `None` if it was not cached.
+        """
+        self.clear_permissions()
+        return None if self._roles is None else self._roles.pop(role_id)
+
+    def remove_channel(self, channel_id: str) -> Optional[GuildChannel]:
+        """
+        Removes a channel from the guild's cache.
+
+        **Returns:**
+        - Optional[GuildChannel]: The channel that was removed, or `None` if it was not cached.
+        """
+        self.clear_permissions()
+        return None if self._channels is None else self._channels.pop(channel_id)
+
+    def remove_thread(self, thread_id: str) -> Optional[GuildChannel]:
+        """
+        Removes a thread from the guild's cache.
+
+        **Returns:**
+        - Optional[GuildChannel]: The thread that was removed, or `None` if it was not cached.
+        """
+        return None if self._threads is None else self._threads.pop(thread_id)
+
+    def __getstate__(self) -> dict:
+        # The client holds sockets and tasks, so it is left behind when the guild is sent to another process.
+        state = super().__getstate__()
+        state['_client'] = None
+        state['_permission_cache'] = {}
+        return state
+
+    def permissions_for(self, member: GuildMember, channel: Optional[GuildChannel] = None) -> Permissions:
+        """
+        Computes a member's permissions in the guild, or in one of its channels or threads, from their roles and the
+        channel's permission overwrites.
+
+        Results are kept until the member, the guild's roles or its channels change, so checking permissions again is
+        a dictionary lookup. Changes made through the client's events, or through this guild's `add_` and `remove_`
+        methods, are noticed. After changing the models in any other way, call `clear_permissions`.
+
+        **Parameters:**
+        - member: The member.
+        - channel: The channel or thread. If this is not given, the member's permissions in the guild are computed.
+        """
+        user_id = member._user._id
+        cached = self._permission_cache.get(user_id)
+        if cached is None:
+            cached = self._permission_cache[user_id] = {}
+        channel_id = None if channel is None else channel._id
+        permissions = cached.get(channel_id)
+        if permissions is None:
+            base = cached.get(None)
+            if base is None:
+                base = cached[None] = compute_base_permissions(self, member)
+            if channel is None:
+                permissions = base
+            else:
+                permissions = cached[channel_id] = compute_overwrites(base, self, channel, member)
+        # Timeouts end by themselves, so they are applied on each check instead of being kept.
+        if member._communication_disabled_until is None:
+            return permissions
+        return apply_timeout(permissions, member)
+
+    def clear_permissions(self, user_id: Optional[str] = None):
+        """
+        Forgets the computed permissions of a member, or of every member if `user_id` is not given.
+        """
+        if user_id is None:
+            self._permission_cache.clear()
+        else:
+            self._permission_cache.pop(user_id, None)
+
+    @property
+    def rest_client(self) -> RESTClient:
+        """The `discord.utils.rest.RESTClient` of the client which received the guild."""
+        if self._client is None:
+            raise RuntimeError(f"{self!r} is not attached to a client")
+        return self._client.rest_client
+
+    def fetch_members(self, limit: Optional[int] = None, after: str = '0') -> Paginator:
+        """
+        Fetches the guild's members from the API, in order of user ID. This needs the `GUILD_MEMBERS` intent.
+
+        ```python
+        async for member in guild.fetch_members():
+            print(member.user)
+        ```
+
+        **Parameters:**
+        - limit: The most members to fetch, or `None` for every member.
+        - after: Only fetch members with a higher user ID than this.
+        """
+        return Paginator(self.rest_client, f"/guilds/{self._id}/members", 1000, limit, after=after,
+                         item_id=lambda member: member['user']['id'], convert=self._build_member)
+
+    def audit_logs(self, limit: Optional[int] = 100, before: Optional[str] = None, after: Optional[str] = None,
+                   user_id: Optional[str] = None, action_type: Optional[int] = None) -> Paginator:
+        """
+        Fetches the guild's audit log entries from the API, newest first, or oldest first if `after` is given.
+
+        **Parameters:**
+        - limit: The most entries to fetch, or `None` for every entry.
+        - before: Only fetch entries older than this ID.
+        - after: Only fetch entries newer than this ID.
+        - user_id: Only fetch entries made by this user.
+        - action_type: Only fetch entries of this type.
+        """
+        params = {}
+        if user_id is not None:
+            params['user_id'] = user_id
+        if action_type is not None:
+            params['action_type'] = action_type
+        return Paginator(self.rest_client, f"/guilds/{self._id}/audit-logs", 100, limit, before, after, params,
+                         items=lambda data: data['audit_log_entries'])
 
     def __repr__(self) -> str:
         return f"<Guild id={self._id} name={self._name}>"
\ No newline at end of file
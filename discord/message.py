@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import Optional
+
+from discord.model import Model
+from discord.user import User, user_parser
+
+
+def timestamp_parser(model: Model, value) -> Optional[datetime]:
+    """
+    Parses an ISO 8601 timestamp field of a model into an aware `datetime`. `None` is kept, for messages which have
+    not been edited.
+    """
+    return value if value is None or type(value) is datetime else datetime.fromisoformat(value)
+
+
+class Message(Model):
+    """
+        Represents a message sent in a channel.
+    """
+    _id: str
+    _channel_id: str
+    _guild_id: str
+    _author: User
+    _member: dict
+    _content: str
+    _timestamp: datetime
+    _edited_timestamp: Optional[datetime]
+    _tts: bool
+    _mention_everyone: bool
+    _mentions: list
+    _mention_roles: list
+    _attachments: list
+    _embeds: list
+    _reactions: list
+    _nonce: str
+    _pinned: bool
+    _webhook_id: str
+    _type: int
+    _flags: int
+    _message_reference: dict
+    _referenced_message: dict
+    _components: list
+    _sticker_items: list
+
+    _parsers = {'author': user_parser, 'timestamp': timestamp_parser, 'edited_timestamp': timestamp_parser}
+
+    def __repr__(self) -> str:
+        return f"<Message id={self._id} channel_id={self._channel_id} author={self._author}>"
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def channel_id(self) -> str:
+        return self._channel_id
+
+    @property
+    def guild_id(self) -> str:
+        """The ID of the guild the message was sent in, or `None` if it was sent in a DM."""
+        return self._guild_id
+
+    @property
+    def author(self) -> User:
+        return self._author
+
+    @property
+    def member(self) -> dict:
+        """The partial guild member of the author, without its user, if the message was sent in a guild."""
+        return self._member
+
+    @property
+    def content(self) -> str:
+        """The text of the message. This is empty without the Message Content intent."""
+        return self._content
+
+    @property
+    def timestamp(self) -> datetime:
+        """When the message was sent."""
+        return self._timestamp
+
+    @property
+    def edited_timestamp(self) -> Optional[datetime]:
+        """When the message was last edited, or `None` if it has not been."""
+        return self._edited_timestamp
+
+    @property
+    def tts(self) -> bool:
+        return self._tts
+
+    @property
+    def mention_everyone(self) -> bool:
+        return self._mention_everyone
+
+    @property
+    def mentions(self) -> list:
+        return self._mentions
+
+    @property
+    def mention_roles(self) -> list:
+        return self._mention_roles
+
+    @property
+    def attachments(self) -> list:
+        return self._attachments
+
+    @property
+    def embeds(self) -> list:
+        return self._embeds
+
+    @property
+    def reactions(self) -> list:
+        return self._reactions
+
+    @property
+    def pinned(self) -> bool:
+        return self._pinned
+
+    @property
+    def webhook_id(self) -> str:
+        return self._webhook_id
+
+    @property
+    def type(self) -> int:
+        return self._type
+
+    @property
+    def flags(self) -> int:
+        return self._flags
+
+    @property
+    def message_reference(self) -> dict:
+        return self._message_reference
+
+    @property
+    def referenced_message(self) -> dict:
+        return self._referenced_message
+
+    @property
+    def components(self) -> list:
+        return self._components
+
+    @property
+    def sticker_items(self) -> list:
+        return self._sticker_items
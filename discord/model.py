@@ -0,0 +1,198 @@
+from collections.abc import Collection, KeysView
+from operator import itemgetter
+from typing import Any, Callable, Iterator, Optional
+
+
+class ModelMeta(type):
+    """
+    Builds `__slots__` for a `Model` from its annotated `_field` attributes, so that instances store their fields in
+    slots instead of a `__dict__`. Each `_field` is filled from the payload key `field`.
+    """
+    def __new__(mcs, name: str, bases: tuple, namespace: dict):
+        inherited = set()
+        for base in bases:
+            for cls in base.__mro__:
+                inherited.update(cls.__dict__.get('__slots__', ()))
+        annotations = namespace.get('__annotations__', {})
+        # Annotated attributes with a value, such as `_parsers`, are class variables rather than fields.
+        own = [attr for attr in annotations if attr.startswith('_') and not attr.startswith('__')
+               and attr not in inherited and attr not in namespace]
+        namespace['__slots__'] = (*namespace.get('__slots__', ()), *own)
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._attrs = {**getattr(cls, '_attrs', {}), **{attr[1:]: attr for attr in own}}
+        cls._parsers = {**getattr(cls, '_parsers', {}), **namespace.get('_parsers', {})}
+        cls._slot_names = frozenset(inherited.union(cls.__slots__))
+        return cls
+
+
+class Model(metaclass=ModelMeta):
+    """
+    The base of Discord's data models. Fields are declared as annotated `_field` attributes, and are read from a
+    payload in one pass:
+
+    - Keys with a parser in `_parsers` are converted with it. Parsers are called with the model and the value.
+    - Keys with a declared field are stored in its slot.
+    - Any other keys are kept in `extra`, so new fields Discord adds are not lost.
+
+    Fields missing from the payload read as `None`.
+    """
+    __slots__ = ('_extra',)
+    _parsers: dict[str, Callable[['Model', Any], Any]] = {}
+
+    def __init__(self, data: dict):
+        self._extra = None
+        self.update(data)
+
+    def update(self, data: dict):
+        """
+        Updates the model in place from a payload. Fields which are not in the payload are left as they are.
+
+        **Parameters:**
+        - data: The payload, which can be partial.
+        """
+        attrs = self._attrs
+        parsers = self._parsers
+        for key, value in data.items():
+            parser = parsers.get(key)
+            if parser is not None:
+                value = parser(self, value)
+            attr = attrs.get(key)
+            if attr is not None:
+                setattr(self, attr, value)
+            elif self._extra is None:
+                self._extra = {key: value}
+            else:
+                self._extra[key] = value
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called when a slot has not been set.
+        if name in self._slot_names:
+            return None
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def copy(self) -> 'Model':
+        """
+        Makes a shallow copy of the model, e.g. to keep its state from before an update. `extra` is copied as well, as
+        updates change it in place.
+        """
+        cls = type(self)
+        clone = cls.__new__(cls)
+        for attr in self._slot_names:
+            if attr != '__weakref__':
+                try:
+                    setattr(clone, attr, object.__getattribute__(self, attr))
+                except AttributeError:
+                    pass
+        if self._extra is not None:
+            clone._extra = dict(self._extra)
+        return clone
+
+    def __getstate__(self) -> dict:
+        return {attr: getattr(self, attr) for attr in self._slot_names if attr != '__weakref__'}
+
+    def __setstate__(self, state: dict):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
+    @property
+    def extra(self) -> Optional[dict]:
+        """Fields from the payload which the model does not declare, or `None` if there were none."""
+        return self._extra
+
+    def _get_extra(self, key: str) -> Any:
+        # Rarely sent fields are left undeclared, as each declared field costs every instance a slot.
+        return None if self._extra is None else self._extra.get(key)
+
+
+class LazyIndex(Collection):
+    """
+    Models keyed by ID, in the order they were added. The raw payloads are kept until each model is first read, and
+    built models replace their payloads, so each is only built once. Looking up, adding and removing a model by ID
+    takes constant time.
+
+    Iterating yields the models, building any which have not been read yet.
+
+    **Parameters:**
+    - items: The raw payloads.
+    - factory: Builds a model from a payload. This must be picklable (e.g. a class or a bound method) for the index to
+    be sent to another process.
+    - key: Gets the ID of a raw payload.
+    - lazy: Whether to wait until each model is read before building it. If this is `False`, every model is built
+    straight away.
+    """
+    __slots__ = ('_items', '_factory')
+
+    def __init__(self, items: list, factory: Callable[[dict], Any], key: Callable[[dict], str] = itemgetter('id'),
+                 lazy: bool = True):
+        self._factory = factory
+        if lazy:
+            self._items = {key(item): item for item in items}
+        else:
+            self._items = {key(item): factory(item) for item in items}
+
+    def _build(self, id: str, item: Any) -> Any:
+        if type(item) is dict:
+            item = self._items[id] = self._factory(item)
+        return item
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._items
+
+    def __iter__(self) -> Iterator[Any]:
+        # A snapshot, as models may be added or removed while the caller is iterating.
+        for id, item in tuple(self._items.items()):
+            yield self._build(id, item)
+
+    def __getitem__(self, id: str) -> Any:
+        return self._build(id, self._items[id])
+
+    def __setitem__(self, id: str, item: Any):
+        self._items[id] = item
+
+    def __delitem__(self, id: str):
+        del self._items[id]
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def get(self, id: str, default: Any = None) -> Any:
+        """
+        Gets a model by ID, or `default` if there is none.
+        """
+        item = self._items.get(id)
+        return default if item is None else self._build(id, item)
+
+    def pop(self, id: str, default: Any = None) -> Any:
+        """
+        Removes a model by ID and returns it, or returns `default` if there is none.
+        """
+        item = self._items.pop(id, None)
+        if item is None:
+            return default
+        return self._factory(item) if type(item) is dict else item
+
+    def discard(self, id: str) -> bool:
+        """
+        Removes a model by ID without building it, and returns whether there was one.
+        """
+        return self._items.pop(id, None) is not None
+
+    def peek(self, id: str) -> Any:
+        """
+        Gets an item by ID without building it, so it is either a model, its raw payload or `None`.
+        """
+        return self._items.get(id)
+
+    def ids(self) -> KeysView[str]:
+        """
+        The IDs of the models, without building them.
+        """
+        return self._items.keys()
+
+    @property
+    def built(self) -> int:
+        """The number of models which have been built."""
+        return sum(type(item) is not dict for item in self._items.values())
@@ -0,0 +1,239 @@
+"""
+    Contains the permission flags, and the functions which compute a member's permissions from their roles and a
+    channel's permission overwrites.
+
+    Permissions are kept as integers on the models, and are only turned into `Permissions` when they are read, as
+    combining flags is much slower than combining integers.
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+from enum import IntFlag
+from typing import TYPE_CHECKING
+
+from discord.model import Model
+
+if TYPE_CHECKING:
+    from discord.channels import GuildChannel
+    from discord.guild import Guild, GuildMember
+
+
+class Permissions(IntFlag):
+    """
+    Constants for the permissions, with their numerical values.
+
+    See more at: https://discord.com/developers/docs/topics/permissions#permissions-bitwise-permission-flags
+    """
+    CREATE_INSTANT_INVITE = 1 << 0
+    """Allows creating invites."""
+    KICK_MEMBERS = 1 << 1
+    """Allows kicking members."""
+    BAN_MEMBERS = 1 << 2
+    """Allows banning members."""
+    ADMINISTRATOR = 1 << 3
+    """Allows every permission, and bypasses channel permission overwrites."""
+    MANAGE_CHANNELS = 1 << 4
+    """Allows managing and editing channels."""
+    MANAGE_GUILD = 1 << 5
+    """Allows managing and editing the guild."""
+    ADD_REACTIONS = 1 << 6
+    """Allows adding new reactions to messages."""
+    VIEW_AUDIT_LOG = 1 << 7
+    """Allows viewing the audit log."""
+    PRIORITY_SPEAKER = 1 << 8
+    """Allows being a priority speaker in a voice channel."""
+    STREAM = 1 << 9
+    """Allows streaming video in a voice channel."""
+    VIEW_CHANNEL = 1 << 10
+    """Allows viewing a channel and reading its messages. Without this, a member has no permissions in a channel."""
+    SEND_MESSAGES = 1 << 11
+    """Allows sending messages in a channel."""
+    SEND_TTS_MESSAGES = 1 << 12
+    """Allows sending text-to-speech messages."""
+    MANAGE_MESSAGES = 1 << 13
+    """Allows deleting and pinning other users' messages."""
+    EMBED_LINKS = 1 << 14
+    """Allows links sent by the member to be embedded."""
+    ATTACH_FILES = 1 << 15
+    """Allows uploading files."""
+    READ_MESSAGE_HISTORY = 1 << 16
+    """Allows reading a channel's message history."""
+    MENTION_EVERYONE = 1 << 17
+    """Allows mentioning @everyone, @here and every role."""
+    USE_EXTERNAL_EMOJIS = 1 << 18
+    """Allows using emojis from other guilds."""
+    VIEW_GUILD_INSIGHTS = 1 << 19
+    """Allows viewing guild insights."""
+    CONNECT = 1 << 20
+    """Allows joining a voice channel."""
+    SPEAK = 1 << 21
+    """Allows speaking in a voice channel."""
+    MUTE_MEMBERS = 1 << 22
+    """Allows muting members in a voice channel."""
+    DEAFEN_MEMBERS = 1 << 23
+    """Allows deafening members in a voice channel."""
+    MOVE_MEMBERS = 1 << 24
+    """Allows moving members between voice channels."""
+    USE_VAD = 1 << 25
+    """Allows using voice activity detection in a voice channel."""
+    CHANGE_NICKNAME = 1 << 26
+    """Allows changing one's own nickname."""
+    MANAGE_NICKNAMES = 1 << 27
+    """Allows changing other members' nicknames."""
+    MANAGE_ROLES = 1 << 28
+    """Allows managing and editing roles."""
+    MANAGE_WEBHOOKS = 1 << 29
+    """Allows managing and editing webhooks."""
+    MANAGE_EMOJIS_AND_STICKERS = 1 << 30
+    """Allows managing and editing emojis and stickers."""
+    USE_APPLICATION_COMMANDS = 1 << 31
+    """Allows using application commands."""
+    REQUEST_TO_SPEAK = 1 << 32
+    """Allows requesting to speak in a stage channel."""
+    MANAGE_EVENTS = 1 << 33
+    """Allows managing and editing scheduled events."""
+    MANAGE_THREADS = 1 << 34
+    """Allows deleting, archiving and viewing every thread."""
+    CREATE_PUBLIC_THREADS = 1 << 35
+    """Allows creating public threads."""
+    CREATE_PRIVATE_THREADS = 1 << 36
+    """Allows creating private threads."""
+    USE_EXTERNAL_STICKERS = 1 << 37
+    """Allows using stickers from other guilds."""
+    SEND_MESSAGES_IN_THREADS = 1 << 38
+    """Allows sending messages in threads."""
+    USE_EMBEDDED_ACTIVITIES = 1 << 39
+    """Allows starting activities in a voice channel."""
+    MODERATE_MEMBERS = 1 << 40
+    """Allows timing out members."""
+
+
+ALL_PERMISSIONS = Permissions((1 << 64) - 1)
+"""Every permission, which the guild's owner and administrators have. This sets all 64 bits rather than only the known
+flags, so that permissions Discord adds later are not taken from them."""
+NO_PERMISSIONS = Permissions(0)
+
+_ADMINISTRATOR = Permissions.ADMINISTRATOR.value
+_VIEW_CHANNEL = Permissions.VIEW_CHANNEL.value
+_SEND_MESSAGES = Permissions.SEND_MESSAGES.value
+# Permissions which are lost with SEND_MESSAGES.
+_NEEDS_SEND_MESSAGES = (Permissions.SEND_TTS_MESSAGES | Permissions.EMBED_LINKS | Permissions.ATTACH_FILES
+                        | Permissions.MENTION_EVERYONE).value
+# The only permissions a member keeps while they are timed out.
+_TIMED_OUT = (Permissions.VIEW_CHANNEL | Permissions.READ_MESSAGE_HISTORY).value
+# Threads (news, public and private) use the permission overwrites of their parent channel.
+_THREAD_TYPES = frozenset({10, 11, 12})
+
+
+def parse_permissions(model: Model, value: str) -> int:
+    """
+    Parses a permissions field of a model. Discord sends permissions as strings, as they can be larger than 53 bits.
+    """
+    return int(value)
+
+
+class PermissionOverwrite(Model):
+    """
+        Represents the permissions a channel allows or denies for a role or a member.
+    """
+    _id: str
+    _type: int
+    _allow: int
+    _deny: int
+
+    _parsers = {'allow': parse_permissions, 'deny': parse_permissions}
+
+    def __repr__(self) -> str:
+        return f"<PermissionOverwrite id={self._id} type={self._type}>"
+
+    @property
+    def id(self) -> str:
+        """The ID of the role or user."""
+        return self._id
+
+    @property
+    def type(self) -> int:
+        """0 for a role, or 1 for a member."""
+        return self._type
+
+    @property
+    def allow(self) -> Permissions:
+        return Permissions(self._allow)
+
+    @property
+    def deny(self) -> Permissions:
+        return Permissions(self._deny)
+
+
+def compute_base_permissions(guild: Guild, member: GuildMember) -> Permissions:
+    """
+    Computes a member's permissions in a guild from the @everyone role and their roles.
+
+    **Parameters:**
+    - guild: The guild.
+    - member: The member of the guild.
+    """
+    if member.user.id == guild._owner_id:
+        return ALL_PERMISSIONS
+    everyone = guild.get_role(guild.id)
+    permissions = 0 if everyone is None else everyone._permissions
+    for role_id in member._roles or ():
+        role = guild.get_role(role_id)
+        if role is not None:
+            permissions |= role._permissions
+    if permissions & _ADMINISTRATOR:
+        return ALL_PERMISSIONS
+    return Permissions(permissions)
+
+
+def compute_overwrites(base: int, guild: Guild, channel: GuildChannel, member: GuildMember) -> Permissions:
+    """
+    Computes a member's permissions in a channel, by applying the channel's permission overwrites to their permissions
+    in its guild. The overwrite for @everyone is applied first, then those for the member's roles together, then the
+    one for the member.
+
+    **Parameters:**
+    - base: The member's permissions in the guild, from `compute_base_permissions`.
+    - guild: The guild.
+    - channel: The channel or thread.
+    - member: The member of the guild.
+    """
+    permissions = int(base)
+    if permissions & _ADMINISTRATOR:
+        return ALL_PERMISSIONS
+    if channel._type in _THREAD_TYPES and channel._parent_id is not None:
+        channel = guild.get_channel(channel._parent_id) or channel
+    overwrites = channel._permission_overwrites or {}
+    overwrite = overwrites.get(guild.id)
+    if overwrite is not None:
+        permissions = (permissions & ~overwrite._deny) | overwrite._allow
+    allow = deny = 0
+    for role_id in member._roles or ():
+        overwrite = overwrites.get(role_id)
+        if overwrite is not None:
+            allow |= overwrite._allow
+            deny |= overwrite._deny
+    permissions = (permissions & ~deny) | allow
+    overwrite = overwrites.get(member.user.id)
+    if overwrite is not None:
+        permissions = (permissions & ~overwrite._deny) | overwrite._allow
+    if not permissions & _VIEW_CHANNEL:
+        return NO_PERMISSIONS
+    if not permissions & _SEND_MESSAGES:
+        permissions &= ~_NEEDS_SEND_MESSAGES
+    return Permissions(permissions)
+
+
+def apply_timeout(permissions: Permissions, member: GuildMember) -> Permissions:
+    """
+    Removes the permissions a member loses while they are timed out. Administrators are not affected.
+
+    **Parameters:**
+    - permissions: The member's permissions in the guild or a channel.
+    - member: The member of the guild.
+    """
+    until = member._communication_disabled_until
+    if until is None or permissions.value & _ADMINISTRATOR:
+        return permissions
+    if datetime.fromisoformat(until) <= datetime.now(timezone.utc):
+        return permissions
+    return Permissions(permissions.value & _TIMED_OUT)
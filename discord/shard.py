@@ -0,0 +1,540 @@
+"""
+    Contains the classes used to connect to the Discord gateway.
+
+    Each `Shard` owns a single gateway connection. The `ShardManager` works out how many shards are needed, starts
+    them all on the same event loop and makes sure they identify within the limits given by Discord.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from enum import Enum, IntEnum
+from typing import TYPE_CHECKING, Optional, Union
+
+import aiohttp
+
+from .utils import DECOMPRESSORS, Codec, Decompressor, GatewayException, GatewayRateLimiter, get_codec
+
+if TYPE_CHECKING:
+    from discord.client import Client
+
+
+class GatewayEvents(IntEnum):
+    """
+    Contains constants for the gateway opcodes.
+    """
+    DISPATCH = 0
+    """An event was dispatched."""
+    HEARTBEAT = 1
+    """Sent at regular intervals by the client to keep the gateway connection alive."""
+    IDENTIFY = 2
+    """Used to identify yourself with the token during the initial handshake."""
+    PRESENCE = 3
+    """Used to update the client's presence."""
+    VOICE_STATE = 4
+    """Used to join and leave voice channels."""
+    VOICE_PING = 5
+    RESUME = 6
+    """Used to resume a disconnected session."""
+    RECONNECT = 7
+    """Used to reconnect to the session."""
+    REQUEST_MEMBERS = 8
+    """Used to request information about guild members when there are too many for """
+    INVALIDATE_SESSION = 9
+    """Means that the session is invalid. When this is received, you must reconnect and re-identify."""
+    HELLO = 10
+    """Acknowledgement of gateway connection."""
+    HEARTBEAT_ACK = 11
+    """Acknowledgement of gateway heartbeat."""
+    GUILD_SYNC = 12
+
+
+_FATAL_CLOSE_CODES = {4004, 4010, 4011, 4012, 4013, 4014}
+_INVALID_SESSION_CLOSE_CODES = {4007, 4009}
+
+
+class ShardStatus(Enum):
+    """
+    The state of a shard's gateway connection.
+    """
+    DISCONNECTED = 0
+    """The shard has not connected yet, or has lost its connection."""
+    CONNECTING = 1
+    """The shard is opening its websocket."""
+    IDENTIFYING = 2
+    """The shard is waiting to identify, or has identified and is waiting for READY."""
+    READY = 3
+    """The shard has received READY and is dispatching events."""
+    CLOSED = 4
+    """The shard was closed and will not reconnect."""
+
+
+class Heartbeat:
+    """
+    Sends heartbeats for one gateway connection of a `Shard` and measures their latency.
+    This should not be created manually, as the shard handles this.
+
+    The first heartbeat is sent after a random fraction of the interval, as required by Discord. If a heartbeat has
+    not been acknowledged by the time the next one is due, the connection is assumed to be dead and the shard
+    reconnects. This runs as its own task, so it keeps going while events are being handled.
+
+    Acknowledgements are read by the same task as events, so they are not read while the shard is waiting for room in
+    a full dispatch queue. A missed acknowledgement is not counted while that holds the shard up, as reconnecting
+    would only replay the events the listeners are already behind on.
+    """
+    def __init__(self, shard: Shard, interval: float):
+        self.shard = shard
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._sent: Optional[float] = None
+        self._acked = True
+        self._stalled = False
+
+    def start(self):
+        """
+        Starts sending heartbeats.
+        """
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """
+        Stops sending heartbeats.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(self.interval * random.random())
+        while True:
+            if not self._acked and not (self._stalled or self.shard._dispatch_waiting):
+                return await self.shard.reconnect()
+            self._stalled = False
+            await self.beat()
+            await asyncio.sleep(self.interval)
+
+    async def beat(self):
+        """
+        Sends a heartbeat straight away, carrying the shard's last sequence number.
+        """
+        self._acked = False
+        self._sent = time.perf_counter()
+        await self.shard.send({
+            "op": GatewayEvents.HEARTBEAT.value,
+            "d": self.shard.sequence
+        }, priority=True)
+
+    def ack(self):
+        """
+        Records that the gateway acknowledged the last heartbeat.
+        """
+        self._acked = True
+        if self._sent is not None:
+            self.shard.latencies.append(time.perf_counter() - self._sent)
+            self._sent = None
+
+    def stall(self):
+        """
+        Records that the shard stopped reading while it waited for the dispatch queue, so that an acknowledgement
+        which arrives late is not counted as missed.
+        """
+        self._stalled = True
+
+
+class Shard:
+    """
+    Represents a single connection to the Discord gateway.
+    This should not be created manually, as the `ShardManager` handles this.
+    """
+    MAX_BACKOFF = 60
+    """The longest time in seconds to wait before reconnecting."""
+    LATENCY_HISTORY = 100
+    """How many heartbeat latencies are kept for the average and percentiles."""
+
+    def __init__(self, client: Client, manager: ShardManager, shard_id: int, shard_count: int):
+        self.client = client
+        self.manager = manager
+        self.id = shard_id
+        self.count = shard_count
+        self.gateway: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.decompressor: Optional[Decompressor] = None
+        self.ratelimiter = GatewayRateLimiter()
+        self.heartbeat_interval: int = None
+        self.status = ShardStatus.DISCONNECTED
+        self._heartbeat: Optional[Heartbeat] = None
+        self._identify_task: Optional[asyncio.Task] = None
+        self._dispatch_waiting = False
+        self.latencies: deque[float] = deque(maxlen=self.LATENCY_HISTORY)
+        self._reconnects = 0
+        self.session_id: Optional[str] = None
+        self.sequence: Optional[int] = None
+        self.resume_gateway_url: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"<Shard id={self.id} count={self.count} status={self.status.name}>"
+
+    @property
+    def ready(self) -> bool:
+        """Whether the shard has received READY."""
+        return self.status == ShardStatus.READY
+
+    @property
+    def latency(self) -> float:
+        """The time in seconds between the last heartbeat and its acknowledgement."""
+        if not self.latencies:
+            return float('inf')
+        return self.latencies[-1]
+
+    @property
+    def average_latency(self) -> float:
+        """The average heartbeat latency in seconds over the last `LATENCY_HISTORY` heartbeats."""
+        if not self.latencies:
+            return float('inf')
+        return sum(self.latencies) / len(self.latencies)
+
+    def latency_percentile(self, percentile: float) -> float:
+        """
+        Gets a percentile of the heartbeat latency in seconds over the last `LATENCY_HISTORY` heartbeats.
+
+        **Parameters:**
+        - percentile: The percentile to get, from 0 to 100.
+        """
+        if not self.latencies:
+            return float('inf')
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    async def connect(self, url: str):
+        """
+        Connects the shard to the gateway and polls events. If the connection drops, the shard reconnects with
+        exponential backoff and resumes its session if it can.
+
+        **Parameters:**
+        - url: The gateway URL to connect to.
+        """
+        while self.status != ShardStatus.CLOSED:
+            self.status = ShardStatus.CONNECTING
+            self.ratelimiter = GatewayRateLimiter()
+            if self.manager.compress is not None:
+                self.decompressor = DECOMPRESSORS[self.manager.compress]()
+            try:
+                async with self.client.rest_client.session.ws_connect(self._connect_url(url)) as gateway:
+                    self.gateway = gateway
+                    await self.poll_event()
+                close_code = gateway.close_code
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                close_code = None
+            finally:
+                self.gateway = None
+                self._stop_heartbeat()
+                self._cancel_identify()
+            if self.status == ShardStatus.CLOSED:
+                break
+            if close_code in _FATAL_CLOSE_CODES:
+                self.status = ShardStatus.CLOSED
+                raise GatewayException(f"Shard {self.id} was closed by the gateway with code {close_code}")
+            if close_code in _INVALID_SESSION_CLOSE_CODES:
+                self.invalidate_session()
+            self.status = ShardStatus.DISCONNECTED
+            await asyncio.sleep(self._next_backoff())
+
+    def _connect_url(self, url: str) -> str:
+        if self.session_id is not None and self.resume_gateway_url is not None:
+            return f"{self.resume_gateway_url}/?{url.partition('?')[2]}"
+        return url
+
+    def _next_backoff(self) -> float:
+        delay = min(self.MAX_BACKOFF, 2 ** self._reconnects) * random.uniform(0.5, 1)
+        self._reconnects += 1
+        return delay
+
+    def invalidate_session(self):
+        """
+        Forgets the shard's session, so that the next connection identifies instead of resuming.
+        """
+        self.session_id = None
+        self.sequence = None
+        self.resume_gateway_url = None
+
+    async def send(self, data: dict, priority: bool = False):
+        """
+        Send data to the gateway. This waits if sending now would go over the gateway's rate limits.
+
+        **Parameters:**
+        - data: The data to send to the gateway.
+        - priority: Whether to skip the queue and use the capacity reserved for heartbeats.
+
+        **Raises:**
+        - GatewayException: The shard is not connected to the gateway, e.g. while it reconnects.
+        """
+        await self.ratelimiter.acquire(priority, data['op'] == GatewayEvents.PRESENCE)
+        if self.gateway is None or self.gateway.closed:
+            raise GatewayException(f"Shard {self.id} is not connected to the gateway")
+        codec = self.manager.codec
+        if codec.binary:
+            await self.gateway.send_bytes(codec.encode(data))
+        else:
+            await self.gateway.send_str(codec.encode(data))
+
+    async def recv(self, msg):
+        """
+        Receive data from the gateway.
+        """
+        if type(msg) is bytes and self.decompressor is not None:
+            msg = self.decompressor.feed(msg)
+            if msg is None:
+                return
+        peeked = self.manager.codec.peek(msg)
+        if peeked is not None and not self.client.wants(peeked[0], msg):
+            self.sequence = peeked[1]
+            return
+        msg = self.manager.codec.decode(msg)
+        opcode = msg['op']
+        data = msg['d']
+        if msg['s'] is not None:
+            self.sequence = msg['s']
+
+        if opcode != GatewayEvents.DISPATCH:
+            if opcode == GatewayEvents.RECONNECT:
+                return await self.reconnect()
+
+            if opcode == GatewayEvents.INVALIDATE_SESSION:
+                if not data:
+                    self.invalidate_session()
+                await asyncio.sleep(random.uniform(1, 5))
+                return await self.reconnect()
+
+            if opcode == GatewayEvents.HELLO:
+                self.heartbeat_interval = data['heartbeat_interval']
+                self._stop_heartbeat()
+                self._heartbeat = Heartbeat(self, self.heartbeat_interval / 1000)
+                self._heartbeat.start()
+                if self.session_id is not None:
+                    return await self.resume()
+                # Identifying can wait a long time for the identify bucket, so events keep being read meanwhile.
+                self._cancel_identify()
+                self._identify_task = asyncio.create_task(self.identify())
+                return
+
+            if opcode == GatewayEvents.HEARTBEAT_ACK:
+                if self._heartbeat is not None:
+                    self._heartbeat.ack()
+                return
+
+            if opcode == GatewayEvents.HEARTBEAT:
+                if self._heartbeat is not None:
+                    return await self._heartbeat.beat()
+            return
+
+        match msg['t']:
+            case 'READY':
+                self.session_id = data['session_id']
+                self.resume_gateway_url = data.get('resume_gateway_url')
+                self.status = ShardStatus.READY
+                self._reconnects = 0
+            case 'RESUMED':
+                self.status = ShardStatus.READY
+                self._reconnects = 0
+        queue = self.client.dispatch_queue
+        if queue.depth < queue.maxsize:
+            return await queue.put(msg['t'], data, self)
+        # The queue is full, so this may wait for the listeners to catch up, with nothing read from the gateway.
+        self._dispatch_waiting = True
+        try:
+            await queue.put(msg['t'], data, self)
+        finally:
+            self._dispatch_waiting = False
+            if self._heartbeat is not None:
+                self._heartbeat.stall()
+
+    async def reconnect(self):
+        """
+        Closes the shard's gateway connection without ending the session, so that the shard reconnects and resumes.
+        """
+        if self.gateway is not None:
+            await self.gateway.close(code=4000)
+
+    async def close(self):
+        """
+        Close the shard's gateway connection.
+        """
+        self.status = ShardStatus.CLOSED
+        if self.gateway is not None:
+            await self.gateway.close()
+
+    async def poll_event(self):
+        async for msg in self.gateway:
+            if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                await self.recv(msg.data)
+            elif msg.type == aiohttp.WSMsgType.CLOSED:
+                break
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                break
+
+    def _stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._heartbeat.stop()
+            self._heartbeat = None
+
+    def _cancel_identify(self):
+        # An identify waiting for its bucket belongs to the connection it was started for, and must not be sent on
+        # the next one.
+        if self._identify_task is not None:
+            self._identify_task.cancel()
+            self._identify_task = None
+
+    async def resume(self):
+        """
+        Resume the shard's session. The gateway then replays every event that was missed since `sequence`.
+        """
+        self.status = ShardStatus.IDENTIFYING
+        resume = {
+            "op": GatewayEvents.RESUME.value,
+            "d": {
+                "token": self.client._token,
+                "session_id": self.session_id,
+                "seq": self.sequence
+            }
+        }
+        await self.send(resume)
+
+    async def identify(self):
+        """
+        Identify the shard. This waits for the shard's identify bucket to become free first.
+        """
+        self.status = ShardStatus.IDENTIFYING
+        await self.manager.wait_for_identify(self.id)
+        identify = {
+            "op": GatewayEvents.IDENTIFY.value,
+            "d": {
+                "token": self.client._token,
+                "intents": self.client.code,
+                "shard": [self.id, self.count],
+                "properties": {
+                    "os": sys.platform,
+                    "browser": "discobra",
+                    "device": "discobra"
+                }
+            }
+        }
+        await self.send(identify)
+
+
+class ShardManager:
+    """
+    Starts and keeps track of every `Shard` used by a `discord.client.Client`.
+    This should not be created manually, as the client handles this.
+    """
+    IDENTIFY_DELAY = 5
+    """How many seconds each identify bucket must wait between identifies."""
+
+    def __init__(self, client: Client, shard_count: Optional[int] = None, shard_ids: Optional[list[int]] = None,
+                 url: Optional[str] = None, compress: Optional[str] = None, encoding: Union[str, Codec] = 'json'):
+        if compress is not None and compress not in DECOMPRESSORS:
+            raise ValueError(f"Unknown compression {compress!r}, must be one of {', '.join(DECOMPRESSORS)}")
+        self.client = client
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.max_concurrency = 1
+        self.url = url or "wss://gateway.discord.gg"
+        self._fixed_url = url is not None
+        self.compress = compress
+        self.codec = get_codec(encoding)
+        self.shards: dict[int, Shard] = {}
+        self._identify_locks: dict[int, asyncio.Lock] = {}
+        self._last_identify: dict[int, float] = {}
+
+    async def fetch_gateway(self):
+        """
+        Fetches the gateway URL, the recommended shard count and the identify concurrency from Discord.
+        """
+        data = await self.client.rest_client.get('/gateway/bot')
+        if not self._fixed_url:
+            self.url = data['url']
+        if self.shard_count is None:
+            self.shard_count = data['shards']
+        self.max_concurrency = data['session_start_limit']['max_concurrency']
+
+    async def start(self):
+        """
+        Creates every shard and connects them all to the gateway. Discord is only asked for the gateway details when
+        the gateway URL or the shard count were not given.
+        """
+        if not self._fixed_url or self.shard_count is None:
+            await self.fetch_gateway()
+        shard_ids = self.shard_ids if self.shard_ids is not None else range(self.shard_count)
+        self.shards = {i: Shard(self.client, self, i, self.shard_count) for i in shard_ids}
+        url = f"{self.url}/?v=10&encoding={self.codec.encoding}"
+        if self.compress is not None:
+            url += f"&compress={self.compress}"
+        await asyncio.gather(*(shard.connect(url) for shard in self.shards.values()))
+
+    async def wait_for_identify(self, shard_id: int):
+        """
+        Waits until the identify bucket for a shard is free. Shards in different buckets can identify at the same
+        time, so up to `max_concurrency` shards identify at once.
+
+        **Parameters:**
+        - shard_id: The ID of the shard that wants to identify.
+        """
+        key = shard_id % self.max_concurrency
+        lock = self._identify_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            delay = self._last_identify.get(key, 0) + self.IDENTIFY_DELAY - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last_identify[key] = time.monotonic()
+
+    def shard_for(self, guild_id: str) -> Optional[Shard]:
+        """
+        Gets the shard which receives events for a guild.
+
+        **Parameters:**
+        - guild_id: The ID of the guild.
+        """
+        return self.shards.get((int(guild_id) >> 22) % self.shard_count)
+
+    async def close(self):
+        """
+        Closes every shard.
+        """
+        await asyncio.gather(*(shard.close() for shard in self.shards.values()))
+
+    @property
+    def ready(self) -> bool:
+        """Whether every shard has received READY."""
+        return bool(self.shards) and all(shard.ready for shard in self.shards.values())
+
+    @property
+    def statuses(self) -> dict[int, ShardStatus]:
+        """The status of every shard, keyed by shard ID."""
+        return {i: shard.status for i, shard in self.shards.items()}
+
+    @property
+    def compression_stats(self) -> dict[int, dict]:
+        """The transport compression stats of every shard, keyed by shard ID."""
+        return {i: shard.decompressor.stats for i, shard in self.shards.items() if shard.decompressor is not None}
+
+    @property
+    def latencies(self) -> dict[int, float]:
+        """The heartbeat latency of every shard in seconds, keyed by shard ID."""
+        return {i: shard.latency for i, shard in self.shards.items()}
+
+    @property
+    def send_stats(self) -> dict[int, dict]:
+        """The send rate limiter stats of every shard's current connection, keyed by shard ID."""
+        return {i: shard.ratelimiter.stats for i, shard in self.shards.items()}
+
+    @property
+    def latency_stats(self) -> dict[int, dict]:
+        """The last, average, median, 95th and 99th percentile heartbeat latency of every shard, keyed by shard ID."""
+        return {i: {
+            "latency": shard.latency,
+            "average": shard.average_latency,
+            "p50": shard.latency_percentile(50),
+            "p95": shard.latency_percentile(95),
+            "p99": shard.latency_percentile(99)
+        } for i, shard in self.shards.items()}
@@ -1,25 +1,24 @@
 from discord.flags import get_flags, Flags
+from discord.model import Model
 from discord.premium_type import PremiumType
 
 
-class User:
+class User(Model):
+    # Users are held weakly by `discord.cache.ClientCache`, so that each user is one object until nothing uses it.
+    __slots__ = ('__weakref__',)
     _id: str
     _username: str
     _discriminator: str
+    _global_name: str
     _avatar: str
+    _avatar_decoration_data: dict
     _bot: bool
-    _system: bool
-    _mfa_enabled: bool
-    _banner: str
-    _accent_color: int
-    _locale: str
-    _verified: bool
-    _email: str
-    _pronouns: str
-    _bio: str
-    _flags: list[Flags]
-    _premium_type: PremiumType
-    _public_flags: list[Flags]
+    # Flags are kept as the integer Discord sends, and only turned into lists when they are read.
+    _public_flags: int
+    # Email, locale, flags, premium type, banner, bio and so on are only sent for the bot's own user or with a full
+    # profile, so they are left in `extra` rather than costing every member's user a slot.
+
+    _parsers = {'premium_type': lambda self, value: PremiumType(value)}
 
     @property
     def id(self):
@@ -36,6 +35,11 @@ class User:
         """The user's 4-digit tag."""
         return self._discriminator
 
+    @property
+    def global_name(self):
+        """The user's display name, if they have set one."""
+        return self._global_name
+
     @property
     def avatar(self):
         """The user's avatar hash."""
@@ -49,71 +53,70 @@ class User:
     @property
     def pronouns(self):
         """The user's pronouns (not yet implemented into Discord frontend)."""
-        return self._pronouns
+        return self._get_extra('pronouns')
 
     @property
     def bio(self):
         """The contents of the user's About Me section."""
-        return self._bio
+        return self._get_extra('bio')
 
     @property
     def system(self):
         """Whether the user is an Official Discord System user (for urgent messages)."""
-        return self._system
+        return self._get_extra('system')
 
     @property
     def mfa_enabled(self):
         """Whether the user has 2FA set up."""
-        return self._mfa_enabled
+        return self._get_extra('mfa_enabled')
 
     @property
     def banner(self):
         """The user's banner hash."""
-        return self._banner
+        return self._get_extra('banner')
 
     @property
     def accent_color(self):
         """The user's banner color."""
-        return self._accent_color
+        return self._get_extra('accent_color')
 
     @property
     def locale(self):
         """The user's chosen language."""
-        return self._locale
+        return self._get_extra('locale')
 
     @property
     def verified(self):
         """Whether the email on the user's account is verified."""
-        return self._verified
+        return self._get_extra('verified')
 
     @property
     def email(self):
         """The user's email."""
-        return self._email
+        return self._get_extra('email')
 
     @property
     def flags(self):
         """The flags on the user's account."""
-        return self._flags
+        flags = self._get_extra('flags')
+        return None if flags is None else get_flags(flags)
 
     @property
     def premium_type(self):
         """The type of Nitro subscription on a user's account."""
-        return self._premium_type
+        return self._get_extra('premium_type')
 
     @property
     def public_flags(self):
         """The public flags on a user's account."""
-        return self._public_flags
-
-    def __init__(self, data: dict):
-        for k in data:
-            if k == "flags" or k == "public_flags":
-                setattr(self, f"_{k}", get_flags(data[k]))
-            elif k == "premium_type":
-                setattr(self, f"_{k}", PremiumType(data[k]))
-            else:
-                setattr(self, f"_{k}", data[k])
+        return None if self._public_flags is None else get_flags(self._public_flags)
 
     def __repr__(self) -> str:
         return f"<User id={self.id} username={self.username} discriminator={self.discriminator}>"
+
+
+def user_parser(model: Model, value) -> User:
+    """
+    Parses a user field of a model. The value may already be a `User`, e.g. one shared through the client's cache.
+    """
+    return value if type(value) is User else User(value)
@@ -1,3 +1,13 @@
+from .bounded_cache import *
+from .codec import *
+from .compression import *
+from .dispatch_queue import *
 from .event_emitter import *
 from .exceptions import *
-from .rest import *
\ No newline at end of file
+from .http import *
+from .pagination import *
+from .ratelimit import *
+from .resilience import *
+from .rest import *
+from .rest_cache import *
+from .ring_buffer import *
\ No newline at end of file
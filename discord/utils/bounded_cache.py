@@ -0,0 +1,178 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+_MISSING = object()
+
+
+class CachePolicy:
+    """
+    How many entries a `BoundedCache` keeps, and for how long. Use `keep_all`, `lru`, `expiring` or `disabled` to make
+    one.
+
+    **Parameters:**
+    - maxsize: The most entries to keep. When this is reached, the least recently used entry is evicted. If this is
+    `None`, there is no limit.
+    - ttl: How many seconds an entry is kept after it was last stored. If this is `None`, entries do not expire.
+    - enabled: Whether anything is cached at all.
+    """
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None, enabled: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def __repr__(self) -> str:
+        return f"<CachePolicy maxsize={self.maxsize} ttl={self.ttl} enabled={self.enabled}>"
+
+    @property
+    def bounded(self) -> bool:
+        """Whether entries are ever evicted, or never stored at all."""
+        return not self.enabled or self.maxsize is not None or self.ttl is not None
+
+    @classmethod
+    def keep_all(cls) -> 'CachePolicy':
+        """Keep every entry until it is removed."""
+        return cls()
+
+    @classmethod
+    def lru(cls, maxsize: int) -> 'CachePolicy':
+        """Keep the `maxsize` most recently used entries."""
+        return cls(maxsize=maxsize)
+
+    @classmethod
+    def expiring(cls, ttl: float, maxsize: Optional[int] = None) -> 'CachePolicy':
+        """
+        Keep entries for `ttl` seconds after they were last stored, and at most `maxsize` of them. When there are too
+        many, the entry stored longest ago is evicted, whether or not it was read since.
+        """
+        return cls(maxsize=maxsize, ttl=ttl)
+
+    @classmethod
+    def disabled(cls) -> 'CachePolicy':
+        """Keep nothing."""
+        return cls(enabled=False)
+
+
+class BoundedCache:
+    """
+    A cache which keeps its entries according to a `CachePolicy`.
+
+    Entries are kept in the order they were last used, so the entry to evict is always the first one. Expired entries
+    are removed when they are read, and from the front of the cache whenever an entry is stored, so eviction never
+    has to search the cache.
+
+    **Parameters:**
+    - policy: How many entries to keep, and for how long.
+    - on_evict: Called with the key and value of each entry which is evicted or expires, but not of entries which are
+    removed with `pop`.
+    """
+    def __init__(self, policy: Optional[CachePolicy] = None,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.policy = policy or CachePolicy.keep_all()
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._expires: dict[Hashable, float] = {}
+
+    @property
+    def stats(self) -> dict:
+        """The number of entries, hits, misses, evictions and expirations, and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.policy.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(tuple(self._entries))
+
+    def values(self) -> list:
+        """
+        The cached values, without counting as lookups.
+        """
+        return list(self._entries.values())
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Gets an entry, counting a hit or a miss and marking it as recently used.
+        """
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING or (self.policy.ttl is not None and self._expire(key)):
+            self.misses += 1
+            return default
+        # Entries which expire are kept in the order they were stored, which is the order they expire in, so reading one
+        # does not move it. With a maxsize as well, the entry stored longest ago is evicted first.
+        if self.policy.maxsize is not None and self.policy.ttl is None:
+            self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Gets an entry without counting a lookup or marking it as used.
+        """
+        return self._entries.get(key, default)
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Stores an entry, evicting others if the policy requires it.
+        """
+        policy = self.policy
+        if not policy.enabled:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if policy.ttl is not None:
+            now = time.monotonic()
+            self._expires[key] = now + policy.ttl
+            self._sweep(now)
+        if policy.maxsize is not None:
+            while len(self._entries) > policy.maxsize:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._expires.pop(old_key, None)
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(old_key, old_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes an entry and returns it.
+        """
+        self._expires.pop(key, None)
+        return self._entries.pop(key, default)
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        self._entries.clear()
+        self._expires.clear()
+
+    def _expire(self, key: Hashable, now: Optional[float] = None) -> bool:
+        if self._expires[key] > (now or time.monotonic()):
+            return False
+        value = self._entries.pop(key)
+        del self._expires[key]
+        self.expirations += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+        return True
+
+    def _sweep(self, now: float):
+        # Entries are stored in order, so expired entries are at the front, apart from any which were read since.
+        while self._entries and self._expire(next(iter(self._entries)), now):
+            pass
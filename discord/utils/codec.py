@@ -0,0 +1,347 @@
+import json
+import re
+import struct
+import zlib
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import erlpack
+except ImportError:
+    erlpack = None
+
+
+class Codec:
+    """
+    Base class for the encodings used to talk to the gateway. The codec is chosen when the
+    `discord.client.Client` is created, and decides both the `encoding` in the gateway URL and how frames are read
+    and written.
+    """
+    encoding: str = None
+    """The name of the encoding used in the gateway URL."""
+    binary: bool = False
+    """Whether encoded payloads are sent as binary websocket frames."""
+
+    def decode(self, data: Union[str, bytes, bytearray]) -> dict:
+        """
+        Decode a payload received from the gateway.
+
+        **Parameters:**
+        - data: The raw (decompressed) payload.
+        """
+        raise NotImplementedError
+
+    def encode(self, data: dict) -> Union[str, bytes]:
+        """
+        Encode a payload to send to the gateway.
+
+        **Parameters:**
+        - data: The payload to send.
+        """
+        raise NotImplementedError
+
+    def peek(self, data: Union[str, bytes, bytearray]) -> Optional[tuple[str, int]]:
+        """
+        Reads the event name and sequence number of a dispatch without decoding the rest of the payload.
+
+        **Parameters:**
+        - data: The raw (decompressed) payload.
+
+        **Returns:**
+        - tuple[str, int] | None: The event name and sequence number, or `None` if they could not be read cheaply.
+        """
+        return None
+
+
+_PEEK_STR = re.compile(r'\{"t":"([A-Z_]+)","s":(\d+)')
+_PEEK_BYTES = re.compile(rb'\{"t":"([A-Z_]+)","s":(\d+)')
+
+
+class JSONCodec(Codec):
+    """
+    The `json` encoding. `orjson` is used if it is installed, as it is several times faster than the standard library.
+
+    **Parameters:**
+    - backend: Either `orjson` or `json`. If this is not given, the fastest installed backend is used.
+    """
+    encoding = 'json'
+
+    def __init__(self, backend: str = None):
+        if backend is None:
+            backend = 'orjson' if orjson is not None else 'json'
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("The orjson backend needs the orjson package: pip install orjson")
+        if backend not in ('orjson', 'json'):
+            raise ValueError(f"Unknown JSON backend {backend!r}")
+        self.backend = backend
+        if backend == 'orjson':
+            self.decode = orjson.loads
+            self.encode = self._encode_orjson
+        else:
+            self.decode = json.loads
+            self.encode = json.dumps
+
+    @staticmethod
+    def _encode_orjson(data: dict) -> str:
+        return orjson.dumps(data).decode('utf-8')
+
+    def peek(self, data: Union[str, bytes, bytearray]) -> Optional[tuple[str, int]]:
+        # The gateway sends the keys of dispatches in the order t, s, op, d, so the event name and sequence number
+        # are always at the start of the payload. Anything else is left to the full decoder.
+        match = (_PEEK_STR if isinstance(data, str) else _PEEK_BYTES).match(data)
+        if match is None:
+            return None
+        event, sequence = match.groups()
+        if not isinstance(event, str):
+            event = event.decode('ascii')
+        return event, int(sequence)
+
+
+class ETFCodec(Codec):
+    """
+    The `etf` (Erlang External Term Format) encoding. `erlpack` is used if it is installed, otherwise the pure-Python
+    encoder and decoder in this module are used.
+
+    Snowflakes are sent as 64-bit integers in ETF, so big integers are decoded as strings to match the JSON encoding.
+
+    **Parameters:**
+    - backend: Either `erlpack` or `python`. If this is not given, the fastest installed backend is used.
+    """
+    encoding = 'etf'
+    binary = True
+
+    def __init__(self, backend: str = None):
+        if backend is None:
+            backend = 'erlpack' if erlpack is not None else 'python'
+        if backend == 'erlpack' and erlpack is None:
+            raise RuntimeError("The erlpack backend needs the erlpack package: pip install erlpack")
+        if backend not in ('erlpack', 'python'):
+            raise ValueError(f"Unknown ETF backend {backend!r}")
+        self.backend = backend
+        if backend == 'erlpack':
+            self.decode = self._decode_erlpack
+            self.encode = erlpack.pack
+        else:
+            self.decode = etf_decode
+            self.encode = etf_encode
+
+    @staticmethod
+    def _decode_erlpack(data: Union[bytes, bytearray]) -> dict:
+        return _normalise(erlpack.unpack(bytes(data)))
+
+
+def _normalise(term: Any) -> Any:
+    # erlpack leaves atoms and binaries as bytes-like objects and snowflakes as ints.
+    if isinstance(term, dict):
+        return {_normalise(k): _normalise(v) for k, v in term.items()}
+    if isinstance(term, list):
+        return [_normalise(v) for v in term]
+    if isinstance(term, bytes):
+        return term.decode('utf-8')
+    if type(term) is int and term > 0x7FFFFFFF:
+        return str(term)
+    if isinstance(term, str):
+        return str(term)
+    return term
+
+
+_VERSION = 131
+_NEW_FLOAT = 70
+_COMPRESSED = 80
+_SMALL_INTEGER = 97
+_INTEGER = 98
+_FLOAT = 99
+_ATOM = 100
+_SMALL_TUPLE = 104
+_LARGE_TUPLE = 105
+_NIL = 106
+_STRING = 107
+_LIST = 108
+_BINARY = 109
+_SMALL_BIG = 110
+_LARGE_BIG = 111
+_SMALL_ATOM = 115
+_MAP = 116
+_ATOM_UTF8 = 118
+_SMALL_ATOM_UTF8 = 119
+
+_ATOMS = {'nil': None, 'null': None, 'true': True, 'false': False}
+
+_unpack_u16 = struct.Struct('>H').unpack_from
+_unpack_u32 = struct.Struct('>I').unpack_from
+_unpack_i32 = struct.Struct('>i').unpack_from
+_unpack_f64 = struct.Struct('>d').unpack_from
+
+
+def etf_decode(data: Union[bytes, bytearray, memoryview]) -> Any:
+    """
+    Decode an ETF payload in pure Python.
+
+    **Parameters:**
+    - data: The payload, starting with the ETF version byte.
+    """
+    data = memoryview(data)
+    if data[0] != _VERSION:
+        raise ValueError(f"Unknown ETF version {data[0]}")
+    if data[1] == _COMPRESSED:
+        data = memoryview(b'\x83' + zlib.decompress(data[6:]))
+    return _decode(data, 1)[0]
+
+
+def _decode(data: memoryview, i: int) -> tuple[Any, int]:
+    tag = data[i]
+    i += 1
+    if tag == _MAP:
+        (arity,) = _unpack_u32(data, i)
+        i += 4
+        result = {}
+        for _ in range(arity):
+            key, i = _decode(data, i)
+            result[key], i = _decode(data, i)
+        return result, i
+    if tag == _BINARY:
+        (length,) = _unpack_u32(data, i)
+        i += 4
+        return str(data[i:i + length], 'utf-8'), i + length
+    if tag == _SMALL_INTEGER:
+        return data[i], i + 1
+    if tag == _INTEGER:
+        return _unpack_i32(data, i)[0], i + 4
+    if tag in (_SMALL_ATOM_UTF8, _SMALL_ATOM):
+        length = data[i]
+        i += 1
+        atom = str(data[i:i + length], 'utf-8')
+        return _ATOMS.get(atom, atom), i + length
+    if tag in (_ATOM_UTF8, _ATOM):
+        (length,) = _unpack_u16(data, i)
+        i += 2
+        atom = str(data[i:i + length], 'utf-8')
+        return _ATOMS.get(atom, atom), i + length
+    if tag == _LIST:
+        (length,) = _unpack_u32(data, i)
+        i += 4
+        result = []
+        for _ in range(length):
+            value, i = _decode(data, i)
+            result.append(value)
+        tail, i = _decode(data, i)
+        return result, i
+    if tag == _NIL:
+        return [], i
+    if tag in (_SMALL_BIG, _LARGE_BIG):
+        if tag == _SMALL_BIG:
+            length = data[i]
+            i += 1
+        else:
+            (length,) = _unpack_u32(data, i)
+            i += 4
+        sign = data[i]
+        value = int.from_bytes(data[i + 1:i + 1 + length], 'little')
+        if sign:
+            value = -value
+        return (str(value) if value > 0x7FFFFFFF else value), i + 1 + length
+    if tag == _STRING:
+        (length,) = _unpack_u16(data, i)
+        i += 2
+        return str(data[i:i + length], 'utf-8'), i + length
+    if tag == _NEW_FLOAT:
+        return _unpack_f64(data, i)[0], i + 8
+    if tag == _FLOAT:
+        return float(str(data[i:i + 31], 'ascii').rstrip('\x00')), i + 31
+    if tag in (_SMALL_TUPLE, _LARGE_TUPLE):
+        if tag == _SMALL_TUPLE:
+            arity = data[i]
+            i += 1
+        else:
+            (arity,) = _unpack_u32(data, i)
+            i += 4
+        result = []
+        for _ in range(arity):
+            value, i = _decode(data, i)
+            result.append(value)
+        return tuple(result), i
+    raise ValueError(f"Unknown ETF tag {tag}")
+
+
+def etf_encode(data: Any) -> bytes:
+    """
+    Encode a payload as ETF in pure Python.
+
+    **Parameters:**
+    - data: The payload to encode.
+    """
+    buffer = bytearray([_VERSION])
+    _encode(data, buffer)
+    return bytes(buffer)
+
+
+def _encode(term: Any, buffer: bytearray):
+    if term is None:
+        buffer += b'\x77\x03nil'
+    elif term is True:
+        buffer += b'\x77\x04true'
+    elif term is False:
+        buffer += b'\x77\x05false'
+    elif isinstance(term, int):
+        if 0 <= term <= 255:
+            buffer += bytes((_SMALL_INTEGER, term))
+        elif -2 ** 31 <= term < 2 ** 31:
+            buffer.append(_INTEGER)
+            buffer += term.to_bytes(4, 'big', signed=True)
+        else:
+            magnitude = abs(term)
+            digits = magnitude.to_bytes((magnitude.bit_length() + 7) // 8, 'little')
+            buffer += bytes((_SMALL_BIG, len(digits), 1 if term < 0 else 0))
+            buffer += digits
+    elif isinstance(term, float):
+        buffer.append(_NEW_FLOAT)
+        buffer += struct.pack('>d', term)
+    elif isinstance(term, str):
+        encoded = term.encode('utf-8')
+        buffer.append(_BINARY)
+        buffer += len(encoded).to_bytes(4, 'big')
+        buffer += encoded
+    elif isinstance(term, (bytes, bytearray)):
+        buffer.append(_BINARY)
+        buffer += len(term).to_bytes(4, 'big')
+        buffer += term
+    elif isinstance(term, dict):
+        buffer.append(_MAP)
+        buffer += len(term).to_bytes(4, 'big')
+        for key, value in term.items():
+            _encode(key, buffer)
+            _encode(value, buffer)
+    elif isinstance(term, (list, tuple)):
+        if term:
+            buffer.append(_LIST)
+            buffer += len(term).to_bytes(4, 'big')
+            for value in term:
+                _encode(value, buffer)
+        buffer.append(_NIL)
+    else:
+        raise TypeError(f"Cannot encode {type(term).__name__} as ETF")
+
+
+CODECS = {
+    JSONCodec.encoding: JSONCodec,
+    ETFCodec.encoding: ETFCodec
+}
+"""The available gateway encodings, keyed by the name used in the gateway URL."""
+
+
+def get_codec(encoding: Union[str, Codec]) -> Codec:
+    """
+    Gets the codec for a gateway encoding.
+
+    **Parameters:**
+    - encoding: Either the name of the encoding (`json` or `etf`), or a `Codec` instance which is returned as-is.
+    """
+    if isinstance(encoding, Codec):
+        return encoding
+    if encoding not in CODECS:
+        raise ValueError(f"Unknown encoding {encoding!r}, must be one of {', '.join(CODECS)}")
+    return CODECS[encoding]()
@@ -0,0 +1,112 @@
+import time
+import zlib
+from typing import Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZLIB_SUFFIX = b'\x00\x00\xff\xff'
+
+
+class Decompressor:
+    """
+    Base class for gateway transport decompression. One decompressor is used for the whole lifetime of a gateway
+    connection, as the compression context is shared between messages.
+    """
+    name: str = None
+
+    def __init__(self):
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self.time = 0.0
+        self._output = bytearray()
+
+    @property
+    def ratio(self) -> float:
+        """How many times smaller the data received from the gateway was than the decompressed data."""
+        if not self.compressed_bytes:
+            return 1.0
+        return self.decompressed_bytes / self.compressed_bytes
+
+    @property
+    def stats(self) -> dict:
+        """The number of bytes received, the number of bytes after decompression, the ratio and the time spent."""
+        return {
+            "compressed_bytes": self.compressed_bytes,
+            "decompressed_bytes": self.decompressed_bytes,
+            "ratio": self.ratio,
+            "time": self.time
+        }
+
+    def feed(self, data: bytes) -> Optional[Union[bytes, bytearray]]:
+        """
+        Decompress a message from the gateway.
+
+        **Parameters:**
+        - data: The raw websocket message.
+
+        **Returns:**
+        - bytes | bytearray | None: The decompressed payload, or `None` if the payload is not complete yet.
+        A `bytearray` is reused for the next payload, so it must be used before `feed` is called again.
+        """
+        raise NotImplementedError
+
+
+class ZlibStreamDecompressor(Decompressor):
+    """
+    Decompresses `zlib-stream` transport compression. Each message is fed to the inflator as soon as it arrives, so
+    the compressed data is never copied into a buffer. A payload is complete when a message ends with the zlib
+    flush suffix.
+    """
+    name = 'zlib-stream'
+
+    def __init__(self):
+        super().__init__()
+        self._inflator = zlib.decompressobj()
+        self._partial = False
+
+    def feed(self, data: bytes) -> Optional[Union[bytes, bytearray]]:
+        start = time.perf_counter()
+        chunk = self._inflator.decompress(data)
+        self.compressed_bytes += len(data)
+        self.decompressed_bytes += len(chunk)
+        complete = data[-4:] == ZLIB_SUFFIX
+        if not complete or self._partial:
+            if not self._partial:
+                del self._output[:]
+                self._partial = True
+            self._output += chunk
+            chunk = self._output if complete else None
+            self._partial = not complete
+        self.time += time.perf_counter() - start
+        return chunk
+
+
+class ZstdStreamDecompressor(Decompressor):
+    """
+    Decompresses `zstd-stream` transport compression. This needs the `zstandard` package.
+    """
+    name = 'zstd-stream'
+
+    def __init__(self):
+        super().__init__()
+        if zstandard is None:
+            raise RuntimeError("zstd-stream compression needs the zstandard package: pip install zstandard")
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def feed(self, data: bytes) -> Optional[Union[bytes, bytearray]]:
+        start = time.perf_counter()
+        chunk = self._decompressor.decompress(data)
+        self.compressed_bytes += len(data)
+        self.decompressed_bytes += len(chunk)
+        self.time += time.perf_counter() - start
+        return chunk or None
+
+
+DECOMPRESSORS = {
+    ZlibStreamDecompressor.name: ZlibStreamDecompressor,
+    ZstdStreamDecompressor.name: ZstdStreamDecompressor
+}
+"""The available transport compression types, keyed by the name used in the gateway URL."""
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+
+class OverflowPolicy(Enum):
+    """
+    What a `DispatchQueue` does with an event when it is full.
+    """
+    BLOCK = 0
+    """Wait for space in the queue. This stops the shard reading from the gateway until the listeners catch up."""
+    DROP_OLDEST = 1
+    """Drop the oldest queued event of the same type to make room. If there is none, the new event is dropped."""
+    COALESCE = 2
+    """Replace the latest queued event with the same key (e.g. the same user's presence) with the new one, otherwise
+    block. Until the queue is full, every event is queued."""
+
+
+def _member_key(data: dict) -> Any:
+    return data.get('guild_id'), data.get('user', {}).get('id')
+
+
+COALESCE_KEYS: Dict[str, Callable[[dict], Any]] = {
+    'PRESENCE_UPDATE': _member_key,
+    'GUILD_MEMBER_UPDATE': _member_key,
+    'TYPING_START': lambda data: (data.get('channel_id'), data.get('user_id')),
+    'VOICE_STATE_UPDATE': lambda data: (data.get('guild_id'), data.get('user_id')),
+    'CHANNEL_UPDATE': lambda data: data.get('id'),
+    'GUILD_UPDATE': lambda data: data.get('id')
+}
+"""How queued events are matched when they are coalesced, keyed by event name."""
+
+
+class DispatchQueue:
+    """
+    A bounded queue between the shards reading from the gateway and the workers handling events. This keeps slow
+    listeners from stopping the shards reading, unless the queue fills up and the event's policy is to block.
+
+    **Parameters:**
+    - maxsize: The most events that can be queued.
+    - policies: The `OverflowPolicy` of each event, keyed by event name. Events which are not given block.
+    - coalesce_keys: Extra functions to match events for `OverflowPolicy.COALESCE`, keyed by event name.
+
+    **Raises:**
+    - ValueError: An event is coalesced, but has no function in `COALESCE_KEYS` or `coalesce_keys` to match it.
+    """
+    def __init__(self, maxsize: int = 1000, policies: Optional[Dict[str, OverflowPolicy]] = None,
+                 coalesce_keys: Optional[Dict[str, Callable[[dict], Any]]] = None):
+        self.maxsize = maxsize
+        self.policies = policies or {}
+        self.coalesce_keys = {**COALESCE_KEYS, **(coalesce_keys or {})}
+        for event, policy in self.policies.items():
+            if policy == OverflowPolicy.COALESCE and event not in self.coalesce_keys:
+                raise ValueError(f"{event} cannot be coalesced without a function in coalesce_keys to match it")
+        self.dropped = 0
+        self.coalesced = 0
+        self._size = 0
+        # Entries are [event, data, shard, enqueued at, alive, coalesce key]. Dropped entries are marked dead rather
+        # than removed, so that dropping from the middle of the queue stays O(1).
+        self._entries: deque[list] = deque()
+        self._by_event: Dict[str, deque[list]] = {}
+        self._by_key: Dict[tuple, list] = {}
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    @property
+    def depth(self) -> int:
+        """The number of events waiting to be handled."""
+        return self._size
+
+    @property
+    def lag(self) -> float:
+        """How many seconds the oldest queued event has been waiting for."""
+        while self._entries and not self._entries[0][4]:
+            self._entries.popleft()
+        if not self._entries:
+            return 0.0
+        return time.monotonic() - self._entries[0][3]
+
+    @property
+    def stats(self) -> dict:
+        """The depth, lag and number of dropped and coalesced events."""
+        return {"depth": self.depth, "lag": self.lag, "dropped": self.dropped, "coalesced": self.coalesced}
+
+    async def put(self, event: str, data: dict, shard: Any):
+        """
+        Queue an event, applying its overflow policy if the queue is full.
+
+        **Parameters:**
+        - event: The name of the event.
+        - data: The data sent with the event.
+        - shard: The shard which received the event.
+        """
+        policy = self.policies.get(event, OverflowPolicy.BLOCK)
+        key = None
+        if policy == OverflowPolicy.COALESCE:
+            key = (event, self.coalesce_keys[event](data))
+            # Events are only coalesced once the queue is full, so that listeners see every state while they keep up.
+            entry = self._by_key.get(key) if self._size >= self.maxsize else None
+            if entry is not None and entry[4]:
+                entry[1] = data
+                self.coalesced += 1
+                return
+        if self._size >= self.maxsize:
+            if policy == OverflowPolicy.DROP_OLDEST:
+                if not self._drop_oldest(event):
+                    self.dropped += 1
+                    return
+            else:
+                while self._size >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+        entry = [event, data, shard, time.monotonic(), True, key]
+        self._entries.append(entry)
+        self._size += 1
+        if policy == OverflowPolicy.DROP_OLDEST:
+            self._by_event.setdefault(event, deque()).append(entry)
+        elif key is not None:
+            self._by_key[key] = entry
+        self._not_empty.set()
+
+    def _drop_oldest(self, event: str) -> bool:
+        entries = self._by_event.get(event)
+        while entries:
+            entry = entries.popleft()
+            if entry[4]:
+                entry[4] = False
+                self._size -= 1
+                self.dropped += 1
+                return True
+        return False
+
+    async def get(self) -> tuple[str, dict, Any]:
+        """
+        Wait for the next event.
+
+        **Returns:**
+        - tuple[str, dict, Shard]: The event name, its data and the shard which received it.
+        """
+        while True:
+            while not self._entries:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            entry = self._entries.popleft()
+            if entry[4]:
+                break
+        entry[4] = False
+        self._size -= 1
+        self._not_full.set()
+        event = entry[0]
+        by_event = self._by_event.get(event)
+        if by_event and by_event[0] is entry:
+            by_event.popleft()
+        key = entry[5]
+        if key is not None and self._by_key.get(key) is entry:
+            del self._by_key[key]
+        return event, entry[1], entry[2]
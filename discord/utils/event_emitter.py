@@ -1,24 +1,135 @@
 import asyncio
+import inspect
 from typing import Optional, Coroutine, Any, Callable, Dict
 
 
+class _Update(tuple):
+    # The arguments of an update event, which are (before, after), or just after for listeners taking one argument.
+    pass
+
+
+def _takes_before(func: Callable) -> bool:
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    positional = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    return sum(parameter.kind in positional for parameter in parameters) >= 2
+
+
 class EventEmitter:
-    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+    """
+    Runs the listeners for events on the event loop the client is connected with.
+
+    By default, every listener call is started as its own task as soon as the event is emitted, so listeners for the
+    same event can run at the same time. Events marked as ordered are instead delivered one at a time, in the order
+    they were emitted.
+
+    **Parameters:**
+    - max_concurrency: The most listener calls that can run at once. If this is not given, there is no limit.
+    """
+    def __init__(self, max_concurrency: Optional[int] = None):
         self.listeners: Dict[str, Optional[Callable[..., Coroutine[Any, Any, Any]]]] = {}
-        self.loop = loop if loop else asyncio.get_event_loop()
+        self.ordered: set[str] = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._takes_before: set[Callable] = set()
 
     def add_listener(self, event_name: str, func: Optional[Callable[..., Coroutine[Any, Any, Any]]] = None):
         if not self.listeners.get(event_name, None):
             self.listeners[event_name] = {func}
         else:
             self.listeners[event_name].add(func)
+        if _takes_before(func):
+            self._takes_before.add(func)
 
     def remove_listener(self, event_name: str, func: Optional[Callable[..., Coroutine[Any, Any, Any]]] = None):
         self.listeners[event_name].remove(func)
         if len(self.listeners[event_name]) == 0:
             del self.listeners[event_name]
 
+    def wants_before(self, event_name: str) -> bool:
+        """
+        Whether any listener for an update event takes the state from before the update, so it needs to be kept.
+
+        **Parameters:**
+        - event_name: The name of the event.
+        """
+        return any(func in self._takes_before for func in self.listeners.get(event_name, ()))
+
+    def set_ordered(self, event_name: str, ordered: bool = True):
+        """
+        Chooses whether an event is delivered in order.
+
+        **Parameters:**
+        - event_name: The name of the event.
+        - ordered: If this is `True`, each emit of the event waits for the listeners of the previous one to finish.
+        """
+        if ordered:
+            self.ordered.add(event_name)
+        else:
+            self.ordered.discard(event_name)
+
     def emit(self, event_name: str, *args: Any, **kwargs: Any) -> None:
-        listeners = self.listeners.get(event_name, [])
+        self._emit(event_name, args, kwargs)
+
+    def emit_update(self, event_name: str, before: Any, after: Any) -> None:
+        """
+        Emits an update event. Listeners which take two arguments are called with the state before and after the
+        update, and other listeners with just the state after it.
+
+        **Parameters:**
+        - event_name: The name of the event.
+        - before: The state before the update, or `None` if it is not known.
+        - after: The state after the update.
+        """
+        self._emit(event_name, _Update((before, after)), {})
+
+    def _emit(self, event_name: str, args: tuple, kwargs: dict) -> None:
+        listeners = self.listeners.get(event_name)
+        if not listeners:
+            return
+        if event_name in self.ordered:
+            queue = self._queues.get(event_name)
+            if queue is None:
+                queue = self._queues[event_name] = asyncio.Queue()
+                self._spawn(self._deliver_ordered(event_name, queue))
+            queue.put_nowait((args, kwargs))
+            return
         for func in listeners:
-            asyncio.run_coroutine_threadsafe(func(*args, **kwargs), self.loop)
+            self._spawn(self._run(func, args, kwargs))
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, func: Callable[..., Coroutine[Any, Any, Any]], args: tuple, kwargs: dict):
+        if type(args) is _Update and func not in self._takes_before:
+            args = args[1:]
+        try:
+            if self._semaphore is None:
+                await func(*args, **kwargs)
+            else:
+                async with self._semaphore:
+                    await func(*args, **kwargs)
+        except Exception as e:
+            asyncio.get_running_loop().call_exception_handler({
+                "message": f"Exception in listener {func.__name__}",
+                "exception": e
+            })
+
+    async def _deliver_ordered(self, event_name: str, queue: asyncio.Queue):
+        while True:
+            args, kwargs = await queue.get()
+            for func in list(self.listeners.get(event_name, ())):
+                await self._run(func, args, kwargs)
+
+    async def close(self):
+        """
+        Cancels every running listener.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        self._queues.clear()
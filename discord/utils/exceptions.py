@@ -1,2 +1,10 @@
 class APIException(Exception):
     """Raised when the Discord API returns an error."""
+
+
+class GatewayException(Exception):
+    """Raised when the Discord gateway closes a connection in a way that cannot be recovered from."""
+
+
+class CircuitOpenException(APIException):
+    """Raised instead of making a request when too many recent requests to its route have failed."""
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+API_BASE = 'https://discord.com/api/v10'
+"""The base URL of Discord's API."""
+USER_AGENT = 'DiscordBot (https://github.com/mounderfod/discobra 0.0.1)'
+"""The User-Agent sent with every request, as required by Discord."""
+
+
+class HTTPPool:
+    """
+    A pool of HTTP connections to Discord which can be shared by several `discord.client.Client` and
+    `discord.utils.rest.RESTClient` instances. The session is not tied to a token, so each client sends its own
+    Authorization header. The session is closed when the last client using it closes.
+
+    **Parameters:**
+    - limit: The most connections open at once.
+    - limit_per_host: The most connections open to one host at once, or 0 for no limit.
+    - ttl_dns_cache: How many seconds DNS lookups are cached for.
+    - keepalive_timeout: How many seconds an idle connection is kept open for reuse.
+    - timeout: How many seconds a request can take in total.
+    - base_url: The base URL of the API, which can be changed to test against a local server.
+    """
+    def __init__(self, limit: int = 100, limit_per_host: int = 0, ttl_dns_cache: int = 300,
+                 keepalive_timeout: float = 60, timeout: float = 60, base_url: str = API_BASE):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.base_url = base_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._users = 0
+
+    @property
+    def session(self) -> Optional[aiohttp.ClientSession]:
+        """The pool's session, or `None` if it has not been opened."""
+        return self._session
+
+    def open(self) -> aiohttp.ClientSession:
+        """
+        Opens the pool's session if it is not open, and registers a user of the pool. Each call must be matched by a
+        call to `close`.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        self._users += 1
+        return self._session
+
+    async def close(self):
+        """
+        Unregisters a user of the pool, and closes the session if it was the last one.
+        """
+        self._users = max(0, self._users - 1)
+        if self._users == 0 and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def warm_up(self, connections: int = 1):
+        """
+        Opens connections to the API ahead of time, so that the first requests do not have to wait for DNS and TLS.
+
+        **Parameters:**
+        - connections: The number of connections to open.
+        """
+        async def touch():
+            try:
+                async with self._session.get(self.base_url + '/gateway') as r:
+                    await r.read()
+            except aiohttp.ClientError:
+                pass
+
+        await asyncio.gather(*(touch() for _ in range(connections)))
+
+    @property
+    def stats(self) -> dict:
+        """The connection limit, and the number of connections in use and idle in the pool."""
+        connector = self._session.connector if self._session is not None else None
+        if connector is None:
+            return {"limit": self.limit, "in_use": 0, "idle": 0, "users": self._users}
+        idle = sum(len(conns) for conns in getattr(connector, '_conns', {}).values())
+        return {
+            "limit": self.limit,
+            "in_use": len(getattr(connector, '_acquired', ())),
+            "idle": idle,
+            "users": self._users
+        }
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, AsyncIterator, Callable, Optional
+
+from discord.utils.rest import RESTClient
+
+
+class Paginator:
+    """
+    Walks through a paginated API route, yielding items one at a time. While the caller handles one page, the next
+    page is already being fetched, unless the route's rate limit bucket is empty. Only one request is in flight per
+    paginator, and every request goes through the route's rate limit bucket.
+
+    **Parameters:**
+    - rest: The `discord.utils.rest.RESTClient` to make requests with.
+    - url: The part of the request URL that goes after `https://discord.com/api/v10`
+    - page_size: The most items Discord returns per page for the route.
+    - limit: The most items to yield, or `None` for every item.
+    - before: Only yield items older than this snowflake, walking backwards.
+    - after: Only yield items newer than this snowflake, walking forwards.
+    - params: Extra query parameters.
+    - items: A function which gets the list of items from a response.
+    - item_id: A function which gets the snowflake of an item, used as the cursor for the next page.
+    - convert: A function which converts each item before it is yielded.
+    """
+    def __init__(self, rest: RESTClient, url: str, page_size: int, limit: Optional[int] = None,
+                 before: Optional[str] = None, after: Optional[str] = None, params: Optional[dict] = None,
+                 items: Callable[[Any], list] = lambda data: data,
+                 item_id: Callable[[dict], str] = lambda item: item['id'],
+                 convert: Callable[[dict], Any] = lambda item: item):
+        self.rest = rest
+        self.url = url
+        self.page_size = page_size
+        self.limit = limit
+        self.params = params or {}
+        self.items = items
+        self.item_id = item_id
+        self.convert = convert
+        self.forwards = after is not None and before is None
+        self.cursor = after if self.forwards else before
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._iterate()
+
+    def _page_limit(self, remaining: Optional[int]) -> int:
+        return self.page_size if remaining is None else min(self.page_size, remaining)
+
+    async def _fetch(self, cursor: Optional[str], limit: int) -> list:
+        params = {**self.params, "limit": limit}
+        if cursor is not None:
+            params["after" if self.forwards else "before"] = cursor
+        return self.items(await self.rest.get(self.url, params=params))
+
+    def _next_cursor(self, page: list) -> str:
+        ids = [int(self.item_id(item)) for item in page]
+        return str(max(ids) if self.forwards else min(ids))
+
+    def _bucket_empty(self) -> bool:
+        return self.rest.ratelimiter.get_bucket('GET', self.url).remaining == 0
+
+    async def _iterate(self) -> AsyncIterator[Any]:
+        remaining = self.limit
+        cursor = self.cursor
+        limit = self._page_limit(remaining)
+        pending: Optional[asyncio.Task] = None
+        try:
+            page = await self._fetch(cursor, limit)
+            while page:
+                if self.forwards:
+                    # Discord returns some routes newest first even when paging forwards.
+                    page.sort(key=lambda item: int(self.item_id(item)))
+                if remaining is not None:
+                    remaining -= len(page)
+                more = len(page) >= limit and (remaining is None or remaining > 0)
+                if more:
+                    cursor = self._next_cursor(page)
+                    limit = self._page_limit(remaining)
+                    if not self._bucket_empty():
+                        pending = asyncio.create_task(self._fetch(cursor, limit))
+                for item in page:
+                    yield self.convert(item)
+                if not more:
+                    break
+                if pending is not None:
+                    page = await pending
+                    pending = None
+                else:
+                    page = await self._fetch(cursor, limit)
+        finally:
+            if pending is not None:
+                pending.cancel()
@@ -0,0 +1,365 @@
+import asyncio
+import re
+import time
+from typing import Optional
+
+
+class RateLimitWindow:
+    """
+    Allows `limit` uses every `per` seconds. The window starts with the first use after the last one ended, and the
+    count goes back to zero when it ends, so no more than `limit` uses can ever fall within one window.
+
+    **Parameters:**
+    - limit: How many uses are allowed in each window.
+    - per: The length of the window in seconds.
+    """
+    def __init__(self, limit: int, per: float):
+        self.limit = limit
+        self.per = per
+        self._used = 0
+        self._ends = 0.0
+
+    @property
+    def remaining(self) -> int:
+        """How many more uses are allowed in the current window."""
+        if self._used and time.monotonic() >= self._ends:
+            self._used = 0
+        return self.limit - self._used
+
+    def delay(self, keep: int = 0) -> float:
+        """
+        How many seconds to wait before a use is allowed while leaving `keep` uses in the window.
+
+        **Parameters:**
+        - keep: The number of uses which must be left in the window.
+        """
+        if self.remaining > keep:
+            return 0.0
+        return max(0.0, self._ends - time.monotonic())
+
+    def take(self):
+        """
+        Uses one of the window's uses. `delay` should be checked first.
+        """
+        if self.remaining == self.limit:
+            self._ends = time.monotonic() + self.per
+        self._used += 1
+
+
+class GatewayRateLimiter:
+    """
+    Keeps a gateway connection under Discord's send limits. Every send, heartbeats included, counts towards the
+    connection's window, but ordinary sends leave `reserved` sends for heartbeats, which also skip the queue. Presence
+    updates have to fit in their own, smaller window as well.
+
+    Discord closes the connection after 120 sends in 60 seconds, so the default limit leaves some margin for clock
+    differences between the client and Discord.
+
+    **Parameters:**
+    - limit: How many payloads can be sent every `per` seconds.
+    - per: The length of the rate limit window in seconds.
+    - reserved: How many sends ordinary sends must leave for heartbeats.
+    - presence_limit: How many presence updates can be sent every `presence_per` seconds.
+    - presence_per: The length of the presence rate limit window in seconds.
+    """
+    def __init__(self, limit: int = 110, per: float = 60, reserved: int = 3, presence_limit: int = 5,
+                 presence_per: float = 20):
+        self.window = RateLimitWindow(limit, per)
+        self.presence_window = RateLimitWindow(presence_limit, presence_per)
+        self.reserved = reserved
+        self.sent = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = asyncio.Lock()
+        self._presence_lock = asyncio.Lock()
+
+    @property
+    def stats(self) -> dict:
+        """The number of sends, how many had to wait, and the total, average and longest wait in seconds."""
+        return {
+            "sent": self.sent,
+            "waits": self.waits,
+            "total_wait": self.total_wait,
+            "average_wait": self.total_wait / self.sent if self.sent else 0.0,
+            "max_wait": self.max_wait
+        }
+
+    async def acquire(self, priority: bool = False, presence: bool = False):
+        """
+        Waits until a payload can be sent.
+
+        **Parameters:**
+        - priority: Whether this is a heartbeat, which can use the reserved sends and skips the queue.
+        - presence: Whether this is a presence update, which has its own limit as well.
+        """
+        start = time.monotonic()
+        if priority:
+            while (delay := self.window.delay()) > 0:
+                await asyncio.sleep(delay)
+            self.window.take()
+        elif presence:
+            async with self._presence_lock:
+                while (delay := self.presence_window.delay()) > 0:
+                    await asyncio.sleep(delay)
+                await self._acquire_ordinary()
+                self.presence_window.take()
+        else:
+            await self._acquire_ordinary()
+        self._record(time.monotonic() - start)
+
+    async def _acquire_ordinary(self):
+        async with self._lock:
+            while (delay := self.window.delay(self.reserved)) > 0:
+                await asyncio.sleep(delay)
+            self.window.take()
+
+    def _record(self, wait: float):
+        self.sent += 1
+        if wait > 0.001:
+            self.waits += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+_MAJOR_PARAMETERS = ('channels', 'guilds', 'webhooks')
+# Webhook and interaction tokens follow the webhook's or interaction's ID.
+_TOKEN_PARENTS = ('webhooks', 'interactions')
+# Invite and template codes can look like the fixed parts of routes.
+_CODE_PARENTS = ('invites', 'templates')
+# The fixed parts of routes. Anything else, such as IDs, tokens, emojis and invite codes, is a parameter.
+_FIXED = re.compile(r'^(@[a-z]+|[a-z][a-z0-9-]*)$')
+
+
+def route_key(method: str, url: str) -> tuple[str, str]:
+    """
+    Splits a REST request into its route and its major parameters, which together decide its rate limit bucket.
+
+    `GET /channels/123/messages/456` has the route `GET /channels/{id}/messages/{id}` and the major parameters
+    `123`, because Discord gives each channel, guild and webhook its own buckets. Every parameter in the route is
+    replaced, including tokens and emojis, so that the number of routes stays fixed.
+
+    **Parameters:**
+    - method: The HTTP method.
+    - url: The part of the request URL that goes after `https://discord.com/api/v10`
+
+    **Returns:**
+    - tuple[str, str]: The route and the major parameters.
+    """
+    parts = url.partition('?')[0].strip('/').split('/')
+    major = []
+    for i, part in enumerate(parts):
+        previous = parts[i - 1] if i else None
+        if previous in _MAJOR_PARAMETERS and not major and not _FIXED.match(part):
+            major.append(part)
+            if previous == 'webhooks' and i + 1 < len(parts):
+                major.append(parts[i + 1])
+            parts[i] = '{id}'
+        elif not _FIXED.match(part) or previous in _CODE_PARENTS or (i >= 2 and parts[i - 2] in _TOKEN_PARENTS):
+            parts[i] = '{id}'
+    return f"{method} /{'/'.join(parts)}", ':'.join(major)
+
+
+class RESTBucket:
+    """
+    A Discord rate limit bucket. Requests take one of the bucket's remaining requests in the order they were made, and
+    are then sent alongside each other. They wait while the bucket has no requests remaining, until it resets, and
+    until the first response says what the bucket's limits are.
+    """
+    def __init__(self, key: str, limiter: 'RESTRateLimiter'):
+        self.key = key
+        self.limiter = limiter
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self._queued = 0
+        self._in_flight = 0
+        self._probed = False
+        # The reset which `remaining` was last refilled for, so that a reset is only counted once.
+        self._refilled_for = 0.0
+        self._lock = asyncio.Lock()
+        self._responded = asyncio.Event()
+
+    @property
+    def reset_after(self) -> float:
+        """How many seconds until the bucket resets."""
+        return max(0.0, self.reset_at - time.monotonic())
+
+    @property
+    def queued(self) -> int:
+        """The number of requests waiting for the bucket."""
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests which have been let through and not finished."""
+        return self._in_flight
+
+    def update(self, headers):
+        """
+        Updates the bucket from the `X-RateLimit-*` headers of a response.
+        """
+        if 'X-RateLimit-Limit' in headers:
+            self.limit = int(headers['X-RateLimit-Limit'])
+            self._probed = True
+        if 'X-RateLimit-Remaining' in headers:
+            remaining = int(headers['X-RateLimit-Remaining'])
+            if self.remaining is None or (self.reset_after == 0 and self._refilled_for != self.reset_at):
+                # The count kept here is from an earlier window, so Discord's is used, less the other requests which
+                # are on their way.
+                self.remaining = max(0, remaining - max(0, self._in_flight - 1))
+            else:
+                # Requests sent after this one have already been counted here, but may not have been by Discord.
+                self.remaining = min(self.remaining, remaining)
+        if 'X-RateLimit-Reset-After' in headers:
+            self.reset_at = time.monotonic() + float(headers['X-RateLimit-Reset-After'])
+        self._responded.set()
+
+    def pause(self, delay: float):
+        """
+        Stops the bucket sending requests for `delay` seconds.
+        """
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + delay)
+
+    async def _wait_for_response(self):
+        self._responded.clear()
+        await self._responded.wait()
+
+    async def __aenter__(self):
+        self._queued += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self._queued -= 1
+        try:
+            await self.limiter.wait_global()
+            # Until the first response, the bucket's limits are not known, so only one request is sent.
+            while not self._probed and self._in_flight:
+                await self._wait_for_response()
+            while self.remaining == 0:
+                if (delay := self.reset_after) > 0:
+                    await asyncio.sleep(delay)
+                elif self._refilled_for != self.reset_at or not self._in_flight:
+                    self.remaining = self.limit
+                    self._refilled_for = self.reset_at
+                else:
+                    # The bucket was refilled for this reset and used up, so the next reset is only known once one
+                    # of the requests sent since comes back.
+                    await self._wait_for_response()
+            if self.remaining is not None and self.reset_after == 0 and self._refilled_for != self.reset_at:
+                self.remaining = self.limit
+                self._refilled_for = self.reset_at
+            if self.remaining is not None:
+                self.remaining -= 1
+            self._in_flight += 1
+        finally:
+            self._lock.release()
+        return self
+
+    async def __aexit__(self, *args):
+        self._in_flight -= 1
+        self._probed = True
+        self._responded.set()
+
+
+class RESTRateLimiter:
+    """
+    Keeps REST requests within Discord's per-route and global rate limits. Routes are mapped to the bucket hashes
+    Discord sends in the `X-RateLimit-Bucket` header, so routes which share a bucket wait for each other.
+
+    Each channel, guild, webhook and interaction gets its own buckets, so buckets which are idle and have reset are
+    pruned as more are made. A pruned bucket has nothing left to wait for, so it is simply made again when needed.
+    """
+    PRUNE_AFTER = 256
+    """How many buckets there can be before idle ones are pruned."""
+
+    def __init__(self):
+        self.buckets: dict[str, RESTBucket] = {}
+        self.hashes: dict[str, str] = {}
+        self._prune_at = self.PRUNE_AFTER
+        self._global = asyncio.Event()
+        self._global.set()
+
+    def get_bucket(self, method: str, url: str) -> RESTBucket:
+        """
+        Gets the bucket for a request.
+
+        **Parameters:**
+        - method: The HTTP method.
+        - url: The part of the request URL that goes after `https://discord.com/api/v10`
+        """
+        route, major = route_key(method, url)
+        key = f"{self.hashes.get(route, route)}:{major}"
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self._new_bucket(key)
+        return bucket
+
+    def update(self, bucket: RESTBucket, method: str, url: str, headers) -> RESTBucket:
+        """
+        Updates a bucket from the headers of a response, and learns which bucket hash its route belongs to.
+
+        **Returns:**
+        - RESTBucket: The bucket that later requests to the route will use.
+        """
+        bucket.update(headers)
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash is not None:
+            route, major = route_key(method, url)
+            if self.hashes.get(route) != bucket_hash:
+                self.hashes[route] = bucket_hash
+                key = f"{bucket_hash}:{major}"
+                existing = self.buckets.get(key)
+                if existing is None:
+                    existing = self._new_bucket(key)
+                    existing.update(headers)
+                return existing
+        return bucket
+
+    def _new_bucket(self, key: str) -> RESTBucket:
+        if len(self.buckets) >= self._prune_at:
+            self.prune()
+            # Pruning again only once the buckets have doubled keeps it cheap when most of them are in use.
+            self._prune_at = max(self.PRUNE_AFTER, 2 * len(self.buckets))
+        bucket = self.buckets[key] = RESTBucket(key, self)
+        return bucket
+
+    def prune(self):
+        """
+        Removes the buckets which have no requests waiting or being sent, and have reset.
+        """
+        self.buckets = {key: bucket for key, bucket in self.buckets.items()
+                        if bucket.queued or bucket.in_flight or bucket.reset_after > 0}
+
+    async def wait_global(self):
+        """
+        Waits until the global rate limit is over.
+        """
+        await self._global.wait()
+
+    async def block_global(self, delay: float):
+        """
+        Stops every request for `delay` seconds because the global rate limit was hit.
+        """
+        if not self._global.is_set():
+            return
+        self._global.clear()
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._global.set()
+
+    @property
+    def stats(self) -> dict[str, dict]:
+        """
+        The limit, remaining requests, seconds until reset, and queued and in-flight requests of every bucket, keyed by
+        bucket.
+        """
+        return {key: {
+            "limit": bucket.limit,
+            "remaining": bucket.remaining,
+            "reset_after": bucket.reset_after,
+            "queued": bucket.queued,
+            "in_flight": bucket.in_flight
+        } for key, bucket in self.buckets.items()}
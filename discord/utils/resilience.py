@@ -0,0 +1,181 @@
+import asyncio
+import bisect
+import time
+from enum import Enum
+from typing import Optional
+
+
+class AdaptiveLimiter:
+    """
+    Limits how many REST requests run at once, adapting the limit to how Discord is coping (AIMD). Each successful
+    request raises the limit by `increase / limit`, so a full window of successes raises it by about `increase`. An
+    overloaded response or a failed connection multiplies the limit by `decrease`, at most once per `cooldown`
+    seconds so that a burst of failures from one slowdown only counts once.
+
+    **Parameters:**
+    - initial: The limit to start with.
+    - minimum: The lowest the limit can go.
+    - maximum: The highest the limit can go.
+    - increase: How much a window of successful requests raises the limit.
+    - decrease: What the limit is multiplied by when a request fails.
+    - cooldown: The least time in seconds between two decreases.
+    """
+    def __init__(self, initial: float = 10, minimum: float = 1, maximum: float = 100, increase: float = 1,
+                 decrease: float = 0.5, cooldown: float = 1):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.waiting = 0
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def stats(self) -> dict:
+        """The current limit, and the number of requests running and waiting."""
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": self.waiting}
+
+    async def acquire(self):
+        """
+        Waits until another request can be made. Each call must be matched by a call to `release`.
+        """
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self, success: Optional[bool]):
+        """
+        Marks a request as finished, and adapts the limit to how it went.
+
+        **Parameters:**
+        - success: Whether Discord handled the request without being overloaded, or `None` if the request did not
+        finish (e.g. it was cancelled), which leaves the limit as it is.
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if success:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            elif success is not None and time.monotonic() - self._decreased_at >= self.cooldown:
+                self._decreased_at = time.monotonic()
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            self._condition.notify_all()
+
+
+class CircuitState(Enum):
+    """
+    The state of a `CircuitBreaker`.
+    """
+    CLOSED = 0
+    """Requests are made as normal."""
+    OPEN = 1
+    """Requests fail straight away, without being made."""
+    HALF_OPEN = 2
+    """One request is being made to see whether the route has recovered."""
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a route which keeps failing, so that they fail straight away instead of adding load to an API
+    which is already struggling. After `threshold` failures in a row the circuit opens. Once `reset_timeout` seconds
+    have passed, one request is let through, and the circuit closes again if it succeeds.
+
+    **Parameters:**
+    - threshold: How many failures in a row open the circuit.
+    - reset_timeout: How many seconds the circuit stays open before a request is let through.
+    """
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        Whether a request can be made now. This lets through the single trial request of a half-open circuit.
+        """
+        # A trial which never finished (e.g. it was cancelled) is replaced after another `reset_timeout`.
+        if self.state != CircuitState.CLOSED and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = CircuitState.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        return self.state == CircuitState.CLOSED
+
+    def record_success(self):
+        """
+        Records a request which Discord handled, closing the circuit.
+        """
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        """
+        Records a failed request, opening the circuit if there have been too many in a row.
+        """
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """
+    Counts request latencies in fixed buckets, so that percentiles can be estimated without keeping every latency.
+
+    **Parameters:**
+    - bounds: The upper bound of each bucket in seconds. Slower requests go in an extra, unbounded bucket.
+    """
+    DEFAULT_BOUNDS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds: tuple = DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, latency: float):
+        """
+        Records the latency of a request in seconds.
+        """
+        self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.total += latency
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Estimates a percentile of the latencies, as the upper bound of the bucket it falls in.
+
+        **Parameters:**
+        - p: The percentile, from 0 to 100.
+
+        **Returns:**
+        - Optional[float]: The latency in seconds, `inf` if it is in the unbounded bucket, or `None` if nothing has
+        been recorded.
+        """
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip((*self.bounds, float('inf')), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    @property
+    def stats(self) -> dict:
+        """The number of requests, the mean latency, and the p50, p95 and p99 estimates in seconds."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
@@ -1,6 +1,20 @@
+import asyncio
+import random
+import time
+from typing import Any, Optional
+
 import aiohttp
 
-from discord.utils.exceptions import APIException
+from discord.file import File, multipart
+from discord.utils.exceptions import APIException, CircuitOpenException
+from discord.utils.http import API_BASE
+from discord.utils.ratelimit import RESTRateLimiter, route_key
+from discord.utils.resilience import AdaptiveLimiter, CircuitBreaker, LatencyHistogram
+from discord.utils.rest_cache import RESTCache
+
+_IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# Discord did not handle requests which got these, so any request can be retried.
+_UNHANDLED_STATUSES = {502, 503}
 
 
 class RESTClient:
@@ -8,10 +22,41 @@ class RESTClient:
     Utility class to make it easier to make HTTP requests to Discord's API. This should not be used manually,
     as it only works with Discord's API and the library should cover anything that can be requested from it. Any
     requests to other APIs should use `aiohttp`.
+
+    The session can be shared with other clients, as the token is sent with each request rather than being part of
+    the session. See `discord.utils.http.HTTPPool`.
+
+    Requests wait for their rate limit bucket before they are sent, and are retried after a 429 response. Files are
+    streamed as `multipart/form-data`, and are sent again from the start if the request is retried. If a
+    `discord.utils.rest_cache.RESTCache` is given, GET responses are cached and identical GETs share one request.
+
+    How many requests run at once is limited by a `discord.utils.resilience.AdaptiveLimiter`, which backs off when
+    Discord returns 5xx errors or connections fail. Those requests are retried with jittered exponential backoff if
+    it is safe to send them again, and each route has a `discord.utils.resilience.CircuitBreaker` and a
+    `discord.utils.resilience.LatencyHistogram`. Routes have their IDs and tokens replaced (see
+    `discord.utils.ratelimit.route_key`), so there is one of each per endpoint rather than per channel or interaction.
     """
-    def __init__(self, token: str, session: aiohttp.ClientSession):
+    MAX_RETRIES = 5
+    """How many times a request is retried after being rate limited."""
+    MAX_FAILURES = 3
+    """How many times a request is retried after a 5xx error or a connection error."""
+    BACKOFF_BASE = 0.5
+    """The longest wait in seconds before the first retry after a failure. This doubles with each retry."""
+    BACKOFF_MAX = 10
+    """The longest wait in seconds before any retry after a failure."""
+
+    def __init__(self, token: str, session: aiohttp.ClientSession, ratelimiter: Optional[RESTRateLimiter] = None,
+                 cache: Optional[RESTCache] = None, base_url: str = API_BASE,
+                 limiter: Optional[AdaptiveLimiter] = None):
         self.token = token
         self._session = session
+        self._headers = {"Authorization": f"Bot {token}"}
+        self.base_url = base_url
+        self.ratelimiter = ratelimiter or RESTRateLimiter()
+        self.cache = cache
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.histograms: dict[str, LatencyHistogram] = {}
 
     @property
     def session(self) -> aiohttp.ClientSession:
@@ -20,64 +65,132 @@ class RESTClient:
         """
         return self._session
 
-    async def get(self, url: str):
+    async def request(self, method: str, url: str, files: Optional[list[File]] = None, **kwargs: Any):
+        """
+        Makes a request to Discord's API, waiting for its rate limit bucket first.
+
+        **Parameters:**
+        - method: The HTTP method.
+        - url: The part of the request URL that goes after `https://discord.com/api/v10`
+        - files: Files to upload. If given, the `json` argument is sent as the `payload_json` part.
+        - kwargs: Passed to `aiohttp.ClientSession.request`.
+        """
+        kwargs['headers'] = {**self._headers, **kwargs['headers']} if 'headers' in kwargs else self._headers
+        payload = kwargs.pop('json', None) if files else None
+        route = route_key(method, url)[0]
+        breaker = self.breakers.setdefault(route, CircuitBreaker())
+        histogram = self.histograms.setdefault(route, LatencyHistogram())
+        bucket = self.ratelimiter.get_bucket(method, url)
+        rate_limits = failures = 0
+        try:
+            while True:
+                if not breaker.allow():
+                    raise CircuitOpenException(f"Too many requests to {route} have failed recently")
+                if files:
+                    # A form can only be sent once, so each attempt gets a new one reading the files from the start.
+                    kwargs['data'] = multipart(payload, files)
+                try:
+                    async with bucket:
+                        await self.limiter.acquire()
+                        success = None
+                        try:
+                            start = time.monotonic()
+                            async with self._session.request(method, self.base_url + url, **kwargs) as r:
+                                histogram.record(time.monotonic() - start)
+                                success = r.status < 500
+                                bucket = self.ratelimiter.update(bucket, method, url, r.headers)
+                                data = await r.json() if r.content_type == 'application/json' else None
+                        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                            success = False
+                            raise
+                        finally:
+                            await self.limiter.release(success)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    error = APIException(f"Could not reach Discord for {method} {url}: {e!r}")
+                    # The request was never sent if the connection could not be made.
+                    retryable = isinstance(e, aiohttp.ClientConnectorError) or method in _IDEMPOTENT_METHODS
+                else:
+                    if r.status < 500:
+                        breaker.record_success()
+                    if 200 <= r.status < 300:
+                        return data
+                    if r.status == 429:
+                        rate_limits += 1
+                        if rate_limits > self.MAX_RETRIES:
+                            raise APIException(f"Rate limited too many times on {method} {url}")
+                        retry_after = float(r.headers.get('Retry-After') or (data or {}).get('retry_after', 1))
+                        if (data or {}).get('global') or r.headers.get('X-RateLimit-Global'):
+                            await self.ratelimiter.block_global(retry_after)
+                        else:
+                            bucket.pause(retry_after)
+                        continue
+                    error = APIException((data or {}).get('message') or f"{r.status} {r.reason}")
+                    if r.status < 500:
+                        raise error
+                    retryable = r.status in _UNHANDLED_STATUSES or method in _IDEMPOTENT_METHODS
+                breaker.record_failure()
+                failures += 1
+                if not retryable or failures > self.MAX_FAILURES:
+                    raise error
+                await asyncio.sleep(random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (failures - 1))))
+        finally:
+            for file in files or ():
+                file.close()
+
+    @property
+    def stats(self) -> dict:
+        """The adaptive concurrency limit, and the latency histogram and circuit state of each route."""
+        return {
+            "concurrency": self.limiter.stats,
+            "routes": {route: {
+                **histogram.stats,
+                "circuit": self.breakers[route].state.name
+            } for route, histogram in self.histograms.items()}
+        }
+
+    @staticmethod
+    def _body(data) -> dict:
+        if isinstance(data, (dict, list)):
+            return {"json": data}
+        return {"data": data}
+
+    async def get(self, url: str, **kwargs: Any):
         """
         Makes a GET request to Discord's API.
 
         **Parameters:**
         - url: The part of the request URL that goes after `https://discord.com/api/v10`
         """
-        async with self._session.get(url='https://discord.com/api/v10' + url) as r:
-            data = await r.json()
-            match r.status:
-                case 200:
-                    return data
-                case other:
-                    raise APIException(data['message'])
-
-    async def post(self, url: str, data):
+        if self.cache is None or kwargs:
+            return await self.request('GET', url, **kwargs)
+        return await self.cache.fetch(url, lambda: self.request('GET', url))
+
+    async def post(self, url: str, data=None, files: Optional[list[File]] = None, **kwargs: Any):
         """
         Makes a POST request to Discord's API.
 
         **Parameters:**
         - url: The part of the request URL that goes after `https://discord.com/api/v10`
-        - data: The data to post.
+        - data: The data to post. Dictionaries and lists are sent as JSON.
+        - files: Files to upload alongside `data`, which is then sent as the `payload_json` part.
         """
-        async with self._session.post(url='https://discord.com/api/v10' + url, data=data) as r:
-            data = await r.json()
-            match r.status:
-                case 200 | 204 | 201:
-                    return data
-                case other:
-                    raise APIException(data['message'])
-
-    async def patch(self, url, data):
+        return await self.request('POST', url, files, **self._body(data), **kwargs)
+
+    async def patch(self, url, data=None, **kwargs: Any):
         """
         Makes a PATCH request to Discord's API.
 
         **Parameters:**
         - url: The part of the request URL that goes after `https://discord.com/api/v10`
-        - data: The data to patch.
+        - data: The data to patch. Dictionaries and lists are sent as JSON.
         """
-        async with self._session.patch(url='https://discord.com/api/v10' + url, data=data) as res:
-            data = await res.json()
-            match res.status:
-                case 200 | 204:
-                    return data
-                case other:
-                    raise APIException(data['message'])
-
-    async def delete(self, url):
+        return await self.request('PATCH', url, **self._body(data), **kwargs)
+
+    async def delete(self, url, **kwargs: Any):
         """
-        Makes a POST request to Discord's API.
+        Makes a DELETE request to Discord's API.
 
         **Parameters:**
         - url: The part of the request URL that goes after `https://discord.com/api/v10`
         """
-        async with self._session.delete(url='https://discord.com/api/v10' + url) as r:
-            data = await r.json()
-            match r.status:
-                case 200:
-                    return data
-                case other:
-                    raise APIException(data['message'])
+        return await self.request('DELETE', url, **kwargs)
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from discord.utils.ratelimit import route_key
+
+DEFAULT_TTLS: Dict[str, float] = {
+    'GET /users/@me': 300,
+    'GET /users/{id}': 300,
+    'GET /gateway/bot': 60,
+    'GET /guilds/{id}': 60,
+    'GET /guilds/{id}/roles': 60,
+    'GET /guilds/{id}/channels': 60,
+    'GET /guilds/{id}/members/{id}': 60,
+    'GET /channels/{id}': 60
+}
+"""How many seconds responses are cached for, keyed by route. Routes which are not listed are not cached."""
+
+INVALIDATIONS: Dict[str, Callable[[dict], list[str]]] = {
+    'USER_UPDATE': lambda data: ['/users/@me', f"/users/{data['id']}"],
+    'GUILD_UPDATE': lambda data: [f"/guilds/{data['id']}"],
+    'GUILD_DELETE': lambda data: [f"/guilds/{data['id']}"],
+    'GUILD_ROLE_CREATE': lambda data: [f"/guilds/{data['guild_id']}/roles"],
+    'GUILD_ROLE_UPDATE': lambda data: [f"/guilds/{data['guild_id']}/roles"],
+    'GUILD_ROLE_DELETE': lambda data: [f"/guilds/{data['guild_id']}/roles"],
+    'CHANNEL_CREATE': lambda data: [f"/guilds/{data.get('guild_id')}/channels"],
+    'CHANNEL_UPDATE': lambda data: [f"/channels/{data['id']}", f"/guilds/{data.get('guild_id')}/channels"],
+    'CHANNEL_DELETE': lambda data: [f"/channels/{data['id']}", f"/guilds/{data.get('guild_id')}/channels"],
+    'GUILD_MEMBER_UPDATE': lambda data: [f"/guilds/{data['guild_id']}/members/{data['user']['id']}"],
+    'GUILD_MEMBER_REMOVE': lambda data: [f"/guilds/{data['guild_id']}/members/{data['user']['id']}"]
+}
+"""The cached URLs each gateway event makes out of date, keyed by event name."""
+
+
+class RESTCache:
+    """
+    Caches the responses of GET requests to Discord's API, and lets identical requests which are made at the same
+    time share one HTTP request.
+
+    Responses are shared between callers, so they must not be modified.
+
+    **Parameters:**
+    - maxsize: The most responses to keep. The least recently used response is removed when this is reached.
+    - ttls: How many seconds responses are cached for, keyed by route (e.g. `GET /guilds/{id}`). This is added to
+    `DEFAULT_TTLS`.
+    """
+    def __init__(self, maxsize: int = 1000, ttls: Optional[Dict[str, float]] = None):
+        self.maxsize = maxsize
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._in_flight: Dict[str, list] = {}
+
+    @property
+    def stats(self) -> dict:
+        """The number of cached responses, hits, misses, coalesced requests and evictions."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions
+        }
+
+    def get(self, url: str) -> tuple[bool, Any]:
+        """
+        Gets a cached response.
+
+        **Parameters:**
+        - url: The part of the request URL that goes after `https://discord.com/api/v10`
+
+        **Returns:**
+        - tuple[bool, Any]: Whether the response was cached, and the response.
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            del self._entries[url]
+            return False, None
+        self._entries.move_to_end(url)
+        return True, entry[1]
+
+    def set(self, url: str, data: Any):
+        """
+        Caches a response, if its route has a TTL.
+
+        **Parameters:**
+        - url: The part of the request URL that goes after `https://discord.com/api/v10`
+        - data: The response.
+        """
+        ttl = self.ttls.get(route_key('GET', url)[0])
+        if not ttl:
+            return
+        self._entries[url] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, url: str):
+        """
+        Removes a cached response. A request for it which is already running is not cached when it finishes, as its
+        response may be from before the change.
+
+        **Parameters:**
+        - url: The part of the request URL that goes after `https://discord.com/api/v10`
+        """
+        self._entries.pop(url, None)
+        entry = self._in_flight.pop(url, None)
+        if entry is not None:
+            entry[2] = True
+
+    def invalidate_event(self, event: str, data: dict):
+        """
+        Removes the cached responses made out of date by a gateway event.
+
+        **Parameters:**
+        - event: The name of the event.
+        - data: The data sent with the event.
+        """
+        invalidation = INVALIDATIONS.get(event)
+        if invalidation is not None:
+            for url in invalidation(data):
+                self.invalidate(url)
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        self._entries.clear()
+        for entry in self._in_flight.values():
+            entry[2] = True
+        self._in_flight.clear()
+
+    async def fetch(self, url: str, request: Callable[[], Any]) -> Any:
+        """
+        Returns a cached response, joins an identical request which is already running, or runs `request`.
+
+        The request runs in its own task, so a caller being cancelled does not cancel it for the other callers. It is
+        only cancelled when every caller waiting for it has been.
+
+        **Parameters:**
+        - url: The part of the request URL that goes after `https://discord.com/api/v10`
+        - request: A function returning the coroutine which makes the request.
+        """
+        cached, data = self.get(url)
+        if cached:
+            self.hits += 1
+            return data
+        # Each entry is [task, number of callers waiting for it, whether it was invalidated while running].
+        entry = self._in_flight.get(url)
+        if entry is None:
+            self.misses += 1
+            entry = self._in_flight[url] = [None, 0, False]
+            entry[0] = asyncio.create_task(self._request(url, request, entry))
+        else:
+            self.coalesced += 1
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not entry[0].done():
+                entry[0].cancel()
+                # Callers from now on start a new request rather than joining one which is being cancelled.
+                if self._in_flight.get(url) is entry:
+                    del self._in_flight[url]
+
+    async def _request(self, url: str, request: Callable[[], Any], entry: list) -> Any:
+        try:
+            data = await request()
+        finally:
+            if self._in_flight.get(url) is entry:
+                del self._in_flight[url]
+        if not entry[2]:
+            self.set(url, data)
+        return data
@@ -0,0 +1,112 @@
+from typing import Any, Hashable, Iterable, Iterator
+
+_MISSING = object()
+
+
+class RingBuffer:
+    """
+    A fixed number of entries keyed by ID, in the order they were added. Once it is full, each new entry overwrites the
+    oldest one. Entries are found through an index of their positions, so adding, looking up and removing one takes
+    constant time.
+
+    Removing an entry leaves its position empty until the buffer wraps around to it, so the buffer never holds more
+    than `capacity` entries and never has to move any.
+
+    **Parameters:**
+    - capacity: The most entries to keep.
+    """
+    __slots__ = ('capacity', '_keys', '_values', '_index', '_next')
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        # The lists grow up to the capacity instead of being allocated up front, as most buffers never fill up.
+        self._keys: list = []
+        self._values: list = []
+        self._index: dict[Hashable, int] = {}
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[Any]:
+        # Oldest first, which is the start of the lists until the buffer is full, and the next position after that.
+        keys = self._keys
+        values = self._values
+        start = self._next if len(keys) == self.capacity else 0
+        for i in range(len(keys)):
+            position = (start + i) % len(keys)
+            if keys[position] is not _MISSING:
+                yield values[position]
+
+    def append(self, key: Hashable, value: Any) -> bool:
+        """
+        Adds an entry. An entry which is already in the buffer is replaced where it is.
+
+        **Returns:**
+        - bool: Whether the oldest entry was overwritten.
+        """
+        position = self._index.get(key)
+        if position is not None:
+            self._values[position] = value
+            return False
+        position = self._next
+        self._next = (position + 1) % self.capacity
+        self._index[key] = position
+        if position == len(self._keys):
+            self._keys.append(key)
+            self._values.append(value)
+            return False
+        old = self._keys[position]
+        self._keys[position] = key
+        self._values[position] = value
+        if old is _MISSING:
+            return False
+        del self._index[old]
+        return True
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Gets an entry by ID, or `default` if there is none.
+        """
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes an entry by ID and returns it, or returns `default` if there is none.
+        """
+        position = self._index.pop(key, None)
+        if position is None:
+            return default
+        value = self._values[position]
+        self._keys[position] = _MISSING
+        self._values[position] = None
+        return value
+
+    def pop_many(self, keys: Iterable[Hashable]) -> list:
+        """
+        Removes the entries with the given IDs, and returns those which were in the buffer.
+        """
+        index = self._index
+        removed = []
+        for key in keys:
+            position = index.pop(key, None)
+            if position is not None:
+                removed.append(self._values[position])
+                self._keys[position] = _MISSING
+                self._values[position] = None
+        return removed
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        self._keys.clear()
+        self._values.clear()
+        self._index.clear()
+        self._next = 0
@@ -0,0 +1,98 @@
+"""
+    A local stand-in for Discord's gateway, for tests which run clients without connecting to Discord.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from aiohttp import web
+
+
+def guild_for_shard(shard_id: int, shard_count: int) -> str:
+    """
+    Gets the ID of the guild the fake gateway sends to a shard.
+    """
+    return str((shard_count + shard_id) << 22)
+
+
+class FakeGateway:
+    """
+    Accepts gateway connections, sends HELLO, answers heartbeats, and answers IDENTIFY with READY and a GUILD_CREATE
+    for one guild which belongs to the shard. Every payload received is recorded in `received`.
+
+    **Parameters:**
+    - heartbeat_interval: The heartbeat interval sent with HELLO, in milliseconds.
+    - events: Extra events to dispatch after the GUILD_CREATE, as (name, data) pairs.
+    """
+    def __init__(self, heartbeat_interval: int = 45000, events: Optional[list[tuple[str, dict]]] = None):
+        self.heartbeat_interval = heartbeat_interval
+        self.events = events or []
+        self.received: list[dict] = []
+        self.identified: list[list[int]] = []
+        self.port: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/gateway"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/gateway/', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        sequence = 0
+
+        async def dispatch(event: str, data: dict):
+            nonlocal sequence
+            sequence += 1
+            await ws.send_str(json.dumps({"op": 0, "t": event, "s": sequence, "d": data}))
+
+        hello = {"heartbeat_interval": self.heartbeat_interval}
+        await ws.send_str(json.dumps({"op": 10, "t": None, "s": None, "d": hello}))
+        async for msg in ws:
+            payload = json.loads(msg.data)
+            self.received.append(payload)
+            if payload['op'] == 1:
+                await ws.send_str(json.dumps({"op": 11, "t": None, "s": None, "d": None}))
+            elif payload['op'] == 2:
+                shard_id, shard_count = payload['d']['shard']
+                self.identified.append([shard_id, shard_count])
+                await dispatch('READY', {
+                    "v": 10,
+                    "user": {"id": "1", "username": "bot", "discriminator": "0"},
+                    "session_id": f"session-{shard_id}",
+                    "guilds": []
+                })
+                await dispatch('GUILD_CREATE', {
+                    "id": guild_for_shard(shard_id, shard_count),
+                    "name": f"guild {shard_id}",
+                    "roles": [],
+                    "emojis": [],
+                    "channels": [],
+                    "members": []
+                })
+                for event, data in self.events:
+                    await dispatch(event, data)
+        return ws
+
+
+async def wait_until(condition, timeout: float = 30):
+    """
+    Waits until `condition()` is true, or fails the test after `timeout` seconds.
+    """
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.05)
+
+    await asyncio.wait_for(poll(), timeout)
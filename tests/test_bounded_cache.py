@@ -0,0 +1,16 @@
+from discord.utils import BoundedCache, CachePolicy, bounded_cache
+
+
+def test_expiring_entries_are_swept_after_reads(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(bounded_cache.time, 'monotonic', lambda: now[0])
+    cache = BoundedCache(CachePolicy.expiring(10, maxsize=100))
+    cache.set('a', 1)
+    now[0] += 5
+    cache.set('b', 2)
+    # Reading 'a' must not put it behind 'b', which expires later.
+    assert cache.get('a') == 1
+    now[0] += 6
+    cache.set('c', 3)
+    assert list(cache) == ['b', 'c']
+    assert cache.expirations == 1
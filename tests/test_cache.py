@@ -0,0 +1,84 @@
+import asyncio
+import gc
+
+from discord.cache import ClientCache
+from discord.client import Client
+from discord.guild import Guild
+from discord.message import Message
+from discord.utils import CachePolicy, bounded_cache
+from discord.utils.rest import RESTClient
+
+
+def guild(members: int) -> dict:
+    return {"id": "41771983423143936", "name": "guild", "roles": [], "channels": [], "emojis": [],
+            "members": [{"user": {"id": str(80351110224678912 + i), "username": f"user{i}", "discriminator": "0"},
+                         "roles": []} for i in range(members)]}
+
+
+def test_evicted_members_are_not_built(monkeypatch):
+    built = []
+    build_member = Guild._build_member
+    monkeypatch.setattr(Guild, '_build_member', lambda self, member: built.append(member) or build_member(self, member))
+    client = Client([], cache=ClientCache(members=CachePolicy.lru(10)), lazy_models=True)
+    client._handle_guild_create(guild(1000), None)
+    assert len(client.client_cache.get_guild("41771983423143936").members) == 10
+    assert built == []
+
+
+def test_user_policy_keeps_users_seen_in_events():
+    client = Client([], cache=ClientCache(users=CachePolicy.lru(2)))
+    for i in range(3):
+        client._handle_message_create({"id": str(i), "channel_id": "1", "content": "",
+                                       "author": {"id": str(i), "username": f"user{i}", "discriminator": "0"}}, None)
+    gc.collect()
+    # Only the two most recent authors are kept, as no cached message refers to them.
+    assert [client.client_cache.get_user(str(i)) is not None for i in range(3)] == [False, True, True]
+    assert client.client_cache.stats["users"]["evictions"] == 1
+
+
+def test_users_not_kept_by_default():
+    cache = ClientCache()
+    cache.intern_user({"id": "1", "username": "user", "discriminator": "0"}, update=True)
+    gc.collect()
+    assert cache.get_user("1") is None
+
+
+def test_active_members_are_kept(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(bounded_cache.time, 'monotonic', lambda: now[0])
+    client = Client([], cache=ClientCache(members=CachePolicy.expiring(600)))
+    assert client.wants('MESSAGE_CREATE') and client.wants('TYPING_START')
+    client._handle_guild_create(guild(2), None)
+    chatty, quiet = "80351110224678912", "80351110224678913"
+    now[0] += 500
+    client._handle_message_create({"id": "1", "channel_id": "2", "guild_id": "41771983423143936", "content": "",
+                                   "author": {"id": chatty, "username": "user0", "discriminator": "0"},
+                                   "member": {"roles": []}}, None)
+    now[0] += 200
+    client._handle_typing_start({"channel_id": "2", "guild_id": "41771983423143936", "user_id": chatty,
+                                 "timestamp": 0}, None)
+    # The quiet member was last seen 700 seconds ago, and the chatty one has been seen since.
+    assert list(client.client_cache.get_guild("41771983423143936").members.ids()) == [chatty]
+    assert client.client_cache.get_user_guilds(quiet) == []
+
+
+def test_history_shares_authors_with_cache(monkeypatch):
+    client = Client([])
+    client._handle_guild_create({**guild(1), "channels": [{"id": "2", "name": "general", "type": 0}]}, None)
+    cached = client.client_cache.get_guild("41771983423143936")
+    author = {"id": "80351110224678912", "username": "user0", "discriminator": "0"}
+
+    async def get(url, params=None):
+        assert url == "/channels/2/messages"
+        return [{"id": "5", "channel_id": "2", "content": "hi", "author": author}] if "before" not in params else []
+
+    client.rest_client = RESTClient('token', None)
+    monkeypatch.setattr(client.rest_client, 'get', get)
+
+    async def main():
+        return [message async for message in cached.channels.get("2").history()]
+
+    messages = asyncio.run(main())
+    assert [type(message) for message in messages] == [Message]
+    assert messages[0].guild_id == "41771983423143936"
+    assert messages[0].author is cached.get_member(author["id"]).user
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from discord.client import Client
+from discord.shard import Shard
+
+GUILD_ID = "41771983423143936"
+USER_ID = "80351110224678912"
+
+
+def dispatch(event: str, sequence: int, data: dict) -> str:
+    # Compact, with the keys in the order the gateway sends them.
+    return json.dumps({"t": event, "s": sequence, "op": 0, "d": data}, separators=(',', ':'))
+
+
+def test_presences_update_cached_users():
+    client = Client([])
+    client._handle_guild_create({"id": GUILD_ID, "name": "guild", "roles": [], "channels": [], "emojis": [],
+                                 "members": [{"user": {"id": USER_ID, "username": "old", "discriminator": "0"},
+                                              "roles": []}]}, None)
+    user = client.client_cache.get_guild(GUILD_ID).get_member(USER_ID).user
+    presences = [
+        {"user": {"id": USER_ID}, "guild_id": GUILD_ID, "status": "online", "activities": []},
+        {"user": {"id": USER_ID, "username": "new"}, "guild_id": GUILD_ID, "status": "online", "activities": []}
+    ]
+
+    async def main():
+        shard = Shard(client, client.shard_manager, 0, 1)
+        for sequence, presence in enumerate(presences, 1):
+            await shard.recv(dispatch('PRESENCE_UPDATE', sequence, presence))
+        assert shard.sequence == 2
+        queued = []
+        while client.dispatch_queue.depth:
+            queued.append(await client.dispatch_queue.get())
+        for event, data, shard in queued:
+            await client.dispatch(event, data, shard)
+        return queued
+
+    queued = asyncio.run(main())
+    # The presence which only changed the status was skipped without being decoded.
+    assert [data for event, data, shard in queued] == [presences[1]]
+    assert user.username == "new"
+    assert client.client_cache.get_user(USER_ID) is user
+
+
+def test_presences_wanted_with_listener():
+    client = Client([])
+    status_only = dispatch('PRESENCE_UPDATE', 1, {"user": {"id": USER_ID}, "status": "idle"})
+    assert not client.wants('PRESENCE_UPDATE', status_only)
+
+    @client.event
+    async def on_presence_update(data):
+        pass
+
+    assert client.wants('PRESENCE_UPDATE', status_only)
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+import json
+import os
+
+import pytest
+
+from discord.client import Client
+from discord.cluster import Cluster, shard_ranges
+from fake_gateway import FakeGateway, guild_for_shard, wait_until
+
+
+def make_client(gateway_url: str, out_dir: str) -> Client:
+    # Runs in each worker process. Once its shards are ready, the worker looks up the other worker's guild through the
+    # cluster and writes what it found for the test to read.
+    client = Client([], gateway_url=gateway_url, warm_connections=0)
+
+    async def on_ready():
+        worker = client.cluster
+        other_guild = guild_for_shard(shard_ranges(worker.shard_count, worker.worker_count)[1 - worker.id][0],
+                                      worker.shard_count)
+        guild = None
+        while guild is None:
+            guild = await worker.get_guild(other_guild)
+            await asyncio.sleep(0.1)
+        with open(os.path.join(out_dir, f"worker-{worker.id}.json"), 'w') as f:
+            json.dump({"shards": list(client.shards), "other_guild": guild.name}, f)
+
+    client.event_emitter.add_listener('on_ready', on_ready)
+    return client
+
+
+def test_shard_ranges():
+    assert shard_ranges(5, 2) == [[0, 1, 2], [3, 4]]
+    with pytest.raises(ValueError):
+        shard_ranges(2, 3)
+
+
+def test_more_workers_than_shards():
+    with pytest.raises(ValueError):
+        Cluster(make_client, 3, shard_count=2)
+
+
+def test_two_workers(tmp_path):
+    async def main():
+        gateway = FakeGateway()
+        await gateway.start()
+        cluster = Cluster(functools.partial(make_client, gateway.url, str(tmp_path)), 2, shard_count=2)
+        task = asyncio.create_task(cluster.start('token'))
+        try:
+            await wait_until(lambda: all((tmp_path / f"worker-{i}.json").exists() for i in range(2)), 60)
+        finally:
+            cluster.close()
+            task.cancel()
+            await gateway.close()
+        return gateway
+
+    gateway = asyncio.run(main())
+    # Each shard identified once, so no worker died and was restarted.
+    assert sorted(gateway.identified) == [[0, 2], [1, 2]]
+    results = [json.loads((tmp_path / f"worker-{i}.json").read_text()) for i in range(2)]
+    assert [result["shards"] for result in results] == [[0], [1]]
+    # Each worker found the guild cached by the other one.
+    assert [result["other_guild"] for result in results] == ["guild 1", "guild 0"]
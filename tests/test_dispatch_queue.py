@@ -0,0 +1,22 @@
+import asyncio
+
+from discord.utils.dispatch_queue import DispatchQueue, OverflowPolicy
+
+
+def update(user_id: str, nick: str) -> dict:
+    return {"guild_id": "1", "user": {"id": user_id}, "nick": nick}
+
+
+def test_coalesce_only_when_full():
+    async def main():
+        queue = DispatchQueue(3, {'GUILD_MEMBER_UPDATE': OverflowPolicy.COALESCE})
+        await queue.put('GUILD_MEMBER_UPDATE', update("2", "a"), None)
+        await queue.put('GUILD_MEMBER_UPDATE', update("2", "b"), None)
+        await queue.put('GUILD_MEMBER_UPDATE', update("3", "a"), None)
+        # The queue is full now, so the latest update for the member replaces the queued one.
+        await queue.put('GUILD_MEMBER_UPDATE', update("3", "b"), None)
+        return [(await queue.get())[1] for _ in range(queue.depth)], queue.coalesced
+
+    events, coalesced = asyncio.run(main())
+    assert events == [update("2", "a"), update("2", "b"), update("3", "b")]
+    assert coalesced == 1
@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from discord.guild import GuildRole
+from discord.message import Message
+
+
+def test_copy_keeps_extra_from_before_update():
+    role = GuildRole({"id": "1", "name": "role", "poll": {"q": 1}})
+    before = role.copy()
+    role.update({"name": "renamed", "poll": {"q": 2}})
+    assert (before.name, before.extra) == ("role", {"poll": {"q": 1}})
+    assert (role.name, role.extra) == ("renamed", {"poll": {"q": 2}})
+
+
+def test_message_timestamps_are_parsed():
+    message = Message({"id": "1", "channel_id": "2", "timestamp": "2017-07-11T17:27:07.299000+00:00",
+                       "edited_timestamp": None})
+    assert message.timestamp == datetime(2017, 7, 11, 17, 27, 7, 299000, tzinfo=timezone.utc)
+    assert message.edited_timestamp is None
+    message.update({"edited_timestamp": "2017-07-11T17:30:00+00:00"})
+    assert message.edited_timestamp == datetime(2017, 7, 11, 17, 30, tzinfo=timezone.utc)
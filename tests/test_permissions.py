@@ -0,0 +1,31 @@
+from discord.guild import Guild
+from discord.permissions import ALL_PERMISSIONS, Permissions
+
+GUILD_ID = "41771983423143936"
+NEW_PERMISSION = 1 << 46
+
+
+def guild() -> dict:
+    # @everyone grants a permission newer than the known flags.
+    everyone = Permissions.VIEW_CHANNEL.value | NEW_PERMISSION
+    return {
+        "id": GUILD_ID,
+        "name": "guild",
+        "owner_id": "1",
+        "roles": [{"id": GUILD_ID, "name": "@everyone", "permissions": str(everyone)},
+                  {"id": "10", "name": "admin", "permissions": str(Permissions.ADMINISTRATOR.value)}],
+        "members": [{"user": {"id": id, "username": id, "discriminator": "0"}, "roles": roles}
+                    for id, roles in (("1", []), ("2", []), ("3", ["10"]))],
+        "channels": [{"id": "20", "type": 0, "name": "channel", "permission_overwrites": []}]
+    }
+
+
+def test_owner_and_administrators_have_unknown_permissions():
+    g = Guild(guild())
+    channel = g.get_channel("20")
+    for user_id in ("1", "2", "3"):
+        member = g.get_member(user_id)
+        assert g.permissions_for(member).value & NEW_PERMISSION
+        assert g.permissions_for(member, channel).value & NEW_PERMISSION
+    assert g.permissions_for(g.get_member("3")) == ALL_PERMISSIONS
+    assert g.permissions_for(g.get_member("3"), channel) == ALL_PERMISSIONS
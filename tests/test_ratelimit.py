@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from discord.utils import ratelimit
+from discord.utils.ratelimit import GatewayRateLimiter, RESTRateLimiter, route_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # A clock which only moves when something sleeps, so that the limits can be checked without waiting for them.
+    now = [1000.0]
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args):
+        now[0] += delay
+        await sleep(0)
+
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(ratelimit.asyncio, 'sleep', fake_sleep)
+    return now
+
+
+def sends_per_window(times: list[float], per: float) -> list[int]:
+    counts = {}
+    for t in times:
+        window = int((t - times[0]) // per)
+        counts[window] = counts.get(window, 0) + 1
+    return [counts.get(i, 0) for i in range(max(counts) + 1)]
+
+
+def test_gateway_limit(clock):
+    limiter = GatewayRateLimiter()
+    times = []
+
+    async def send(priority=False):
+        await limiter.acquire(priority)
+        times.append(clock[0])
+
+    async def main():
+        for i in range(400):
+            await send(priority=i % 40 == 0)
+
+    asyncio.run(main())
+    counts = sends_per_window(times, 60)
+    assert sum(counts) == 400
+    assert max(counts) <= 110
+
+
+def test_heartbeats_use_reserved_sends(clock):
+    limiter = GatewayRateLimiter()
+
+    async def main():
+        for _ in range(107):
+            await limiter.acquire()
+        start = clock[0]
+        await limiter.acquire(priority=True)
+        # The heartbeat used a reserved send rather than waiting for the next window.
+        assert clock[0] == start
+        await limiter.acquire()
+        assert clock[0] >= start + 59
+
+    asyncio.run(main())
+
+
+def test_presence_limit(clock):
+    limiter = GatewayRateLimiter()
+    times = []
+
+    async def main():
+        for _ in range(20):
+            await limiter.acquire(presence=True)
+            times.append(clock[0])
+
+    asyncio.run(main())
+    assert sends_per_window(times, 20) == [5, 5, 5, 5]
+
+
+def test_route_key():
+    assert route_key('GET', '/channels/41771983423143937/messages/41771983423143938?limit=5') == \
+        ('GET /channels/{id}/messages/{id}', '41771983423143937')
+    assert route_key('PUT', '/channels/41771983423143937/messages/41771983423143938/reactions/%F0%9F%91%8D/@me') == \
+        ('PUT /channels/{id}/messages/{id}/reactions/{id}/@me', '41771983423143937')
+    assert route_key('POST', '/interactions/41771983423143937/aW50ZXJhY3Rpb246dG9rZW4/callback') == \
+        ('POST /interactions/{id}/{id}/callback', '')
+    assert route_key('PATCH', '/webhooks/41771983423143937/token/messages/@original') == \
+        ('PATCH /webhooks/{id}/{id}/messages/@original', '41771983423143937:token')
+    assert route_key('GET', '/invites/discord-developers') == ('GET /invites/{id}', '')
+    assert route_key('GET', '/users/@me') == ('GET /users/@me', '')
+
+
+def test_idle_buckets_are_pruned():
+    limiter = RESTRateLimiter()
+    busy = limiter.get_bucket('POST', '/webhooks/41771983423143937/busy')
+    busy.pause(60)
+    for i in range(1000):
+        limiter.get_bucket('POST', f'/webhooks/41771983423143937/token{i}')
+    assert len(limiter.buckets) <= RESTRateLimiter.PRUNE_AFTER
+    # A bucket which has not reset is kept, so requests to it still wait.
+    assert limiter.get_bucket('POST', '/webhooks/41771983423143937/busy') is busy
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from discord.utils.rest import RESTClient
+
+
+def test_routes_are_shared_between_interactions():
+    async def callback(request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def main():
+        app = web.Application()
+        app.router.add_post('/interactions/{id}/{token}/callback', callback)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                rest = RESTClient('token', session, base_url=f"http://127.0.0.1:{port}")
+                for i in range(50):
+                    await rest.post(f'/interactions/{41771983423143937 + i}/aW50ZXJhY3Rpb24{i}/callback', {})
+                return rest
+        finally:
+            await runner.cleanup()
+
+    rest = asyncio.run(main())
+    # Every interaction's callback is the same route, so they share one circuit breaker and latency histogram.
+    assert list(rest.breakers) == ['POST /interactions/{id}/{id}/callback']
+    assert list(rest.histograms) == ['POST /interactions/{id}/{id}/callback']
+    assert rest.histograms['POST /interactions/{id}/{id}/callback'].count == 50
+
+
+class FakeBucketServer:
+    """
+    Answers GET /channels/{id}/messages after `latency` seconds, allowing `limit` requests in each window of `per`
+    seconds, and counts the requests which were rate limited.
+    """
+    def __init__(self, limit: int, per: float, latency: float):
+        self.limit = limit
+        self.per = per
+        self.latency = latency
+        self.reset_at = 0.0
+        self.count = 0
+        self.rate_limited = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.reset_at = now + self.per
+            self.count = 0
+        self.count += 1
+        headers = {"X-RateLimit-Limit": str(self.limit), "X-RateLimit-Remaining": str(max(0, self.limit - self.count)),
+                   "X-RateLimit-Reset-After": f"{self.reset_at - now:.3f}", "X-RateLimit-Bucket": "messages"}
+        await asyncio.sleep(self.latency)
+        if self.count > self.limit:
+            self.rate_limited += 1
+            return web.json_response({"retry_after": self.reset_at - now, "global": False}, status=429,
+                                     headers=headers)
+        return web.json_response([], headers=headers)
+
+    async def run(self, requests: int) -> float:
+        app = web.Application()
+        app.router.add_get('/channels/{id}/messages', self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                rest = RESTClient('token', session, base_url=f"http://127.0.0.1:{port}")
+                start = time.monotonic()
+                await asyncio.gather(*(rest.get('/channels/41771983423143937/messages') for _ in range(requests)))
+                return time.monotonic() - start
+        finally:
+            await runner.cleanup()
+
+
+def test_requests_in_a_bucket_run_alongside_each_other():
+    server = FakeBucketServer(limit=5, per=5, latency=0.2)
+    elapsed = asyncio.run(server.run(5))
+    # The first request finds out the bucket's limits, and the other four are then sent together.
+    assert elapsed < 0.6
+    assert server.rate_limited == 0
+
+
+def test_bucket_limits_are_kept_to():
+    server = FakeBucketServer(limit=3, per=0.5, latency=0.05)
+    elapsed = asyncio.run(server.run(10))
+    assert server.rate_limited == 0
+    # 10 requests at 3 per window need at least 4 windows.
+    assert elapsed >= 1.5
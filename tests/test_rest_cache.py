@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from discord.utils.rest_cache import RESTCache
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    cache = RESTCache()
+    requests = 0
+
+    async def request():
+        nonlocal requests
+        requests += 1
+        await asyncio.sleep(0.1)
+        return {"id": "1"}
+
+    async def main():
+        first = asyncio.create_task(asyncio.wait_for(cache.fetch('/users/1', request), 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.fetch('/users/1', request))
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+        assert await second == {"id": "1"}
+
+    asyncio.run(main())
+    assert requests == 1
+    assert cache.get('/users/1') == (True, {"id": "1"})
+
+
+def test_request_cancelled_with_its_last_caller():
+    cache = RESTCache()
+
+    async def main():
+        started = asyncio.Event()
+        stopped = asyncio.Event()
+
+        async def request():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            finally:
+                stopped.set()
+
+        callers = [asyncio.create_task(cache.fetch('/users/1', request)) for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(stopped.wait(), 1)
+        # The next caller starts a new request rather than joining the cancelled one.
+        assert await cache.fetch('/users/1', lambda: asyncio.sleep(0, {"id": "1"})) == {"id": "1"}
+
+    asyncio.run(main())
+    assert cache.stats["misses"] == 2
+
+
+def test_request_invalidated_while_running_is_not_cached():
+    cache = RESTCache()
+
+    async def main():
+        async def old():
+            await asyncio.sleep(0.1)
+            return {"id": "1", "username": "old"}
+
+        running = asyncio.create_task(cache.fetch('/users/1', old))
+        await asyncio.sleep(0)
+        cache.invalidate_event('USER_UPDATE', {"id": "1"})
+        # A caller after the change does not join the request from before it, which finishes last but is not cached.
+        new = await cache.fetch('/users/1', lambda: asyncio.sleep(0.02, {"id": "1", "username": "new"}))
+        assert (await running)["username"] == "old"
+        return new
+
+    assert asyncio.run(main())["username"] == "new"
+    assert cache.get('/users/1') == (True, {"id": "1", "username": "new"})
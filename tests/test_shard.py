@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from discord.client import Client
+from discord.shard import Shard
+from discord.utils import GatewayException
+from fake_gateway import FakeGateway, wait_until
+
+
+class SlowClient(Client):
+    # Handles each event slowly, so that the dispatch queue fills up and the shard waits for room in it.
+    async def dispatch(self, event, data, shard):
+        await asyncio.sleep(0.02)
+        return await super().dispatch(event, data, shard)
+
+
+def test_heartbeat_while_dispatch_queue_is_full():
+    events = [('TYPING_START', {"channel_id": "1", "user_id": str(i), "timestamp": 0}) for i in range(100)]
+
+    async def main():
+        gateway = FakeGateway(heartbeat_interval=200, events=events)
+        await gateway.start()
+        client = SlowClient([], shard_count=1, gateway_url=gateway.url, warm_connections=0, queue_size=1)
+        client._token = 'token'
+        typing = []
+
+        async def on_typing_start(data):
+            typing.append(data)
+
+        client.event(on_typing_start)
+        task = asyncio.create_task(client.connect())
+        try:
+            await wait_until(lambda: len(typing) == len(events), 30)
+        finally:
+            await client.close()
+            task.cancel()
+            await gateway.close()
+        return gateway
+
+    gateway = asyncio.run(main())
+    # Heartbeats kept being sent while the shard was held up, and the connection was never given up on and resumed.
+    assert any(payload['op'] == 1 for payload in gateway.received)
+    assert not any(payload['op'] == 6 for payload in gateway.received)
+    assert gateway.identified == [[0, 1]]
+
+
+def test_send_without_connection():
+    client = Client([], shard_count=2, shard_ids=[0], warm_connections=0)
+    client.shard_manager.shards[0] = Shard(client, client.shard_manager, 0, 2)
+
+    async def main():
+        # Guild 1 << 22 is on shard 1, which this client does not run.
+        with pytest.raises(ValueError):
+            async for _ in client.request_members(str(1 << 22)):
+                pass
+        # Shard 0 is reconnecting, so it has no gateway connection to send on.
+        with pytest.raises(GatewayException):
+            async for _ in client.request_members(str(2 << 22)):
+                pass
+        assert not client._member_requests
+
+    asyncio.run(main())